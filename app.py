@@ -6,13 +6,48 @@ Style: Elon Musk Professional - Minimalist, Efficient, Robust
 Version: 2.0 - Enhanced with Bulk Import Feature
 """
 
+import html
+import os
+import time
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime
-import os
-from io import BytesIO
+from datetime import datetime, timedelta
+
+from inventory import (
+    COSTING_METHODS,
+    DEFAULT_LEAD_TIME,
+    DEFAULT_LOCATION,
+    DEFAULT_PRODUCTS,
+    DEFAULT_TREND_WINDOW,
+    EDITABLE_FIELDS,
+    EXPORT_SECONDS,
+    FISCAL_YEAR_START_MONTH,
+    MAX_PAYMENT,
+    MAX_PRICE,
+    MAX_QUANTITY,
+    Branches,
+    Ledger,
+    REORDER_STATUSES,
+    RerunProfiler,
+    TREND_WINDOWS,
+    TenantHolder,
+    TenantPool,
+    closed_fiscal_years,
+    create_excel_report,
+    create_excel_separate_sheets,
+    highlight,
+    log_to_file,
+    money_sum,
+    parse_dates,
+    parse_import_record,
+    quantity_sum,
+    resolve_tenant,
+    start_metrics_server,
+    tenant_dir,
+)
 
 # Page Configuration
 st.set_page_config(
@@ -161,235 +196,123 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Data File Paths
-import json
-from pathlib import Path
+# Storage Helpers (Streamlit-facing wrappers around the core Ledger)
+@st.cache_resource
+def tenant_pool():
+    """Tenants' ledgers shared by every session of this process (INVENTORY_POOL_MB sets the memory budget)"""
+    return TenantPool()
 
-# Storage Configuration
-STORAGE_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "InventoryDashboard")
-STORAGE_FILE = os.path.join(STORAGE_DIR, "data.json")
-
-# Ensure storage directory exists
-os.makedirs(STORAGE_DIR, exist_ok=True)
-
-# Helper Functions for Storage
-def load_storage():
-    """Load data from JSON storage"""
-    if os.path.exists(STORAGE_FILE):
-        try:
-            with open(STORAGE_FILE, 'r') as f:
-                data = json.load(f)
-            return data
-        except Exception as e:
-            st.error(f"Error reading storage: {e}")
-            return None
-    return None
+def init_branches():
+    """Every location's ledger for this session's tenant, loaded into the shared pool on first use"""
+    try:
+        with profiler.span('storage', 'load'):
+            # The session's holder keeps its tenant in the pool for as long as the session lives
+            holder = st.session_state.setdefault('tenant_holder', TenantHolder())
+            branches = tenant_pool().get(tenant, holder)
+        return branches
+    except Exception as e:
+        st.error(f"Error reading storage: {e}")
+        ledger = Ledger()
+        return Branches({DEFAULT_LOCATION: ledger}, ledger.catalog)
 
-def save_storage(products, df):
-    """Save data to JSON storage"""
+def save_data(locations=None):
+    """Save the selected location's ledger (or the given locations') and the locations registry to JSON storage"""
     try:
-        data = {
-            'products': products,
-            'transactions': df.to_dict('records')
-        }
-        with open(STORAGE_FILE, 'w') as f:
-            json.dump(data, f, indent=4)
+        with profiler.span('storage', 'save', rows=len(ledger.df)):
+            branches.save(*(locations or [location]))
+        tenant_pool().trim(keep=tenant)
         return True
     except Exception as e:
         st.error(f"Error saving storage: {e}")
         return False
 
-# Default Product List (Initial Options)
-DEFAULT_PRODUCTS = ["Wheat", "Urea", "DAP", "Sarson", "Cow Feed", "Gandyal", "Him Cal", "Liv 52"]
-
-# Product Management Functions
-def load_products():
-    """Load products from JSON storage or use defaults"""
-    data = load_storage()
-    if data and 'products' in data:
-        return data['products']
-    return DEFAULT_PRODUCTS.copy()
-
-def save_products(products_list):
-    """Save products list to JSON storage"""
-    # We need to preserve existing transactions when saving products
-    # Get current df from session state if available, or load from disk
-    if 'df' in st.session_state:
-        df = st.session_state.df
-    else:
-        # Fallback if saving products before df is initialized
-        data = load_storage()
-        if data and 'transactions' in data:
-            df = pd.DataFrame(data['transactions'])
-        else:
-            df = create_empty_dataframe()
-            
-    return save_storage(products_list, df)
-
-def add_product(products_list, new_product):
-    """Add a new product to the list"""
-    if new_product and new_product.strip():
-        new_product = new_product.strip()
-        if new_product not in products_list:
-            products_list.append(new_product)
-            return True, f"✅ '{new_product}' added successfully!"
-        else:
-            return False, f"⚠️ '{new_product}' already exists!"
-    return False, "⚠️ Product name cannot be empty!"
-
-def remove_product(products_list, product_to_remove):
-    """Remove a product from the list"""
-    if product_to_remove in products_list:
-        products_list.remove(product_to_remove)
-        return True, f"✅ '{product_to_remove}' removed successfully!"
-    return False, f"⚠️ Product not found!"
-
-# Load Products
-if 'products' not in st.session_state:
-    st.session_state.products = load_products()
+# Opt-in profiling: sidebar toggle, or INVENTORY_PROFILE=1 (INVENTORY_PROFILE_LOG=<file> keeps JSON span logs)
+if 'profiler' not in st.session_state:
+    st.session_state.profiler = RerunProfiler(enabled=os.environ.get('INVENTORY_PROFILE') == '1')
+if os.environ.get('INVENTORY_PROFILE_LOG'):
+    log_to_file(os.environ['INVENTORY_PROFILE_LOG'])
+profiler = st.session_state.profiler
+profiler.enabled = st.session_state.get('profiling_enabled', profiler.enabled)
+profiler.begin()
 
-# Initialize Data
-def init_data():
-    """Initialize or load existing data"""
-    data = load_storage()
-    if data and 'transactions' in data:
-        try:
-            df = pd.DataFrame(data['transactions'])
-            # Ensure safe handling of empty dataframes or missing columns
-            if df.empty:
-                return create_empty_dataframe()
-            return df
-        except Exception as e:
-            st.error(f"Error loading data: {e}")
-            return create_empty_dataframe()
-    else:
-        return create_empty_dataframe()
-
-def create_empty_dataframe():
-    """Create empty dataframe with required columns"""
-    return pd.DataFrame(columns=[
-        'Date', 'Product Name', 'Quantity Received', 'Quantity Sold', 
-        'Stock Left', 'Cost Price', 'Selling Price', 'Total Purchase', 
-        'Total Sales', 'Profit', 'Remarks'
-    ])
-
-def save_data(df):
-    """Save dataframe to JSON storage"""
-    # We need to preserve existing products
-    if 'products' in st.session_state:
-        products = st.session_state.products
-    else:
-        products = load_products()
-        
-    return save_storage(products, df)
-
-def calculate_stock_left(df, product, qty_received, qty_sold):
-    """Calculate stock left based on previous transactions"""
-    product_df = df[df['Product Name'] == product]
-    if len(product_df) > 0:
-        previous_stock = product_df.iloc[-1]['Stock Left']
-    else:
-        previous_stock = 0
-    
-    new_stock = previous_stock + qty_received - qty_sold
-    return new_stock
-
-def add_transaction(df, date, product, qty_received, qty_sold, cost_price, selling_price, remarks):
-    """Add new transaction with auto-calculations"""
-    # Calculate fields
-    stock_left = calculate_stock_left(df, product, qty_received, qty_sold)
-    total_purchase = qty_received * cost_price
-    total_sales = qty_sold * selling_price
-    profit = (selling_price - cost_price) * qty_sold
-    
-    # Create new row
-    new_row = {
-        'Date': date,
-        'Product Name': product,
-        'Quantity Received': qty_received,
-        'Quantity Sold': qty_sold,
-        'Stock Left': stock_left,
-        'Cost Price': cost_price,
-        'Selling Price': selling_price,
-        'Total Purchase': total_purchase,
-        'Total Sales': total_sales,
-        'Profit': profit,
-        'Remarks': remarks
-    }
-    
-    # Append to dataframe
-    df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-    return df
-
-def create_excel_separate_sheets(df, products_list):
-    """Create Excel file with separate sheet for each product"""
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        # Create a sheet for each product
-        for product in products_list:
-            product_df = df[df['Product Name'] == product]
-            if len(product_df) > 0:
-                product_df.to_excel(writer, sheet_name=product[:31], index=False)  # Excel sheet name limit is 31 chars
-        
-        # Create a summary sheet with all data
-        df.to_excel(writer, sheet_name='All Products', index=False)
-    
-    output.seek(0)
-    return output
-
-def delete_transaction(df, product, date):
-    """Delete transaction for specific product and date, then recalculate stock"""
-    # Find matching transactions
-    mask = (df['Product Name'] == product) & (df['Date'] == date)
-    
-    if not df[mask].empty:
-        # Get the index of the transaction to delete
-        delete_idx = df[mask].index[0]
-        
-        # Delete the transaction
-        df = df.drop(delete_idx).reset_index(drop=True)
-        
-        # Recalculate stock for all subsequent transactions of this product
-        product_df = df[df['Product Name'] == product]
-        if len(product_df) > 0:
-            # Recalculate stock left for each transaction
-            for idx in product_df.index:
-                if idx == product_df.index[0]:
-                    # First transaction of this product
-                    df.at[idx, 'Stock Left'] = df.at[idx, 'Quantity Received'] - df.at[idx, 'Quantity Sold']
-                else:
-                    # Get previous transaction's stock
-                    prev_idx = product_df.index[product_df.index.get_loc(idx) - 1]
-                    prev_stock = df.at[prev_idx, 'Stock Left']
-                    df.at[idx, 'Stock Left'] = prev_stock + df.at[idx, 'Quantity Received'] - df.at[idx, 'Quantity Sold']
-        
-        return df, True, "✅ Transaction deleted and stock recalculated!"
-    else:
-        return df, False, "⚠️ No transaction found for selected product and date!"
+# Prometheus metrics for this process (INVENTORY_METRICS_PORT=<port> serves /metrics locally)
+if os.environ.get('INVENTORY_METRICS_PORT'):
+    start_metrics_server(int(os.environ['INVENTORY_METRICS_PORT']))
 
-# Load Data
-if 'df' not in st.session_state:
-    st.session_state.df = init_data()
+# Load Data - the tenant (shop) is fixed per session by INVENTORY_TENANT or the signed ?tenant= link it was opened with
+try:
+    if 'tenant' not in st.session_state:
+        st.session_state.tenant = resolve_tenant(st.query_params)
+    tenant = st.session_state.tenant
+    tenant_dir(tenant)
+except ValueError as e:
+    st.error(f"⚠️ {e}")
+    st.stop()
+branches = init_branches()
 
 # ========================================
 # SIDEBAR NAVIGATION
 # ========================================
 st.sidebar.title("🎯 Navigation")
-page = st.sidebar.radio("Go to", ["📊 Dashboard", "📝 Data Entry", "📋 Ledger View", "📈 Profit Analysis", "🏭 Product Management"])
+page = st.sidebar.radio("Go to", ["📊 Dashboard", "📝 Data Entry", "📋 Ledger View", "📈 Profit Analysis",
+                                 "💳 Customer Credit", "🏭 Product Management"])
 
 st.sidebar.markdown("---")
+if tenant:
+    st.sidebar.caption(f"🏪 Shop: {tenant}")
+if len(branches) > 1:
+    st.sidebar.title("🏬 Location")
+    location = st.sidebar.selectbox(
+        "Select Location",
+        branches.names(),
+        key="location",
+        help="Every page works on this location's own ledger; the Dashboard also shows all locations combined"
+    )
+else:
+    location = branches.names()[0]
+ledger = branches[location]
+
 st.sidebar.title("🏷️ Product Filter")
-selected_product = st.sidebar.selectbox(
+selected_product_id = st.sidebar.selectbox(
     "Select Product",
-    ["All Products"] + st.session_state.products,
+    [None] + ledger.catalog.ids(),
+    format_func=lambda pid: "All Products" if pid is None else ledger.product_name(pid),
     help="Filter view by specific product (Separate Hotel Logic)"
 )
+selected_product = "All Products" if selected_product_id is None else ledger.product_name(selected_product_id)
 
-# Filter data based on selected product
-if selected_product == "All Products":
-    filtered_df = st.session_state.df
+st.sidebar.title("📅 Date Range")
+date_preset = st.sidebar.selectbox(
+    "Period",
+    ["All Time", "This Month", "Last 30 Days", "This Fiscal Year", "Custom"],
+    key="date_preset",
+    help="Every page, KPI and export covers only transactions dated in this period"
+)
+today = datetime.now().date()
+if date_preset == "This Month":
+    date_range = (today.replace(day=1), today)
+elif date_preset == "Last 30 Days":
+    date_range = (today - timedelta(days=29), today)
+elif date_preset == "This Fiscal Year":
+    fiscal_year = today.year if today.month >= FISCAL_YEAR_START_MONTH else today.year - 1
+    date_range = (today.replace(year=fiscal_year, month=FISCAL_YEAR_START_MONTH, day=1), today)
+elif date_preset == "Custom":
+    custom_dates = st.sidebar.date_input("From - To", value=(today.replace(day=1), today), key="date_custom")
+    date_range = tuple(custom_dates) if len(custom_dates) == 2 else None
 else:
-    filtered_df = st.session_state.df[st.session_state.df['Product Name'] == selected_product]
+    date_range = None
+if date_range:
+    st.sidebar.caption(f"{date_range[0].strftime('%d/%m/%Y')} - {date_range[1].strftime('%d/%m/%Y')}")
+
+# Integrity check (once per ledger change)
+integrity_report = ledger.check_integrity()
+if len(integrity_report) > 0:
+    st.sidebar.warning(f"⚠️ {len(integrity_report)} data integrity issue(s) - see 🏭 Product Management")
+
+# Filter data based on selected product
+with profiler.span('filtering', 'product filter'):
+    # Sorted date index + binary search, so a short period touches only its own rows
+    filtered_df = ledger.select(selected_product_id, date_range)
 
 # ========================================
 # PAGE: DASHBOARD (Analytics)
@@ -398,22 +321,27 @@ if page == "📊 Dashboard":
     st.title("📊 Business Intelligence Dashboard")
     
     if len(filtered_df) == 0:
-        st.warning("⚠️ No data available. Please add transactions in the Data Entry section.")
+        if date_range and len(ledger.df) > 0:
+            st.warning("⚠️ No transactions in the selected period.")
+        else:
+            st.warning("⚠️ No data available. Please add transactions in the Data Entry section.")
     else:
-        # KPI Cards
+        # KPI Cards (transfers to other locations are stock moves, not sales)
+        trading_df = filtered_df[~filtered_df['Transaction ID'].isin(ledger.transfer_ids)] \
+            if ledger.transfer_ids else filtered_df
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            total_sales = filtered_df['Total Sales'].sum()
+            total_sales = money_sum(trading_df['Total Sales'])
             st.metric("💰 Total Sales", f"₹{total_sales:,.2f}")
         
         with col2:
-            total_profit = filtered_df['Profit'].sum()
+            total_profit = money_sum(trading_df['Profit'])
             st.metric("📈 Total Profit", f"₹{total_profit:,.2f}")
         
         with col3:
             if selected_product == "All Products":
-                st.metric("📦 Products", len(st.session_state.products))
+                st.metric("📦 Products", len(ledger.products))
             else:
                 current_stock = filtered_df.iloc[-1]['Stock Left'] if len(filtered_df) > 0 else 0
                 st.metric("📦 Current Stock", f"{current_stock:,.0f} units")
@@ -430,46 +358,49 @@ if page == "📊 Dashboard":
         with chart_col1:
             st.subheader("📉 Stock Depletion Over Time")
             if selected_product != "All Products":
-                # Line chart for stock depletion
-                fig_stock = go.Figure()
-                fig_stock.add_trace(go.Scatter(
-                    x=list(range(1, len(filtered_df) + 1)),
-                    y=filtered_df['Stock Left'],
-                    mode='lines+markers',
-                    name='Stock Left',
-                    line=dict(color='#00D9FF', width=3),
-                    marker=dict(size=8, color='#00D9FF')
-                ))
-                fig_stock.update_layout(
-                    template='plotly_dark',
-                    xaxis_title='Transaction Number',
-                    yaxis_title='Stock Left (Units)',
-                    hovermode='x unified',
-                    height=400
-                )
-                st.plotly_chart(fig_stock, use_container_width=True)
+                with profiler.span('charting', 'stock depletion', rows=len(filtered_df)):
+                    # Line chart for stock depletion
+                    fig_stock = go.Figure()
+                    fig_stock.add_trace(go.Scatter(
+                        x=list(range(1, len(filtered_df) + 1)),
+                        y=filtered_df['Stock Left'],
+                        mode='lines+markers',
+                        name='Stock Left',
+                        line=dict(color='#00D9FF', width=3),
+                        marker=dict(size=8, color='#00D9FF')
+                    ))
+                    fig_stock.update_layout(
+                        template='plotly_dark',
+                        xaxis_title='Transaction Number',
+                        yaxis_title='Stock Left (Units)',
+                        hovermode='x unified',
+                        height=400
+                    )
+                    st.plotly_chart(fig_stock, use_container_width=True)
             else:
                 st.info("Select a specific product to view stock depletion chart")
         
         with chart_col2:
             st.subheader("🥧 Profit Margin by Product")
             # Pie chart for profit distribution
-            profit_by_product = st.session_state.df.groupby('Product Name')['Profit'].sum().reset_index()
+            with profiler.span('aggregation', 'product summary'):
+                profit_by_product = ledger.product_summary(date_range=date_range)[['Product Name', 'Profit']]
             profit_by_product = profit_by_product[profit_by_product['Profit'] > 0]
             
             if len(profit_by_product) > 0:
-                fig_profit = px.pie(
-                    profit_by_product,
-                    values='Profit',
-                    names='Product Name',
-                    hole=0.4,
-                    color_discrete_sequence=px.colors.sequential.Turbo
-                )
-                fig_profit.update_layout(
-                    template='plotly_dark',
-                    height=400
-                )
-                st.plotly_chart(fig_profit, use_container_width=True)
+                with profiler.span('charting', 'profit pie'):
+                    fig_profit = px.pie(
+                        profit_by_product,
+                        values='Profit',
+                        names='Product Name',
+                        hole=0.4,
+                        color_discrete_sequence=px.colors.sequential.Turbo
+                    )
+                    fig_profit.update_layout(
+                        template='plotly_dark',
+                        height=400
+                    )
+                    st.plotly_chart(fig_profit, use_container_width=True)
             else:
                 st.info("No profit data available yet")
         
@@ -479,33 +410,102 @@ if page == "📊 Dashboard":
         st.subheader("📊 Product Performance Summary")
         
         if selected_product == "All Products":
-            summary_df = st.session_state.df.groupby('Product Name').agg({
-                'Quantity Received': 'sum',
-                'Quantity Sold': 'sum',
-                'Total Purchase': 'sum',
-                'Total Sales': 'sum',
-                'Profit': 'sum'
-            }).reset_index()
-            
-            # Add current stock for each product
-            current_stocks = []
-            for product in summary_df['Product Name']:
-                product_data = st.session_state.df[st.session_state.df['Product Name'] == product]
-                if len(product_data) > 0:
-                    current_stocks.append(product_data.iloc[-1]['Stock Left'])
-                else:
-                    current_stocks.append(0)
-            
-            summary_df['Current Stock'] = current_stocks
-            
-            # Reorder columns
-            summary_df = summary_df[['Product Name', 'Current Stock', 'Quantity Received', 
-                                    'Quantity Sold', 'Total Purchase', 'Total Sales', 'Profit']]
+            with profiler.span('aggregation', 'product summary'):
+                summary_df = ledger.product_summary(date_range=date_range)[['Product Name', 'Current Stock', 'Quantity Received', 
+                                                      'Quantity Sold', 'Total Purchase', 'Total Sales', 'Profit']]
             
             st.dataframe(summary_df, use_container_width=True, hide_index=True)
         else:
             st.info(f"Viewing detailed data for {selected_product} in Ledger View")
 
+        st.markdown("---")
+
+        # Point-in-Time Stock
+        st.subheader("📅 Point-in-Time Stock")
+        as_of_date = st.date_input("Stock as of", datetime.now(), key="as_of_date")
+
+        if selected_product == "All Products":
+            with profiler.span('aggregation', 'stock statement'):
+                statement_df = ledger.statement_asof(as_of_date)
+            st.dataframe(statement_df, use_container_width=True, hide_index=True)
+            st.download_button(
+                label="💾 Download Stock Statement",
+                data=statement_df.to_csv(index=False),
+                file_name=f"stock_statement_{as_of_date.strftime('%Y%m%d')}.csv",
+                mime="text/csv"
+            )
+        else:
+            with profiler.span('aggregation', 'stock as of'):
+                as_of = ledger.stock_asof(selected_product, as_of_date)
+            asof_col1, asof_col2, asof_col3 = st.columns(3)
+            with asof_col1:
+                st.metric("📦 Stock", f"{as_of['Stock']:,.2f} units")
+            with asof_col2:
+                st.metric("💵 Cost Value", f"₹{as_of['Cost Value']:,.2f}")
+            with asof_col3:
+                st.metric("📈 Cumulative Profit", f"₹{as_of['Cumulative Profit']:,.2f}")
+
+        st.markdown("---")
+
+        # Expiring Stock
+        st.subheader("⏳ Expiring Stock")
+        expiry_days = st.number_input("Expiring within (days)", min_value=0, value=30, step=1)
+        with profiler.span('aggregation', 'expiring batches'):
+            expiring_df = ledger.expiring_within(int(expiry_days))
+        if selected_product != "All Products":
+            expiring_df = expiring_df[expiring_df['Product Name'] == selected_product]
+
+        if len(expiring_df) > 0:
+            st.dataframe(expiring_df, use_container_width=True, hide_index=True)
+        else:
+            st.info(f"No tracked batches expire within {int(expiry_days)} days")
+
+        st.markdown("---")
+
+        # Reorder Alerts
+        st.subheader("🚨 Reorder Alerts")
+        service_level = st.select_slider(
+            "Service level", options=[0.90, 0.95, 0.98, 0.99], value=0.95, key="service_level",
+            format_func=lambda level: f"{level:.0%}",
+            help="Chance of not running out during a lead time - higher levels hold more safety stock"
+        )
+        with profiler.span('aggregation', 'reorder report'):
+            reorder_df = ledger.reorder_report(service_level=service_level)
+        if selected_product != "All Products":
+            reorder_df = reorder_df[reorder_df['Product Name'] == selected_product]
+        
+        alert_col1, alert_col2 = st.columns(2)
+        with alert_col1:
+            st.metric("🔴 Reorder Now", int((reorder_df['Status'] == REORDER_STATUSES[0]).sum()))
+        with alert_col2:
+            st.metric("🟠 Reorder Soon", int((reorder_df['Status'] == REORDER_STATUSES[1]).sum()))
+        st.caption("Demand is the last 28 days' daily sales, adjusted by each product's monthly pattern once there "
+                   "is a year of history. Reorder point = demand over the lead time + safety stock. "
+                   "Set lead times in 🏭 Product Management.")
+        st.dataframe(reorder_df, use_container_width=True, hide_index=True)
+
+    # All Locations (built from each location's cached summary)
+    if len(branches) > 1:
+        st.markdown("---")
+        st.subheader("🏬 All Locations")
+        with profiler.span('aggregation', 'consolidated summary'):
+            location_df = branches.location_summary(date_range)
+            consolidated_df = branches.consolidated_summary(date_range)
+        
+        loc_col1, loc_col2, loc_col3 = st.columns(3)
+        with loc_col1:
+            st.metric("💰 Total Sales (all locations)", f"₹{location_df['Total Sales'].sum():,.2f}")
+        with loc_col2:
+            st.metric("📈 Total Profit (all locations)", f"₹{location_df['Profit'].sum():,.2f}")
+        with loc_col3:
+            st.metric("🏬 Locations", len(branches))
+        
+        st.dataframe(location_df, use_container_width=True, hide_index=True)
+        st.caption("Transfers between locations are left out of the combined quantities, purchases and sales.")
+        if selected_product != "All Products":
+            consolidated_df = consolidated_df[consolidated_df['Product Name'] == selected_product]
+        st.dataframe(consolidated_df, use_container_width=True, hide_index=True)
+
 # ========================================
 # PAGE: DATA ENTRY
 # ========================================
@@ -515,30 +515,42 @@ elif page == "📝 Data Entry":
     # Tab selection for Single vs Bulk entry
     entry_tab = st.radio(
         "Select Entry Method",
-        ["📝 Single Transaction", "📊 Bulk Import"],
+        ["📝 Single Transaction", "📊 Bulk Import", "🔁 Branch Transfer"],
         horizontal=True
     )
     
     if entry_tab == "📝 Single Transaction":
         st.markdown("### Add New Transaction")
         
+        # Outside the form so the catalog's default prices follow the chosen product
+        product = st.selectbox("🏷️ Product Name", ledger.products)
+        product_entry = ledger.catalog.entry(product) or {}
+        if product_entry.get('sku') or product_entry.get('unit'):
+            st.caption(f"SKU: {product_entry.get('sku') or '-'} · Unit: {product_entry.get('unit') or '-'}")
+        
         with st.form("transaction_form", clear_on_submit=True):
             col1, col2 = st.columns(2)
             
             with col1:
                 date_input = st.date_input("📅 Date", datetime.now())
-                product = st.selectbox("🏷️ Product Name", st.session_state.products)
-                qty_received = st.number_input("📦 Quantity Received", min_value=0.0, value=0.0, step=1.0)
-                qty_sold = st.number_input("🛒 Quantity Sold", min_value=0.0, value=0.0, step=1.0)
-                cost_price = st.number_input("💵 Cost Price (per unit)", min_value=0.0, value=0.0, step=0.01)
+                qty_received = st.number_input("📦 Quantity Received", min_value=0.0, max_value=float(MAX_QUANTITY),
+                                               value=0.0, step=1.0)
+                qty_sold = st.number_input("🛒 Quantity Sold", min_value=0.0, max_value=float(MAX_QUANTITY),
+                                           value=0.0, step=1.0)
+                cost_price = st.number_input("💵 Cost Price (per unit)", min_value=0.0, max_value=float(MAX_PRICE),
+                                             value=float(product_entry.get('cost_price', 0.0)), step=0.01)
             
             with col2:
-                selling_price = st.number_input("💰 Selling Price (per unit)", min_value=0.0, value=0.0, step=0.01)
+                selling_price = st.number_input("💰 Selling Price (per unit)", min_value=0.0, max_value=float(MAX_PRICE),
+                                                value=float(product_entry.get('selling_price', 0.0)), step=0.01)
+                batch = st.text_input("🔖 Batch No.", "", help="Optional - batch of the received stock")
+                expiry_input = st.date_input("⏳ Expiry Date", value=None, help="Optional - expiry of the received batch")
+                customer = st.text_input("👤 Customer (credit sale)", "", help="Optional - leave blank for a cash sale")
                 remarks = st.text_area("📝 Remarks", "")
                 
                 # Show calculated preview
                 st.markdown("### 📊 Transaction Preview")
-                preview_stock = calculate_stock_left(st.session_state.df, product, qty_received, qty_sold)
+                preview_stock = ledger.preview_stock(product, qty_received, qty_sold)
                 preview_purchase = qty_received * cost_price
                 preview_sales = qty_sold * selling_price
                 preview_profit = (selling_price - cost_price) * qty_sold
@@ -549,6 +561,21 @@ elif page == "📝 Data Entry":
                 **Total Sales:** ₹{preview_sales:,.2f}  
                 **Profit:** ₹{preview_profit:,.2f}
                 """)
+
+                if qty_received > 0 or qty_sold > 0:
+                    preview_flag = ledger.score_candidates([dict(
+                        product=product, qty_received=qty_received, qty_sold=qty_sold,
+                        cost_price=cost_price, selling_price=selling_price,
+                    )]).iloc[0]
+                    if preview_flag['Anomaly Reason']:
+                        st.warning(f"🚩 Unusual for {product}: {preview_flag['Anomaly Reason']} - please double-check")
+
+                if qty_sold > 0:
+                    preview_allocation = ledger.batch_tracker().allocate(product, qty_sold, commit=False)
+                    if any(batch_no for batch_no, _, _ in preview_allocation):
+                        st.caption("FEFO allocation: " + ", ".join(
+                            f"{batch_no or 'untracked'} × {qty:,.2f}" for batch_no, qty, _ in preview_allocation
+                        ))
             
             submitted = st.form_submit_button("✅ Add Transaction", use_container_width=True)
             
@@ -557,19 +584,21 @@ elif page == "📝 Data Entry":
                 date_str = date_input.strftime('%d/%m/%Y')
                 
                 # Add transaction
-                st.session_state.df = add_transaction(
-                    st.session_state.df,
+                ledger.add_transaction(
                     date_str,
                     product,
                     qty_received,
                     qty_sold,
                     cost_price,
                     selling_price,
-                    remarks
+                    remarks,
+                    batch=batch.strip() if qty_received > 0 else '',
+                    expiry_date=expiry_input.strftime('%d/%m/%Y') if expiry_input and qty_received > 0 else '',
+                    customer=customer.strip() if qty_sold > 0 else ''
                 )
                 
                 # Save to file
-                if save_data(st.session_state.df):
+                if save_data():
                     st.success("✅ Transaction added successfully!")
                     st.balloons()
                 else:
@@ -584,7 +613,7 @@ elif page == "📝 Data Entry":
             "📋 Paste JSON Data",
             height=300,
             placeholder='[{"date": "24/10/2025", "product_name": "Wheat", "quantity_received": 150, "quantity_sold": 23, "cost_price": 1488.00, "selling_price": 1650.00, "remarks": ""}]',
-            help="Paste your JSON data here. Each record should have: date, product_name, quantity_received, quantity_sold, cost_price, selling_price, remarks (optional)"
+            help="Paste your JSON data here. Each record should have: date, product_name, quantity_received, quantity_sold, cost_price, selling_price, remarks (optional), customer (optional - marks a credit sale)"
         )
         
         col1, col2 = st.columns([1, 1])
@@ -606,7 +635,24 @@ elif page == "📝 Data Entry":
                         if missing_cols:
                             st.error(f"❌ Missing required columns: {', '.join(missing_cols)}")
                         else:
+                            # Score each parsable record against the ledger and the records before it
+                            parsed = {}
+                            for position, record in enumerate(data):
+                                try:
+                                    parsed[position] = parse_import_record(record)
+                                except Exception:
+                                    pass
+                            reasons = pd.Series('', index=preview_df.index)
+                            if parsed:
+                                scored = ledger.score_candidates(list(parsed.values()))
+                                reasons.iloc[list(parsed)] = scored['Anomaly Reason'].values
+                            preview_df.insert(0, '🚩', reasons.map(lambda reason: '🚩' if reason else ''))
+                            preview_df['Anomaly'] = reasons
+
                             st.success(f"✅ Found {len(preview_df)} valid records")
+                            flagged_count = int((reasons != '').sum())
+                            if flagged_count:
+                                st.warning(f"🚩 {flagged_count} record(s) look unusual for their product - check them before importing")
                             st.dataframe(preview_df, use_container_width=True)
                             
                     except json.JSONDecodeError as e:
@@ -623,47 +669,21 @@ elif page == "📝 Data Entry":
                         import json
                         data = json.loads(json_input)
                         
-                        success_count = 0
-                        error_count = 0
-                        
-                        for record in data:
-                            try:
-                                # Extract data with defaults
-                                date_str = record.get('date', '')
-                                product = record.get('product_name', '')
-                                qty_received = float(record.get('quantity_received', 0))
-                                qty_sold = float(record.get('quantity_sold', 0))
-                                cost_price = float(record.get('cost_price', 0))
-                                selling_price = float(record.get('selling_price', 0))
-                                remarks = record.get('remarks', '')
-                                
-                                # Validate product exists
-                                if product not in st.session_state.products:
-                                    st.session_state.products.append(product)
-                                    save_products(st.session_state.products)
-                                
-                                # Add transaction
-                                st.session_state.df = add_transaction(
-                                    st.session_state.df,
-                                    date_str,
-                                    product,
-                                    qty_received,
-                                    qty_sold,
-                                    cost_price,
-                                    selling_price,
-                                    remarks
-                                )
-                                success_count += 1
-                                
-                            except Exception as e:
-                                error_count += 1
-                                st.error(f"❌ Error in record {success_count + error_count}: {str(e)}")
+                        # Ingest all records in one batch (unknown products are added automatically)
+                        first_new = len(ledger.df)
+                        success_count, errors = ledger.ingest_records(data)
+                        flagged_count = int((ledger.anomaly_detector().flagged() >= first_new).sum())
+                        error_count = len(errors)
+                        for record_number, error in errors:
+                            st.error(f"❌ Error in record {record_number}: {error}")
                         
                         # Save all data
-                        if save_data(st.session_state.df):
+                        if save_data():
                             st.success(f"✅ Successfully imported {success_count} records!")
                             if error_count > 0:
                                 st.warning(f"⚠️ {error_count} records had errors")
+                            if flagged_count > 0:
+                                st.warning(f"🚩 {flagged_count} imported record(s) flagged - see the Anomaly Review Queue in 📋 Ledger View")
                             st.balloons()
                         else:
                             st.error("❌ Failed to save imported data")
@@ -687,19 +707,71 @@ elif page == "📝 Data Entry":
     "quantity_sold": 23,
     "cost_price": 1488.00,
     "selling_price": 1650.00,
-    "remarks": "Optional notes"
+    "remarks": "Optional notes",
+    "batch": "B-1024",
+    "expiry_date": "30/06/2026"
   }
 ]
         ''', language='json')
         
         st.markdown("**Required Fields:** date, product_name, quantity_received, quantity_sold, cost_price, selling_price")
-        st.markdown("**Optional Fields:** remarks")
+        st.markdown("**Optional Fields:** remarks, batch, expiry_date (DD/MM/YYYY, for received stock)")
+    
+    elif entry_tab == "🔁 Branch Transfer":
+        st.markdown("### Transfer Stock Between Locations")
+        
+        if len(branches) < 2:
+            st.info("💡 Add a second location in 🏭 Product Management to transfer stock between branches.")
+        else:
+            st.info("💡 Posts a stock-out at the source and a stock-in at the destination, both at cost - together or not at all.")
+            
+            # Outside the form so the stock on hand and default cost follow the chosen route
+            transfer_col1, transfer_col2, transfer_col3 = st.columns(3)
+            with transfer_col1:
+                transfer_source = st.selectbox("📤 From", branches.names(), index=branches.names().index(location),
+                                               key="transfer_source")
+            with transfer_col2:
+                transfer_target = st.selectbox("📥 To", [name for name in branches.names() if name != transfer_source],
+                                               key="transfer_target")
+            with transfer_col3:
+                transfer_product = st.selectbox("🏷️ Product Name", ledger.products, key="transfer_product")
+            st.caption(f"In stock at {transfer_source}: "
+                       f"{float(branches[transfer_source].current_stock(transfer_product)):,.2f} units")
+            
+            with st.form("transfer_form", clear_on_submit=True):
+                form_col1, form_col2 = st.columns(2)
+                with form_col1:
+                    transfer_date = st.date_input("📅 Date", datetime.now())
+                    transfer_qty = st.number_input("📦 Quantity", min_value=0.0, max_value=float(MAX_QUANTITY),
+                                                   value=0.0, step=1.0)
+                with form_col2:
+                    transfer_cost = st.number_input(
+                        "💵 Cost Price (per unit)", min_value=0.0, max_value=float(MAX_PRICE), step=0.01,
+                        value=branches.transfer_cost(transfer_source, transfer_product)
+                    )
+                    transfer_remarks = st.text_input("📝 Remarks", "", help="Optional - e.g. vehicle number")
+                
+                if st.form_submit_button("🔁 Transfer Stock", use_container_width=True):
+                    success, message = branches.transfer(
+                        transfer_date.strftime('%d/%m/%Y'), transfer_product, transfer_qty,
+                        transfer_source, transfer_target, transfer_cost, transfer_remarks.strip()
+                    )
+                    if not success:
+                        st.warning(message)
+                    elif save_data([transfer_source, transfer_target]):
+                        st.success(message)
+                    else:
+                        st.error("❌ Failed to save transfer")
+            
+            if branches.transfers:
+                st.subheader("🔁 Recent Transfers")
+                st.dataframe(branches.transfers_df().head(20), use_container_width=True, hide_index=True)
     
     # Show recent transactions (for both tabs)
     st.markdown("---")
     st.subheader("📋 Recent Transactions")
-    if len(st.session_state.df) > 0:
-        recent_df = st.session_state.df.tail(10).iloc[::-1]  # Last 10 in reverse
+    if len(ledger.df) > 0:
+        recent_df = ledger.df.tail(10).iloc[::-1]  # Last 10 in reverse
         st.dataframe(recent_df, use_container_width=True, hide_index=True)
     else:
         st.info("No transactions yet")
@@ -713,6 +785,30 @@ elif page == "📋 Ledger View":
     if selected_product != "All Products":
         st.markdown(f"### 🏷️ Product: {selected_product}")
     
+    remarks_query = st.text_input(
+        "🔎 Search Remarks",
+        key="remarks_search",
+        placeholder="Supplier, vehicle number, customer...",
+        help="Matches transactions whose remarks contain every word (word prefixes count)"
+    )
+    if remarks_query.strip():
+        search_start = time.perf_counter()
+        with profiler.span('filtering', 'remarks search'):
+            filtered_df = ledger.search_remarks(remarks_query, selected_product_id, date_range)
+        st.caption(f"{len(filtered_df):,} matching transaction(s) in {(time.perf_counter() - search_start) * 1000:,.1f} ms")
+        if len(filtered_df) > 0:
+            matches_html = "".join(
+                f"<tr><td>#{row['Transaction ID']}</td><td>{row['Date']}</td><td>{html.escape(str(row['Product Name']))}</td>"
+                f"<td>{highlight(row['Remarks'], remarks_query)}</td></tr>"
+                for _, row in filtered_df.head(50).iterrows()
+            )
+            with st.expander(f"🖍️ Highlighted matches (first {min(len(filtered_df), 50)})", expanded=True):
+                st.markdown(
+                    "<table><tr><th>ID</th><th>Date</th><th>Product</th><th>Remarks</th></tr>"
+                    f"{matches_html}</table>",
+                    unsafe_allow_html=True
+                )
+    
     if len(filtered_df) == 0:
         st.warning("⚠️ No transactions found for the selected filter.")
     else:
@@ -724,7 +820,8 @@ elif page == "📋 Ledger View":
         
         with col2:
             if st.button("📥 CSV"):
-                csv = filtered_df.to_csv(index=False)
+                with profiler.span('export', 'ledger csv', rows=len(filtered_df)), EXPORT_SECONDS.time(format='csv'):
+                    csv = filtered_df.to_csv(index=False)
                 st.download_button(
                     label="💾 Download CSV",
                     data=csv,
@@ -734,7 +831,8 @@ elif page == "📋 Ledger View":
         
         with col3:
             if st.button("📊 Excel (Separate)"):
-                excel_data = create_excel_separate_sheets(st.session_state.df, st.session_state.products)
+                with profiler.span('export', 'ledger excel', rows=len(ledger.df)):
+                    excel_data = ledger.to_excel(date_range)
                 st.download_button(
                     label="💾 Download Excel",
                     data=excel_data,
@@ -744,25 +842,69 @@ elif page == "📋 Ledger View":
         
         with col4:
             if st.button("🔄 Refresh"):
-                st.session_state.df = init_data()
+                tenant_pool().reload(tenant)
                 st.success("Data refreshed!")
+                st.rerun()
         
-        # Format numeric columns for display
-        display_df = filtered_df.copy()
-        numeric_cols = ['Quantity Received', 'Quantity Sold', 'Stock Left', 
-                       'Cost Price', 'Selling Price', 'Total Purchase', 'Total Sales', 'Profit']
-        
-        for col in numeric_cols:
-            if col in display_df.columns:
-                display_df[col] = display_df[col].apply(lambda x: f"{x:,.2f}")
+        edit_mode = st.toggle("✏️ Edit Mode", help="Edit quantities, prices and details of existing transactions in place")
         
-        # Display table
-        st.dataframe(
-            display_df,
-            use_container_width=True,
-            hide_index=True,
-            height=600
-        )
+        if edit_mode:
+            # Editable grid - derived columns are recomputed on commit
+            st.caption("Derived columns (Stock Left, Total Purchase, Total Sales, Profit) update when edits are committed. "
+                       "Opening balances and branch transfers are not listed.")
+            protected_ids = ledger.non_trading_ids()
+            editable_df = filtered_df[~filtered_df['Transaction ID'].isin(protected_ids)].reset_index(drop=True) \
+                if protected_ids else filtered_df
+            st.data_editor(
+                editable_df,
+                use_container_width=True,
+                hide_index=True,
+                height=600,
+                num_rows="fixed",
+                disabled=[col for col in editable_df.columns if col not in EDITABLE_FIELDS],
+                key="ledger_editor"
+            )
+            
+            pending_edits = st.session_state.get("ledger_editor", {}).get("edited_rows", {})
+            edit_col1, edit_col2 = st.columns([3, 1])
+            with edit_col1:
+                st.markdown(f"**Pending Edits:** {len(pending_edits)} row(s)")
+            with edit_col2:
+                if st.button("💾 Commit Edits", use_container_width=True, disabled=not pending_edits):
+                    edits = {
+                        editable_df['Transaction ID'].iat[int(row)]: changes
+                        for row, changes in pending_edits.items()
+                    }
+                    success, message = ledger.edit(edits)
+                    if success:
+                        if save_data():
+                            del st.session_state["ledger_editor"]
+                            st.success(message)
+                            st.rerun()
+                        else:
+                            st.error("Failed to save changes")
+                    else:
+                        st.warning(message)
+        else:
+            # Format numeric columns for display
+            display_df = filtered_df.copy()
+            flagged_ids = set(ledger.review_queue()['Transaction ID'])
+            if flagged_ids:
+                display_df.insert(0, '🚩', display_df['Transaction ID'].map(lambda txn_id: '🚩' if txn_id in flagged_ids else ''))
+            numeric_cols = ['Quantity Received', 'Quantity Sold', 'Stock Left', 
+                           'Cost Price', 'Selling Price', 'Total Purchase', 'Total Sales', 'Profit']
+            
+            for col in numeric_cols:
+                if col in display_df.columns:
+                    display_df[col] = display_df[col].apply(lambda x: f"{x:,.2f}")
+            
+            # Display table
+            st.dataframe(
+                display_df,
+                use_container_width=True,
+                hide_index=True,
+                height=600
+            )
         
         # Summary Statistics
         st.markdown("---")
@@ -771,16 +913,47 @@ elif page == "📋 Ledger View":
         sum_col1, sum_col2, sum_col3, sum_col4 = st.columns(4)
         
         with sum_col1:
-            st.metric("📦 Total Received", f"{filtered_df['Quantity Received'].sum():,.2f}")
+            st.metric("📦 Total Received", f"{quantity_sum(filtered_df['Quantity Received']):,.2f}")
         
         with sum_col2:
-            st.metric("🛒 Total Sold", f"{filtered_df['Quantity Sold'].sum():,.2f}")
+            st.metric("🛒 Total Sold", f"{quantity_sum(filtered_df['Quantity Sold']):,.2f}")
         
         with sum_col3:
-            st.metric("💰 Total Revenue", f"₹{filtered_df['Total Sales'].sum():,.2f}")
+            st.metric("💰 Total Revenue", f"₹{money_sum(filtered_df['Total Sales']):,.2f}")
         
         with sum_col4:
-            st.metric("📈 Total Profit", f"₹{filtered_df['Profit'].sum():,.2f}")
+            st.metric("📈 Total Profit", f"₹{money_sum(filtered_df['Profit']):,.2f}")
+        
+        # Anomaly Review Queue
+        st.markdown("---")
+        st.subheader("🚩 Anomaly Review Queue")
+        review_queue = ledger.review_queue()
+        if len(review_queue) == 0:
+            st.success("✅ No unusual transactions waiting for review")
+        else:
+            st.caption("Transactions far outside their product's recent quantities or prices. "
+                       "Fix typos in ✏️ Edit Mode, or mark genuine ones as correct.")
+            st.dataframe(
+                review_queue[['Anomaly Score', 'Anomaly Reason', 'Transaction ID', 'Date', 'Product Name',
+                              'Quantity Received', 'Quantity Sold', 'Cost Price', 'Selling Price', 'Remarks']],
+                use_container_width=True,
+                hide_index=True
+            )
+            review_col1, review_col2 = st.columns([3, 1])
+            with review_col1:
+                reviewed_ids = st.multiselect("Transactions to mark as correct", review_queue['Transaction ID'].tolist(),
+                                              key="anomaly_reviewed")
+            with review_col2:
+                if st.button("✅ Mark as Correct", use_container_width=True, disabled=not reviewed_ids):
+                    success, message = ledger.mark_reviewed(reviewed_ids)
+                    if success:
+                        if save_data():
+                            st.success(message)
+                            st.rerun()
+                        else:
+                            st.error("Failed to save changes")
+                    else:
+                        st.warning(message)
         
         # Delete Transaction Section
         st.markdown("---")
@@ -790,16 +963,15 @@ elif page == "📋 Ledger View":
         # Initialize deletion state
         if 'delete_confirm' not in st.session_state:
             st.session_state.delete_confirm = False
-        if 'delete_product_selected' not in st.session_state:
-            st.session_state.delete_product_selected = None
-        if 'delete_date_selected' not in st.session_state:
-            st.session_state.delete_date_selected = None
+        if 'delete_id_selected' not in st.session_state:
+            st.session_state.delete_id_selected = None
         
+        ledger_index = ledger.index()
         del_col1, del_col2, del_col3 = st.columns([2, 2, 1])
         
         with del_col1:
             # Get products that have transactions
-            products_with_transactions = st.session_state.df['Product Name'].unique().tolist() if len(st.session_state.df) > 0 else []
+            products_with_transactions = list(ledger_index['products'].keys())
             
             if products_with_transactions:
                 delete_product = st.selectbox(
@@ -814,49 +986,52 @@ elif page == "📋 Ledger View":
         
         with del_col2:
             if delete_product:
-                # Get dates for selected product
-                product_dates = st.session_state.df[st.session_state.df['Product Name'] == delete_product]['Date'].unique().tolist()
-                
-                if product_dates:
-                    delete_date = st.selectbox(
-                        "Select Date",
-                        product_dates,
-                        key="delete_date_select",
-                        help="Select the date of the transaction to delete"
+                # Transactions of the selected product, straight from the product index
+                product_rows = ledger.product_df(delete_product)
+                row_labels = {
+                    txn_id: f"#{txn_id} | {date} | +{received:,.2f} / -{sold:,.2f}"
+                    for txn_id, date, received, sold in zip(
+                        product_rows['Transaction ID'], product_rows['Date'],
+                        product_rows['Quantity Received'], product_rows['Quantity Sold']
                     )
-                else:
-                    st.info("No dates available for this product")
-                    delete_date = None
+                }
+                delete_id = st.selectbox(
+                    "Select Transaction",
+                    list(row_labels.keys()),
+                    format_func=row_labels.get,
+                    key="delete_id_select",
+                    help="Select the transaction to delete"
+                )
             else:
-                delete_date = None
+                delete_id = None
         
         with del_col3:
             st.write("")  # Spacing
             st.write("")  # Spacing
-            if delete_product and delete_date:
+            if delete_id is not None:
                 if not st.session_state.delete_confirm:
                     # First click - Request confirmation
                     if st.button("🗑️ Delete", type="primary", use_container_width=True, key="delete_btn"):
                         st.session_state.delete_confirm = True
-                        st.session_state.delete_product_selected = delete_product
-                        st.session_state.delete_date_selected = delete_date
+                        st.session_state.delete_id_selected = delete_id
                         st.rerun()
                 else:
                     # Confirmation mode - Show confirm/cancel
                     if st.button("⚠️ Confirm", type="primary", use_container_width=True, key="confirm_btn"):
-                        new_df, success, message = delete_transaction(
-                            st.session_state.df.copy(),
-                            st.session_state.delete_product_selected,
-                            st.session_state.delete_date_selected
-                        )
+                        # A transfer's two sides are deleted together, in both locations
+                        delete_transfer = branches.transfer_of(location, st.session_state.delete_id_selected)
+                        if delete_transfer is not None:
+                            success, message = branches.delete_transfer(delete_transfer['Transfer ID'])
+                            delete_locations = [delete_transfer['From'], delete_transfer['To']]
+                        else:
+                            success, message = ledger.delete(st.session_state.delete_id_selected)
+                            delete_locations = None
                         
                         if success:
-                            st.session_state.df = new_df
-                            if save_data(st.session_state.df):
+                            if save_data(delete_locations):
                                 st.success(message)
                                 st.session_state.delete_confirm = False
-                                st.session_state.delete_product_selected = None
-                                st.session_state.delete_date_selected = None
+                                st.session_state.delete_id_selected = None
                                 st.rerun()
                             else:
                                 st.error("Failed to save changes")
@@ -866,34 +1041,163 @@ elif page == "📋 Ledger View":
                             st.session_state.delete_confirm = False
         
         # Show preview if in confirmation mode
-        if st.session_state.delete_confirm and st.session_state.delete_product_selected and st.session_state.delete_date_selected:
+        if st.session_state.delete_confirm and st.session_state.delete_id_selected is not None:
             st.markdown("---")
-            st.warning(f"⚠️ **Confirm Deletion:** {st.session_state.delete_product_selected} | {st.session_state.delete_date_selected}")
+            st.warning(f"⚠️ **Confirm Deletion:** Transaction #{st.session_state.delete_id_selected}")
             
-            preview_df = st.session_state.df[
-                (st.session_state.df['Product Name'] == st.session_state.delete_product_selected) & 
-                (st.session_state.df['Date'] == st.session_state.delete_date_selected)
-            ]
+            delete_position = ledger_index['ids'].get(st.session_state.delete_id_selected)
             
-            if not preview_df.empty:
+            if delete_position is not None:
+                preview_df = ledger.df.iloc[[delete_position]]
                 st.dataframe(preview_df, use_container_width=True, hide_index=True)
+                preview_transfer = branches.transfer_of(location, st.session_state.delete_id_selected)
+                if preview_transfer is not None:
+                    st.info(f"🔁 This is one side of Transfer #{preview_transfer['Transfer ID']} - its rows in "
+                            f"{preview_transfer['From']} and {preview_transfer['To']} are both deleted.")
                 
                 col1, col2 = st.columns(2)
                 with col2:
                     if st.button("❌ Cancel", use_container_width=True, key="cancel_btn"):
                         st.session_state.delete_confirm = False
-                        st.session_state.delete_product_selected = None
-                        st.session_state.delete_date_selected = None
+                        st.session_state.delete_id_selected = None
+                        st.rerun()
+
+        # Bulk Operations Section
+        st.markdown("---")
+        st.subheader("🧹 Bulk Operations")
+        st.warning("⚠️ Bulk operations change every transaction matching the filter in a single commit.")
+        
+        bulk_col1, bulk_col2, bulk_col3 = st.columns(3)
+        with bulk_col1:
+            bulk_product = st.selectbox(
+                "Product",
+                ["All Products"] + ledger.products_with_transactions(),
+                key="bulk_product"
+            )
+        with bulk_col2:
+            bulk_dates = st.date_input("Date Range", value=(), key="bulk_dates",
+                                       help="Leave empty to match all dates")
+        with bulk_col3:
+            bulk_remarks = st.text_input("Remarks contain", "", key="bulk_remarks")
+        
+        bulk_range = bulk_dates if isinstance(bulk_dates, (tuple, list)) and len(bulk_dates) == 2 else None
+        bulk_mask = ledger.filter_mask(bulk_product, bulk_range, bulk_remarks)
+        bulk_count = int(bulk_mask.sum())
+        
+        bulk_action = st.radio(
+            "Action",
+            ["🗑️ Delete Rows", "💵 Set Prices", "📊 Adjust Prices (%)"],
+            horizontal=True,
+            key="bulk_action"
+        )
+        
+        new_cost = new_selling = None
+        if bulk_action != "🗑️ Delete Rows":
+            percent_mode = bulk_action == "📊 Adjust Prices (%)"
+            price_col1, price_col2 = st.columns(2)
+            with price_col1:
+                change_cost = st.checkbox("Change Cost Price", key="bulk_change_cost")
+                if change_cost:
+                    new_cost = st.number_input(
+                        "Cost Change (%)" if percent_mode else "New Cost Price",
+                        min_value=-100.0 if percent_mode else 0.0, value=0.0, step=0.01, key="bulk_cost"
+                    )
+            with price_col2:
+                change_selling = st.checkbox("Change Selling Price", key="bulk_change_selling")
+                if change_selling:
+                    new_selling = st.number_input(
+                        "Selling Change (%)" if percent_mode else "New Selling Price",
+                        min_value=-100.0 if percent_mode else 0.0, value=0.0, step=0.01, key="bulk_selling"
+                    )
+        
+        st.markdown(f"**Matching Transactions:** {bulk_count}")
+        if bulk_count > 0:
+            st.dataframe(ledger.df.loc[bulk_mask].head(20), use_container_width=True, hide_index=True)
+            
+            bulk_confirm = st.checkbox(f"I confirm this change affects {bulk_count} transaction(s)", key="bulk_confirm")
+            if st.button("✅ Apply Bulk Operation", type="primary", disabled=not bulk_confirm, key="bulk_apply"):
+                if bulk_action == "🗑️ Delete Rows":
+                    success, message = ledger.bulk_delete(bulk_mask)
+                else:
+                    success, message = ledger.bulk_adjust_prices(
+                        bulk_mask, new_cost, new_selling,
+                        percent=bulk_action == "📊 Adjust Prices (%)"
+                    )
+                
+                if success:
+                    if save_data():
+                        st.success(message)
+                        del st.session_state["bulk_confirm"]
                         st.rerun()
+                    else:
+                        st.error("Failed to save changes")
+                else:
+                    st.warning(message)
+
+        # Archive Section
+        st.markdown("---")
+        st.subheader("🗄️ Archive Closed Years")
+        st.info("Closed fiscal years (April–March) move to compressed cold storage. Each product gets one "
+                "opening-balance row that carries its stock, cost basis and cumulative totals. "
+                "Point-in-time queries before the cut-off read the archive.")
+        
+        if ledger.archives:
+            st.dataframe(
+                pd.DataFrame(ledger.archives)[['through', 'file', 'rows']].rename(
+                    columns={'through': 'Archived Through', 'file': 'File', 'rows': 'Transactions'}),
+                use_container_width=True, hide_index=True
+            )
+        
+        closed_years = closed_fiscal_years(ledger.df, after=ledger.archived_through())
+        if closed_years:
+            archive_through = st.selectbox(
+                "Archive through",
+                closed_years,
+                index=len(closed_years) - 1,
+                format_func=lambda d: f"FY {d.year - 1}-{str(d.year)[-2:]} (to {d.strftime('%d/%m/%Y')})",
+                key="archive_through"
+            )
+            archive_count = int((parse_dates(ledger.df['Date']) <= pd.Timestamp(archive_through)).sum())
+            st.markdown(f"**Transactions to Archive:** {archive_count}")
+            
+            archive_confirm = st.checkbox(f"I confirm archiving {archive_count} transaction(s)", key="archive_confirm")
+            if st.button("🗄️ Archive", type="primary", disabled=not archive_confirm, key="archive_apply"):
+                success, message = ledger.archive(archive_through)
+                if success:
+                    if save_data():
+                        st.success(message)
+                        del st.session_state["archive_confirm"]
+                        st.rerun()
+                    else:
+                        st.error("Failed to save changes")
+                else:
+                    st.warning(message)
+        else:
+            st.caption("No closed fiscal years left to archive")
 
 # ========================================
 # PAGE: PROFIT ANALYSIS
 # ========================================
 elif page == "📈 Profit Analysis":
     st.title("📈 Comprehensive Profit Analysis")
-    
-    if len(st.session_state.df) == 0:
-        st.warning("⚠️ No data available for analysis. Please add transactions first.")
+
+    costing_method = st.radio(
+        "💵 Costing Method",
+        COSTING_METHODS,
+        horizontal=True,
+        help="As Entered uses the cost price typed on each sale; FIFO and Weighted Average cost sales from received lots"
+    )
+    with profiler.span('aggregation', f'costing ({costing_method})'):
+        analysis_df = ledger.select(date_range=date_range, method=costing_method)
+    # Transfers to other locations are stock moves, not purchases or sales
+    if ledger.transfer_ids:
+        analysis_df = analysis_df[~analysis_df['Transaction ID'].isin(ledger.transfer_ids)].reset_index(drop=True)
+
+    if len(analysis_df) == 0:
+        if date_range and len(ledger.df) > 0:
+            st.warning("⚠️ No transactions in the selected period.")
+        else:
+            st.warning("⚠️ No data available for analysis. Please add transactions first.")
     else:
         # Tab selection for Individual vs Combined
         analysis_tab = st.radio(
@@ -911,7 +1215,7 @@ elif page == "📈 Profit Analysis":
             st.subheader("📊 Product-Wise Profit Analysis")
             
             # Product selector
-            products_with_data = st.session_state.df['Product Name'].unique().tolist()
+            products_with_data = analysis_df['Product Name'].unique().tolist()
             
             if len(products_with_data) == 0:
                 st.info("No products with transaction data yet.")
@@ -923,7 +1227,7 @@ elif page == "📈 Profit Analysis":
                 )
                 
                 # Filter data for selected product
-                product_data = st.session_state.df[st.session_state.df['Product Name'] == selected_analysis_product]
+                product_data = analysis_df[analysis_df['Product Name'] == selected_analysis_product]
                 
                 st.markdown(f"### 📦 Analysis for: **{selected_analysis_product}**")
                 st.markdown("---")
@@ -932,11 +1236,11 @@ elif page == "📈 Profit Analysis":
                 kpi_col1, kpi_col2, kpi_col3, kpi_col4 = st.columns(4)
                 
                 with kpi_col1:
-                    total_received = product_data['Quantity Received'].sum()
+                    total_received = quantity_sum(product_data['Quantity Received'])
                     st.metric("📦 Total Received", f"{total_received:,.0f} units")
                 
                 with kpi_col2:
-                    total_sold = product_data['Quantity Sold'].sum()
+                    total_sold = quantity_sum(product_data['Quantity Sold'])
                     st.metric("🛒 Total Sold", f"{total_sold:,.0f} units")
                 
                 with kpi_col3:
@@ -955,15 +1259,15 @@ elif page == "📈 Profit Analysis":
                 fin_col1, fin_col2, fin_col3, fin_col4 = st.columns(4)
                 
                 with fin_col1:
-                    total_purchase = product_data['Total Purchase'].sum()
+                    total_purchase = money_sum(product_data['Total Purchase'])
                     st.metric("💵 Total Investment", f"₹{total_purchase:,.2f}")
                 
                 with fin_col2:
-                    total_revenue = product_data['Total Sales'].sum()
+                    total_revenue = money_sum(product_data['Total Sales'])
                     st.metric("💰 Total Revenue", f"₹{total_revenue:,.2f}")
                 
                 with fin_col3:
-                    total_profit = product_data['Profit'].sum()
+                    total_profit = money_sum(product_data['Profit'])
                     st.metric("📈 Total Profit", f"₹{total_profit:,.2f}")
                 
                 with fin_col4:
@@ -977,65 +1281,140 @@ elif page == "📈 Profit Analysis":
                 
                 with chart_col1:
                     st.subheader("📉 Stock Movement Over Time")
-                    fig_stock = go.Figure()
-                    fig_stock.add_trace(go.Scatter(
-                        x=list(range(1, len(product_data) + 1)),
-                        y=product_data['Stock Left'],
-                        mode='lines+markers',
-                        name='Stock Level',
-                        line=dict(color='#00D9FF', width=3),
-                        marker=dict(size=8, color='#00D9FF'),
-                        fill='tozeroy',
-                        fillcolor='rgba(0, 217, 255, 0.2)'
-                    ))
-                    fig_stock.update_layout(
-                        template='plotly_dark',
-                        xaxis_title='Transaction Number',
-                        yaxis_title='Stock (Units)',
-                        hovermode='x unified',
-                        height=400
-                    )
-                    st.plotly_chart(fig_stock, use_container_width=True)
+                    with profiler.span('charting', 'stock movement', rows=len(product_data)):
+                        fig_stock = go.Figure()
+                        fig_stock.add_trace(go.Scatter(
+                            x=list(range(1, len(product_data) + 1)),
+                            y=product_data['Stock Left'],
+                            mode='lines+markers',
+                            name='Stock Level',
+                            line=dict(color='#00D9FF', width=3),
+                            marker=dict(size=8, color='#00D9FF'),
+                            fill='tozeroy',
+                            fillcolor='rgba(0, 217, 255, 0.2)'
+                        ))
+                        fig_stock.update_layout(
+                            template='plotly_dark',
+                            xaxis_title='Transaction Number',
+                            yaxis_title='Stock (Units)',
+                            hovermode='x unified',
+                            height=400
+                        )
+                        st.plotly_chart(fig_stock, use_container_width=True)
                 
                 with chart_col2:
                     st.subheader("💰 Cumulative Profit")
-                    cumulative_profit = product_data['Profit'].cumsum()
-                    fig_profit = go.Figure()
-                    fig_profit.add_trace(go.Scatter(
-                        x=list(range(1, len(product_data) + 1)),
-                        y=cumulative_profit,
-                        mode='lines+markers',
-                        name='Cumulative Profit',
-                        line=dict(color='#00FF7F', width=3),
-                        marker=dict(size=8, color='#00FF7F'),
-                        fill='tozeroy',
-                        fillcolor='rgba(0, 255, 127, 0.2)'
-                    ))
-                    fig_profit.update_layout(
-                        template='plotly_dark',
-                        xaxis_title='Transaction Number',
-                        yaxis_title='Cumulative Profit (₹)',
-                        hovermode='x unified',
-                        height=400
-                    )
-                    st.plotly_chart(fig_profit, use_container_width=True)
+                    with profiler.span('charting', 'cumulative profit', rows=len(product_data)):
+                        cumulative_profit = product_data['Profit'].cumsum()
+                        fig_profit = go.Figure()
+                        fig_profit.add_trace(go.Scatter(
+                            x=list(range(1, len(product_data) + 1)),
+                            y=cumulative_profit,
+                            mode='lines+markers',
+                            name='Cumulative Profit',
+                            line=dict(color='#00FF7F', width=3),
+                            marker=dict(size=8, color='#00FF7F'),
+                            fill='tozeroy',
+                            fillcolor='rgba(0, 255, 127, 0.2)'
+                        ))
+                        fig_profit.update_layout(
+                            template='plotly_dark',
+                            xaxis_title='Transaction Number',
+                            yaxis_title='Cumulative Profit (₹)',
+                            hovermode='x unified',
+                            height=400
+                        )
+                        st.plotly_chart(fig_profit, use_container_width=True)
+                
+                st.markdown("---")
+                
+                # Price & Margin Trends
+                st.subheader("💹 Price & Margin Trends")
+                trend_window = st.select_slider(
+                    "Rolling window", options=list(TREND_WINDOWS), value=DEFAULT_TREND_WINDOW, key="trend_window",
+                    format_func=lambda days: f"{days} days",
+                    help="Averages are weighted by quantity over the trailing window"
+                )
+                with profiler.span('aggregation', 'price trends'):
+                    trend_df, changes_df = ledger.price_trends(selected_analysis_product, costing_method, trend_window)
+                if date_range:
+                    # Windows reach back before the period, so slice after computing
+                    trend_start, trend_end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])
+                    trend_df = trend_df[trend_df['Date'].between(trend_start, trend_end)]
+                    changes_df = changes_df[changes_df['Date'].between(trend_start, trend_end)]
+                
+                if len(trend_df) == 0:
+                    st.info("No dated transactions for this product in the selected period.")
+                else:
+                    selling_changes = changes_df[changes_df['Price'] == 'Selling Price']
+                    cost_changes = changes_df[changes_df['Price'] == 'Cost Price']
+                    trend_col1, trend_col2, trend_col3 = st.columns(3)
+                    with trend_col1:
+                        st.metric("🏷️ Price Changes", len(changes_df),
+                                  help=f"{len(selling_changes)} selling, {len(cost_changes)} cost")
+                    with trend_col2:
+                        st.metric("💰 Selling Price Effect", f"₹{selling_changes['Profit Effect'].sum():,.2f}",
+                                  help="Price difference × units sold until the next selling price change")
+                    with trend_col3:
+                        st.metric("💵 Cost Price Effect", f"₹{cost_changes['Profit Effect'].sum():,.2f}",
+                                  help="Cost difference × units sold until the next cost price change")
+                    
+                    with profiler.span('charting', 'price trends', rows=len(trend_df)):
+                        fig_trend = go.Figure()
+                        fig_trend.add_trace(go.Scatter(
+                            x=trend_df['Date'], y=trend_df['Avg Selling Price'], mode='lines',
+                            name='Avg Selling Price', line=dict(color='#00FF7F', width=3)
+                        ))
+                        fig_trend.add_trace(go.Scatter(
+                            x=trend_df['Date'], y=trend_df['Avg Cost Price'], mode='lines',
+                            name='Avg Cost Price', line=dict(color='#FF6B6B', width=3)
+                        ))
+                        fig_trend.add_trace(go.Scatter(
+                            x=trend_df['Date'], y=trend_df['Margin %'], mode='lines',
+                            name='Margin %', yaxis='y2', line=dict(color='#00D9FF', width=2, dash='dot')
+                        ))
+                        for changes, color in [(selling_changes, '#00FF7F'), (cost_changes, '#FF6B6B')]:
+                            if len(changes) > 0:
+                                fig_trend.add_trace(go.Scatter(
+                                    x=changes['Date'], y=changes['To'], mode='markers',
+                                    name=f"{changes['Price'].iat[0]} Change",
+                                    marker=dict(size=10, color=color, symbol='diamond'),
+                                    customdata=changes[['From', 'Change %', 'Profit Effect']].values,
+                                    hovertemplate='₹%{customdata[0]:,.2f} → ₹%{y:,.2f} (%{customdata[1]:+.1f}%)'
+                                                  '<br>Profit effect ₹%{customdata[2]:,.2f}'
+                                ))
+                        fig_trend.update_layout(
+                            template='plotly_dark',
+                            xaxis_title='Date',
+                            yaxis_title='Price (₹ per unit)',
+                            yaxis2=dict(title='Margin %', overlaying='y', side='right', showgrid=False),
+                            hovermode='x unified',
+                            height=450
+                        )
+                        st.plotly_chart(fig_trend, use_container_width=True)
+                    st.caption(f"Quantity-weighted averages over the trailing {trend_window} days, with margin "
+                               f"under {costing_method} costing. ◆ marks a price change.")
+                    
+                    if len(changes_df) > 0:
+                        st.markdown("**🏷️ Price Change Points**")
+                        changes_display = changes_df.sort_values('Date', ascending=False, kind='mergesort').copy()
+                        changes_display['Date'] = changes_display['Date'].dt.strftime('%d/%m/%Y')
+                        st.dataframe(changes_display, use_container_width=True, hide_index=True)
                 
                 st.markdown("---")
                 
                 # Transaction History Table
                 st.subheader("📋 Transaction History")
                 display_cols = ['Date', 'Quantity Received', 'Quantity Sold', 'Stock Left', 
-                               'Cost Price', 'Selling Price', 'Total Purchase', 'Total Sales', 'Profit', 'Remarks']
+                               'Cost Price', 'Selling Price', 'Total Purchase', 'Total Sales', 'COGS', 'Profit', 'Remarks']
                 st.dataframe(product_data[display_cols], use_container_width=True, hide_index=True)
                 
                 # Download individual product report
                 st.markdown("---")
                 st.subheader("📥 Export Product Report")
                 
-                excel_single = BytesIO()
-                with pd.ExcelWriter(excel_single, engine='openpyxl') as writer:
-                    product_data.to_excel(writer, sheet_name=selected_analysis_product[:31], index=False)
-                excel_single.seek(0)
+                with profiler.span('export', 'product report', rows=len(product_data)):
+                    excel_single = create_excel_report({selected_analysis_product: product_data})
                 
                 st.download_button(
                     label=f"📊 Download {selected_analysis_product} Report (Excel)",
@@ -1057,19 +1436,19 @@ elif page == "📈 Profit Analysis":
             overall_col1, overall_col2, overall_col3, overall_col4, overall_col5 = st.columns(5)
             
             with overall_col1:
-                total_products = len(st.session_state.df['Product Name'].unique())
+                total_products = len(analysis_df['Product Name'].unique())
                 st.metric("🏷️ Active Products", total_products)
             
             with overall_col2:
-                total_investment = st.session_state.df['Total Purchase'].sum()
+                total_investment = money_sum(analysis_df['Total Purchase'])
                 st.metric("💵 Total Investment", f"₹{total_investment:,.0f}")
             
             with overall_col3:
-                total_revenue = st.session_state.df['Total Sales'].sum()
+                total_revenue = money_sum(analysis_df['Total Sales'])
                 st.metric("💰 Total Revenue", f"₹{total_revenue:,.0f}")
             
             with overall_col4:
-                total_profit = st.session_state.df['Profit'].sum()
+                total_profit = money_sum(analysis_df['Profit'])
                 st.metric("📈 Total Profit", f"₹{total_profit:,.0f}")
             
             with overall_col5:
@@ -1081,31 +1460,9 @@ elif page == "📈 Profit Analysis":
             # Product-wise comparison
             st.subheader("📊 Product-Wise Comparison")
             
-            comparison_df = st.session_state.df.groupby('Product Name').agg({
-                'Quantity Received': 'sum',
-                'Quantity Sold': 'sum',
-                'Total Purchase': 'sum',
-                'Total Sales': 'sum',
-                'Profit': 'sum'
-            }).reset_index()
-            
-            # Add current stock and profit margin
-            current_stocks = []
-            profit_margins = []
-            for product in comparison_df['Product Name']:
-                product_df = st.session_state.df[st.session_state.df['Product Name'] == product]
-                current_stocks.append(product_df.iloc[-1]['Stock Left'])
-                margin = (comparison_df[comparison_df['Product Name'] == product]['Profit'].values[0] / 
-                         comparison_df[comparison_df['Product Name'] == product]['Total Sales'].values[0] * 100) \
-                         if comparison_df[comparison_df['Product Name'] == product]['Total Sales'].values[0] > 0 else 0
-                profit_margins.append(margin)
-            
-            comparison_df['Current Stock'] = current_stocks
-            comparison_df['Profit Margin %'] = profit_margins
-            
-            # Reorder columns
-            comparison_df = comparison_df[['Product Name', 'Current Stock', 'Quantity Received', 'Quantity Sold',
-                                          'Total Purchase', 'Total Sales', 'Profit', 'Profit Margin %']]
+            # Totals, current stock and profit margin per product
+            with profiler.span('aggregation', 'product comparison'):
+                comparison_df = ledger.product_summary(costing_method, date_range)
             
             # Format for display
             display_comparison = comparison_df.copy()
@@ -1124,35 +1481,37 @@ elif page == "📈 Profit Analysis":
             
             with viz_col1:
                 st.subheader("💰 Revenue by Product")
-                fig_revenue = px.bar(
-                    comparison_df,
-                    x='Product Name',
-                    y='Total Sales',
-                    color='Profit',
-                    color_continuous_scale='Turbo',
-                    labels={'Total Sales': 'Revenue (₹)', 'Profit': 'Profit (₹)'}
-                )
-                fig_revenue.update_layout(
-                    template='plotly_dark',
-                    height=400,
-                    xaxis_tickangle=-45
-                )
-                st.plotly_chart(fig_revenue, use_container_width=True)
+                with profiler.span('charting', 'revenue bar'):
+                    fig_revenue = px.bar(
+                        comparison_df,
+                        x='Product Name',
+                        y='Total Sales',
+                        color='Profit',
+                        color_continuous_scale='Turbo',
+                        labels={'Total Sales': 'Revenue (₹)', 'Profit': 'Profit (₹)'}
+                    )
+                    fig_revenue.update_layout(
+                        template='plotly_dark',
+                        height=400,
+                        xaxis_tickangle=-45
+                    )
+                    st.plotly_chart(fig_revenue, use_container_width=True)
             
             with viz_col2:
                 st.subheader("📈 Profit Distribution")
-                fig_profit_pie = px.pie(
-                    comparison_df,
-                    values='Profit',
-                    names='Product Name',
-                    hole=0.4,
-                    color_discrete_sequence=px.colors.sequential.Turbo
-                )
-                fig_profit_pie.update_layout(
-                    template='plotly_dark',
-                    height=400
-                )
-                st.plotly_chart(fig_profit_pie, use_container_width=True)
+                with profiler.span('charting', 'profit distribution'):
+                    fig_profit_pie = px.pie(
+                        comparison_df,
+                        values='Profit',
+                        names='Product Name',
+                        hole=0.4,
+                        color_discrete_sequence=px.colors.sequential.Turbo
+                    )
+                    fig_profit_pie.update_layout(
+                        template='plotly_dark',
+                        height=400
+                    )
+                    st.plotly_chart(fig_profit_pie, use_container_width=True)
             
             st.markdown("---")
             
@@ -1188,7 +1547,8 @@ elif page == "📈 Profit Analysis":
             
             with col1:
                 # Excel with separate sheets
-                excel_combined = create_excel_separate_sheets(st.session_state.df, st.session_state.products)
+                with profiler.span('export', 'combined excel', rows=len(analysis_df)):
+                    excel_combined = create_excel_separate_sheets(analysis_df, ledger.products)
                 st.download_button(
                     label="📊 Download All Products (Separate Sheets)",
                     data=excel_combined,
@@ -1199,11 +1559,8 @@ elif page == "📈 Profit Analysis":
             
             with col2:
                 # Excel with summary
-                excel_summary = BytesIO()
-                with pd.ExcelWriter(excel_summary, engine='openpyxl') as writer:
-                    comparison_df.to_excel(writer, sheet_name='Summary', index=False)
-                    st.session_state.df.to_excel(writer, sheet_name='All Transactions', index=False)
-                excel_summary.seek(0)
+                with profiler.span('export', 'summary excel', rows=len(analysis_df)):
+                    excel_summary = create_excel_report({'Summary': comparison_df, 'All Transactions': analysis_df})
                 
                 st.download_button(
                     label="📊 Download Summary Report",
@@ -1213,6 +1570,95 @@ elif page == "📈 Profit Analysis":
                     use_container_width=True
                 )
 
+# ========================================
+# PAGE: CUSTOMER CREDIT (UDHAAR)
+# ========================================
+elif page == "💳 Customer Credit":
+    st.title("💳 Customer Credit (Udhaar)")
+    st.markdown("Sales entered with a customer are on credit. Payments settle the oldest dues first.")
+    
+    # Record Payment
+    st.subheader("💵 Record Payment")
+    with st.form("payment_form", clear_on_submit=True):
+        pay_col1, pay_col2, pay_col3 = st.columns(3)
+        with pay_col1:
+            payment_date = st.date_input("📅 Date", datetime.now())
+        with pay_col2:
+            payment_customer = st.selectbox("👤 Customer", ledger.customers() + ["➕ Other"])
+            other_customer = st.text_input("Other customer", "", help="Used when ➕ Other is selected")
+        with pay_col3:
+            payment_amount = st.number_input("💰 Amount", min_value=0.0, max_value=float(MAX_PAYMENT), value=0.0,
+                                             step=0.01)
+        payment_remarks = st.text_input("📝 Remarks", "")
+        if st.form_submit_button("✅ Record Payment", use_container_width=True):
+            success, message = ledger.add_payment(
+                payment_date.strftime('%d/%m/%Y'),
+                other_customer if payment_customer == "➕ Other" else payment_customer,
+                payment_amount,
+                payment_remarks
+            )
+            if success and save_data():
+                st.success(message)
+            elif success:
+                st.error("❌ Failed to save payment")
+            else:
+                st.warning(message)
+    
+    with profiler.span('aggregation', 'receivables'):
+        balances_df = ledger.customer_balances()
+        aging_df = ledger.aging_report()
+    
+    # KPI Cards
+    kpi_col1, kpi_col2, kpi_col3 = st.columns(3)
+    with kpi_col1:
+        st.metric("💰 Total Outstanding", f"₹{money_sum(balances_df['Balance'].clip(lower=0)):,.2f}")
+    with kpi_col2:
+        st.metric("👥 Customers with Dues", int((balances_df['Balance'] > 0).sum()))
+    with kpi_col3:
+        overdue = money_sum(aging_df['61-90 days']) + money_sum(aging_df['90+ days']) if len(aging_df) else 0
+        st.metric("⏰ Overdue (60+ days)", f"₹{overdue:,.2f}")
+    
+    st.markdown("---")
+    
+    if len(balances_df) == 0:
+        st.info("No credit sales yet. Enter a customer on a sale in 📝 Data Entry.")
+    else:
+        # Balances and Aging
+        st.markdown("---")
+        st.subheader("📒 Customer Balances")
+        st.dataframe(balances_df, use_container_width=True, hide_index=True)
+        
+        st.subheader("⏳ Aging Report")
+        st.caption("Unsettled credit sales by age. Only open invoices are kept, so this does not rescan past sales.")
+        st.dataframe(aging_df, use_container_width=True, hide_index=True)
+        
+        # Statement
+        st.markdown("---")
+        st.subheader("🧾 Customer Statement")
+        statement_customer = st.selectbox("Select Customer", balances_df['Customer'].tolist(), key="statement_customer")
+        st.dataframe(ledger.customer_statement(statement_customer), use_container_width=True, hide_index=True)
+        
+        with st.expander("🗑️ Delete a Payment"):
+            customer_payments = [p for p in ledger.payments if p['Customer'] == statement_customer]
+            if customer_payments:
+                payment_to_delete = st.selectbox(
+                    "Payment",
+                    [p['Payment ID'] for p in customer_payments],
+                    format_func=lambda pid: next(f"#{p['Payment ID']} | {p['Date']} | ₹{p['Amount']:,.2f}"
+                                                 for p in customer_payments if p['Payment ID'] == pid),
+                    key="payment_delete_select"
+                )
+                if st.button("🗑️ Delete Payment", key="payment_delete"):
+                    success, message = ledger.delete_payment(payment_to_delete)
+                    if success and save_data():
+                        st.rerun()
+                    elif success:
+                        st.error("❌ Failed to save payment")
+                    else:
+                        st.warning(message)
+            else:
+                st.info("No payments recorded for this customer")
+
 # ========================================
 # PAGE: PRODUCT MANAGEMENT
 # ========================================
@@ -1232,14 +1678,26 @@ elif page == "🏭 Product Management":
             placeholder="Enter new product name (e.g., Rice, Mustard Oil)",
             help="Enter the name of the product you want to add"
         )
+        detail_col1, detail_col2, detail_col3, detail_col4 = st.columns(4)
+        with detail_col1:
+            new_product_sku = st.text_input("🔖 SKU", help="Optional - must be unique")
+        with detail_col2:
+            new_product_unit = st.text_input("📏 Unit", placeholder="kg, bag, bottle")
+        with detail_col3:
+            new_product_cost = st.number_input("💵 Default Cost Price", min_value=0.0, max_value=float(MAX_PRICE),
+                                               value=0.0, step=0.01)
+        with detail_col4:
+            new_product_selling = st.number_input("💰 Default Selling Price", min_value=0.0, max_value=float(MAX_PRICE),
+                                                  value=0.0, step=0.01)
     
     with col2:
         st.write("")  # Spacing
         st.write("")  # Spacing
         if st.button("✅ Add Product", use_container_width=True):
-            success, message = add_product(st.session_state.products, new_product_name)
+            success, message = ledger.add_product(new_product_name, new_product_sku, new_product_unit,
+                                                  new_product_cost, new_product_selling)
             if success:
-                if save_products(st.session_state.products):
+                if save_data():
                     st.success(message)
                     st.balloons()
                 else:
@@ -1251,18 +1709,18 @@ elif page == "🏭 Product Management":
     st.markdown("---")
     st.subheader("📋 Current Products")
     
-    if len(st.session_state.products) > 0:
+    if len(ledger.products) > 0:
         # Create a nice display of products
-        st.markdown(f"**Total Products:** {len(st.session_state.products)}")
+        st.markdown(f"**Total Products:** {len(ledger.products)}")
         
         # Display in a grid
         cols_per_row = 3
-        for i in range(0, len(st.session_state.products), cols_per_row):
+        for i in range(0, len(ledger.products), cols_per_row):
             cols = st.columns(cols_per_row)
             for j, col in enumerate(cols):
                 idx = i + j
-                if idx < len(st.session_state.products):
-                    product = st.session_state.products[idx]
+                if idx < len(ledger.products):
+                    product = ledger.products[idx]
                     with col:
                         # Product card
                         st.markdown(f"""
@@ -1276,6 +1734,54 @@ elif page == "🏭 Product Management":
                         </div>
                         """, unsafe_allow_html=True)
         
+        # Catalog details (SKU, unit, default prices) by product ID
+        st.markdown("---")
+        st.subheader("🗂️ Product Catalog")
+        st.info("Default prices pre-fill the Data Entry form, and lead times set reorder points. Transactions reference products by ID.")
+        
+        catalog_df = pd.DataFrame([ledger.catalog.get(pid) for pid in ledger.catalog.ids()])
+        catalog_df = catalog_df[['id', 'name', 'sku', 'unit', 'cost_price', 'selling_price', 'lead_time']].rename(columns={
+            'id': 'ID', 'name': 'Product Name', 'sku': 'SKU', 'unit': 'Unit',
+            'cost_price': 'Default Cost Price', 'selling_price': 'Default Selling Price',
+            'lead_time': 'Lead Time (days)'
+        })
+        edited_catalog = st.data_editor(
+            catalog_df,
+            key="catalog_editor",
+            hide_index=True,
+            use_container_width=True,
+            disabled=['ID', 'Product Name'],
+            column_config={
+                'Default Cost Price': st.column_config.NumberColumn(min_value=0.0, format="₹%.2f"),
+                'Default Selling Price': st.column_config.NumberColumn(min_value=0.0, format="₹%.2f"),
+                'Lead Time (days)': st.column_config.NumberColumn(min_value=1, step=1,
+                                                                  help="Days from placing an order to the stock arriving"),
+            }
+        )
+        
+        if st.button("💾 Save Catalog", key="catalog_save"):
+            messages = []
+            for before, after in zip(catalog_df.to_dict('records'), edited_catalog.to_dict('records')):
+                if before != after:
+                    success, message = ledger.update_product(
+                        before['ID'], sku=after['SKU'] or '', unit=after['Unit'] or '',
+                        cost_price=after['Default Cost Price'] or 0.0,
+                        selling_price=after['Default Selling Price'] or 0.0,
+                        lead_time=after['Lead Time (days)'] or DEFAULT_LEAD_TIME
+                    )
+                    messages.append((success, message))
+            updated = sum(success for success, _ in messages)
+            if not messages:
+                st.info("No catalog changes to save")
+            elif updated:
+                if save_data():
+                    st.success(f"✅ Updated {updated} product(s)!")
+                else:
+                    st.error("Failed to save product list")
+            for success, message in messages:
+                if not success:
+                    st.warning(message)
+        
         # Remove Product Section
         st.markdown("---")
         st.subheader("🗑️ Remove Product")
@@ -1285,7 +1791,7 @@ elif page == "🏭 Product Management":
         with col1:
             product_to_remove = st.selectbox(
                 "Select Product to Remove",
-                st.session_state.products,
+                ledger.products,
                 help="WARNING: Removing a product will not delete its transaction history"
             )
         
@@ -1294,14 +1800,14 @@ elif page == "🏭 Product Management":
             st.write("")  # Spacing
             if st.button("🗑️ Remove", use_container_width=True):
                 # Check if product has transactions
-                has_transactions = len(st.session_state.df[st.session_state.df['Product Name'] == product_to_remove]) > 0
+                has_transactions = product_to_remove in ledger.index()['products']
                 
                 if has_transactions:
                     st.warning(f"⚠️ '{product_to_remove}' has existing transactions. Are you sure?")
                     if st.button("⚠️ Confirm Removal", type="primary"):
-                        success, message = remove_product(st.session_state.products, product_to_remove)
+                        success, message = ledger.remove_product(product_to_remove)
                         if success:
-                            if save_products(st.session_state.products):
+                            if save_data():
                                 st.success(message)
                                 st.info("Note: Transaction history for this product is preserved in the ledger.")
                             else:
@@ -1309,22 +1815,59 @@ elif page == "🏭 Product Management":
                         else:
                             st.error(message)
                 else:
-                    success, message = remove_product(st.session_state.products, product_to_remove)
+                    success, message = ledger.remove_product(product_to_remove)
                     if success:
-                        if save_products(st.session_state.products):
+                        if save_data():
                             st.success(message)
                         else:
                             st.error("Failed to save product list")
                     else:
                         st.error(message)
         
+        # Rename / Merge Section
+        st.markdown("---")
+        st.subheader("✏️ Rename or Merge Products")
+        st.info("Both keep the product's ID and history. Old names keep resolving for imports and archived rows.")
+        
+        rename_col, merge_col = st.columns(2)
+        
+        with rename_col:
+            rename_from = st.selectbox("Product to Rename", ledger.products, key="rename_from")
+            rename_to = st.text_input("New Name", key="rename_to")
+            if st.button("✏️ Rename", key="rename_apply", use_container_width=True):
+                success, message = branches.rename_product(rename_from, rename_to)
+                if success:
+                    if save_data():
+                        st.success(message)
+                    else:
+                        st.error("Failed to save product list")
+                else:
+                    st.warning(message)
+        
+        with merge_col:
+            merge_source = st.selectbox("Merge (duplicate)", ledger.products, key="merge_source")
+            merge_target = st.selectbox("Into", [p for p in ledger.products if p != merge_source], key="merge_target")
+            merge_confirm = st.checkbox(
+                f"Move every '{merge_source}' transaction to '{merge_target}' and recalculate its stock",
+                key="merge_confirm"
+            )
+            if st.button("🔀 Merge", key="merge_apply", use_container_width=True, disabled=not merge_confirm):
+                success, message = branches.merge_products(merge_source, merge_target)
+                if success:
+                    if save_data(branches.names()):
+                        st.success(message)
+                    else:
+                        st.error("Failed to save product list")
+                else:
+                    st.warning(message)
+        
         # Product Statistics
         st.markdown("---")
         st.subheader("📊 Product Statistics")
         
         # Show which products have transactions
-        products_with_data = st.session_state.df['Product Name'].unique().tolist() if len(st.session_state.df) > 0 else []
-        products_without_data = [p for p in st.session_state.products if p not in products_with_data]
+        products_with_data = ledger.products_with_transactions()
+        products_without_data = [p for p in ledger.products if p not in products_with_data]
         
         stat_col1, stat_col2 = st.columns(2)
         
@@ -1341,18 +1884,78 @@ elif page == "🏭 Product Management":
     else:
         st.warning("⚠️ No products available. Add some products to get started!")
     
+    # Locations
+    st.markdown("---")
+    st.subheader("🏬 Locations")
+    st.info("Each location keeps its own ledger and stock; products and prices are shared by all of them.")
+    
+    location_col1, location_col2 = st.columns([3, 1])
+    with location_col1:
+        new_location = st.text_input("🏬 Location Name", placeholder="e.g., Sadar Bazaar Branch", key="location_name")
+        st.caption("Locations: " + ", ".join(branches.names()))
+    with location_col2:
+        st.write("")  # Spacing
+        st.write("")  # Spacing
+        if st.button("✅ Add Location", key="location_add", use_container_width=True):
+            success, message = branches.add_location(new_location)
+            if success:
+                if save_data([new_location.strip()]):
+                    st.success(message)
+                    st.rerun()
+                else:
+                    st.error("Failed to save locations")
+            else:
+                st.warning(message)
+    
+    # Data Integrity
+    st.markdown("---")
+    st.subheader("🩺 Data Integrity")
+    st.info("Checks that Stock Left and the totals match the quantities and prices, and that transaction IDs are unique.")
+    
+    if len(integrity_report) == 0:
+        st.success(f"✅ All {len(ledger.df)} transactions are consistent")
+    else:
+        issue_counts = integrity_report.groupby('Column').size()
+        st.warning("⚠️ " + ", ".join(f"{count} {column}" for column, count in issue_counts.items()) + " mismatch(es)")
+        st.dataframe(integrity_report.head(100), use_container_width=True, hide_index=True)
+        
+        if st.button("🔧 Repair Ledger", type="primary", key="integrity_repair"):
+            success, message = ledger.repair()
+            if success:
+                if save_data():
+                    st.success(message)
+                    st.rerun()
+                else:
+                    st.error("Failed to save changes")
+            else:
+                st.info(message)
+    
     # Reset to Defaults
     st.markdown("---")
     st.subheader("🔄 Reset Options")
     
     if st.button("🔄 Reset to Default Products", help="Restore original 8 agricultural products"):
-        st.session_state.products = DEFAULT_PRODUCTS.copy()
-        if save_products(st.session_state.products):
+        ledger.reset_products()
+        if save_data():
             st.success("✅ Product list reset to defaults!")
             st.info("Default products: " + ", ".join(DEFAULT_PRODUCTS))
         else:
             st.error("Failed to save product list")
 
+# Profiling Panel
+st.sidebar.markdown("---")
+with st.sidebar.expander("🩺 Profiling"):
+    st.toggle("Profile reruns", value=profiler.enabled, key="profiling_enabled",
+              help="Time storage, filtering, aggregation, charting and export on every rerun")
+    run = profiler.end(
+        page=page,
+        rows=len(ledger.df),
+        ledger_mb=round(ledger.df.memory_usage(deep=True).sum() / 2**20, 2) if profiler.enabled else None
+    )
+    if run is not None:
+        st.caption(f"Last rerun: {run['total'] * 1000:,.0f} ms on {len(ledger.df):,} rows")
+        st.dataframe(pd.DataFrame(profiler.table()), hide_index=True)
+
 # Footer
 st.sidebar.markdown("---")
 st.sidebar.markdown("""
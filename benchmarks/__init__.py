@@ -0,0 +1,3 @@
+"""
+Synthetic ledgers and performance benchmarks for the inventory core
+"""
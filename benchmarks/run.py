@@ -0,0 +1,174 @@
+"""
+Benchmark suite for the inventory core
+
+    python -m benchmarks.run --sizes 1000 10000 100000
+    python -m benchmarks.run --sizes 1000000 --skip excel --compare benchmarks/results/<previous>.json
+
+Times the operations behind each page on synthetic ledgers and records wall
+time and peak traced memory. Every run writes a JSON report (with the git
+commit and machine details) so runs can be compared side by side.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from inventory import (
+    COSTING_METHODS,
+    Ledger,
+    calculate_stock_left,
+    create_excel_separate_sheets,
+    summarize_products,
+)
+
+from .synthetic import generate_ledger
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# Excel caps a sheet at 1,048,576 rows
+EXCEL_MAX_ROWS = 1048575
+
+
+def measure(func, repeat=3, setup=None):
+    """Median wall time of func over a few runs, and its peak traced memory
+
+    The timed runs go without tracemalloc, which slows allocation-heavy code
+    several times over; peak memory comes from one extra untimed run.
+    """
+    def prepare():
+        arg = setup() if setup else None
+        gc.collect()
+        return (lambda: func(arg)) if setup else func
+
+    times = []
+    for _ in range(repeat):
+        run = prepare()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    run = prepare()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': statistics.median(times), 'peak_mb': round(peak / 2**20, 2)}
+
+
+def import_records(df, count):
+    """The last rows of a ledger as bulk-import JSON records"""
+    tail = df.tail(count)
+    return [
+        {'date': row['Date'], 'product_name': row['Product Name'],
+         'quantity_received': row['Quantity Received'], 'quantity_sold': row['Quantity Sold'],
+         'cost_price': row['Cost Price'], 'selling_price': row['Selling Price'], 'remarks': row['Remarks']}
+        for row in tail.to_dict('records')
+    ]
+
+
+def run_size(rows, products, repeat, skip, storage_dir):
+    """Benchmark every operation on one ledger size"""
+    df, names = generate_ledger(rows, products)
+    storage_file = os.path.join(storage_dir, f'ledger_{rows}.json')
+    Ledger(df, names, storage_file).save()
+    product = names[0]
+    date = df['Date'].iat[len(df) // 2]
+    records = import_records(df, min(1000, rows))
+
+    cases = {
+        'init_data': lambda: Ledger.load(storage_file),
+        'add_transaction': (lambda ledger: ledger.add_transaction(date, product, 10, 0, 100.0, 110.0, 'bench'),
+                            lambda: Ledger(df, names, storage_file)),
+        'calculate_stock_left': lambda: calculate_stock_left(df, product, 10, 0),
+        'delete_transaction': (lambda ledger: ledger.delete_first(product, date),
+                               lambda: Ledger(df, names, storage_file)),
+        'dashboard_summary': lambda: summarize_products(df),
+        'profit_comparison': (lambda ledger: [ledger.product_summary(method) for method in COSTING_METHODS],
+                              lambda: Ledger(df, names, storage_file)),
+        'bulk_import': (lambda ledger: ledger.ingest_records(records),
+                        lambda: Ledger(df, names, storage_file)),
+        'excel_separate_sheets': lambda: create_excel_separate_sheets(df, names),
+    }
+
+    results = {}
+    for name, case in cases.items():
+        if name in skip or (name == 'excel_separate_sheets' and rows > EXCEL_MAX_ROWS):
+            continue
+        func, setup = case if isinstance(case, tuple) else (case, None)
+        results[name] = measure(func, repeat, setup)
+        print(f"  {name:<24} {results[name]['seconds']:>10.4f} s {results[name]['peak_mb']:>10.1f} MB")
+    results['storage_mb'] = round(os.path.getsize(storage_file) / 2**20, 2)
+    os.remove(storage_file)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, previous):
+    """Print time ratios against an earlier report (below 1.0 is faster)"""
+    print(f"\nCompared with {previous.get('commit')} ({previous.get('timestamp')}):")
+    for size, results in report['results'].items():
+        before = previous.get('results', {}).get(size, {})
+        for name, result in results.items():
+            if isinstance(result, dict) and name in before:
+                ratio = result['seconds'] / before[name]['seconds'] if before[name]['seconds'] else float('nan')
+                print(f"  {size:>9} {name:<24} {ratio:>6.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the inventory core on synthetic ledgers")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="ledger row counts (10^3 to 10^7)")
+    parser.add_argument('--products', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip', nargs='*', default=[], help="operations to leave out")
+    parser.add_argument('--out', help="report path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--compare', help="earlier report to compare against")
+    args = parser.parse_args(argv)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.platform(),
+        'products': args.products,
+        'repeat': args.repeat,
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as storage_dir:
+        for rows in args.sizes:
+            print(f"{rows:,} rows")
+            report['results'][str(rows)] = run_size(rows, args.products, args.repeat, set(args.skip), storage_dir)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{report['timestamp'].replace(':', '')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"\nReport written to {out}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,16 +3,7 @@ Complete Data Insertion Script for Inventory Dashboard
 This script inserts both Wheat and DAP data into your app's storage file
 """
 
-import json
-import os
-from datetime import datetime
-
-# Storage Configuration (same as in your app)
-STORAGE_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "InventoryDashboard")
-STORAGE_FILE = os.path.join(STORAGE_DIR, "data.json")
-
-# Ensure storage directory exists
-os.makedirs(STORAGE_DIR, exist_ok=True)
+from inventory import STORAGE_FILE, Ledger
 
 # Your wheat data
 wheat_data = [
@@ -54,97 +45,53 @@ dap_data = [
     {"date": "24/12/2025", "product_name": "DAP", "quantity_received": 0, "quantity_sold": 2, "cost_price": 1344.00, "selling_price": 1500.00}
 ]
 
-def calculate_stock_left(transactions, product, qty_received, qty_sold):
-    """Calculate stock left based on previous transactions"""
-    product_transactions = [t for t in transactions if t['Product Name'] == product]
-    if product_transactions:
-        previous_stock = product_transactions[-1]['Stock Left']
-    else:
-        previous_stock = 0
-    
-    new_stock = previous_stock + qty_received - qty_sold
-    return new_stock
-
-def process_product_data(product_data, product_name, transactions):
+def process_product_data(product_data, product_name, ledger):
     """Process data for a specific product"""
     print(f"\n📦 Processing {len(product_data)} {product_name} transactions...")
     
-    for record in product_data:
-        # Calculate fields
-        stock_left = calculate_stock_left(transactions, product_name, record['quantity_received'], record['quantity_sold'])
-        total_purchase = record['quantity_received'] * record['cost_price']
-        total_sales = record['quantity_sold'] * record['selling_price']
-        profit = (record['selling_price'] - record['cost_price']) * record['quantity_sold']
-        
-        # Create transaction record
-        transaction = {
-            'Date': record['date'],
-            'Product Name': record['product_name'],
-            'Quantity Received': record['quantity_received'],
-            'Quantity Sold': record['quantity_sold'],
-            'Stock Left': stock_left,
-            'Cost Price': record['cost_price'],
-            'Selling Price': record['selling_price'],
-            'Total Purchase': total_purchase,
-            'Total Sales': total_sales,
-            'Profit': profit,
-            'Remarks': ''
-        }
-        
-        transactions.append(transaction)
-        print(f"✅ {record['date']}: Received {record['quantity_received']}, Sold {record['quantity_sold']}, Stock: {stock_left}")
+    start = len(ledger.df)
+    ledger.ingest_records(product_data)
+    for _, row in ledger.df.iloc[start:].iterrows():
+        print(f"✅ {row['Date']}: Received {row['Quantity Received']}, Sold {row['Quantity Sold']}, Stock: {row['Stock Left']}")
     
-    return transactions
+    return ledger
 
 def insert_all_data():
     """Insert both Wheat and DAP data"""
     
     # Load existing data if any
-    existing_data = {
-        "products": ["Wheat", "Urea", "DAP", "Sarson", "Cow Feed", "Gandyal", "Him Cal", "Liv 52"], 
-        "transactions": []
-    }
-    
-    if os.path.exists(STORAGE_FILE):
-        try:
-            with open(STORAGE_FILE, 'r') as f:
-                existing_data = json.load(f)
-                print(f"📁 Found existing data with {len(existing_data.get('transactions', []))} transactions")
-        except Exception as e:
-            print(f"⚠️ Could not load existing data: {e}")
-    
-    transactions = existing_data.get('transactions', [])
-    products = existing_data.get('products', ["Wheat", "Urea", "DAP", "Sarson", "Cow Feed", "Gandyal", "Him Cal", "Liv 52"])
+    try:
+        ledger = Ledger.load(STORAGE_FILE)
+        print(f"📁 Found existing data with {len(ledger.df)} transactions")
+    except Exception as e:
+        print(f"⚠️ Could not load existing data: {e}")
+        ledger = Ledger(storage_file=STORAGE_FILE)
     
     # Ensure products are in the list
     for product in ["Wheat", "DAP"]:
-        if product not in products:
-            products.append(product)
+        if product not in ledger.products:
+            ledger.add_product(product)
     
     print(f"🚀 Starting data insertion...")
-    print(f"📊 Current transactions: {len(transactions)}")
+    print(f"📊 Current transactions: {len(ledger.df)}")
     
     # Process Wheat data
-    transactions = process_product_data(wheat_data, "Wheat", transactions)
+    ledger = process_product_data(wheat_data, "Wheat", ledger)
     
     # Process DAP data
-    transactions = process_product_data(dap_data, "DAP", transactions)
+    ledger = process_product_data(dap_data, "DAP", ledger)
     
     # Save to storage file
-    final_data = {
-        'products': products,
-        'transactions': transactions
-    }
-    
-    with open(STORAGE_FILE, 'w') as f:
-        json.dump(final_data, f, indent=4)
+    ledger.save()
     
+    products = ledger.products
+    product_counts = ledger.df['Product Name'].value_counts()
     print(f"\n🎉 SUCCESS! Data insertion completed!")
     print(f"📁 Data saved to: {STORAGE_FILE}")
     print(f"📦 Products: {len(products)} ({', '.join(products)})")
-    print(f"📊 Total transactions: {len(transactions)}")
-    print(f"🌾 Wheat transactions: {len([t for t in transactions if t['Product Name'] == 'Wheat'])}")
-    print(f"🧪 DAP transactions: {len([t for t in transactions if t['Product Name'] == 'DAP'])}")
+    print(f"📊 Total transactions: {len(ledger.df)}")
+    print(f"🌾 Wheat transactions: {product_counts.get('Wheat', 0)}")
+    print(f"🧪 DAP transactions: {product_counts.get('DAP', 0)}")
     print("\n🚀 Now run your Streamlit app to see all the data!")
     print("   Command: streamlit run app.py")
 
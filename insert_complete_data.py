@@ -3,16 +3,9 @@ Complete Data Insertion Script for Inventory Dashboard
 This script inserts Wheat, DAP, and Urea data into your app's storage file
 """
 
-import json
-import os
 from datetime import datetime
 
-# Storage Configuration (same as in your app)
-STORAGE_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "InventoryDashboard")
-STORAGE_FILE = os.path.join(STORAGE_DIR, "data.json")
-
-# Ensure storage directory exists
-os.makedirs(STORAGE_DIR, exist_ok=True)
+from inventory import STORAGE_FILE, Ledger
 
 # Your wheat data
 wheat_data = [
@@ -80,121 +73,37 @@ urea_data = [
     {"date": "16/11/2025", "product_name": "Urea", "quantity_received": 0, "quantity_sold": 7, "cost_price": 261.50, "selling_price": 300.00}
 ]
 
-def calculate_stock_left(transactions, product, qty_received, qty_sold):
-    """Calculate stock left based on previous transactions"""
-    product_transactions = [t for t in transactions if t['Product Name'] == product]
-    if product_transactions:
-        previous_stock = product_transactions[-1]['Stock Left']
-    else:
-        previous_stock = 0
-    
-    new_stock = previous_stock + qty_received - qty_sold
-    return new_stock
-
-def process_product_data(product_data, product_name, transactions):
-    """Process data for a specific product"""
-    print(f"\n📦 Processing {len(product_data)} {product_name} transactions...")
-    
-    for record in product_data:
-        # Calculate fields
-        stock_left = calculate_stock_left(transactions, product_name, record['quantity_received'], record['quantity_sold'])
-        total_purchase = record['quantity_received'] * record['cost_price']
-        total_sales = record['quantity_sold'] * record['selling_price']
-        profit = (record['selling_price'] - record['cost_price']) * record['quantity_sold']
-        
-        # Create transaction record
-        transaction = {
-            'Date': record['date'],
-            'Product Name': record['product_name'],
-            'Quantity Received': record['quantity_received'],
-            'Quantity Sold': record['quantity_sold'],
-            'Stock Left': stock_left,
-            'Cost Price': record['cost_price'],
-            'Selling Price': record['selling_price'],
-            'Total Purchase': total_purchase,
-            'Total Sales': total_sales,
-            'Profit': profit,
-            'Remarks': ''
-        }
-        
-        transactions.append(transaction)
-        print(f"✅ {record['date']}: Received {record['quantity_received']}, Sold {record['quantity_sold']}, Stock: {stock_left}")
-    
-    return transactions
-
 def insert_complete_data():
     """Insert Wheat, DAP, and Urea data"""
     
     # Clear existing data and start fresh
-    existing_data = {
-        "products": ["Wheat", "Urea", "DAP", "Sarson", "Cow Feed", "Gandyal", "Him Cal", "Liv 52"], 
-        "transactions": []
-    }
-    
-    transactions = []
-    products = ["Wheat", "Urea", "DAP", "Sarson", "Cow Feed", "Gandyal", "Him Cal", "Liv 52"]
+    ledger = Ledger(storage_file=STORAGE_FILE)
     
     print(f"🚀 Starting complete data insertion...")
     print(f"📊 Starting fresh with 0 transactions")
     
     # Process all products in chronological order
-    all_data = []
-    
-    # Add all transactions with dates for sorting
-    for record in wheat_data:
-        all_data.append((record['date'], 'Wheat', record))
-    for record in dap_data:
-        all_data.append((record['date'], 'DAP', record))
-    for record in urea_data:
-        all_data.append((record['date'], 'Urea', record))
-    
-    # Sort by date
-    from datetime import datetime
-    all_data.sort(key=lambda x: datetime.strptime(x[0], '%d/%m/%Y'))
+    all_data = wheat_data + dap_data + urea_data
+    all_data.sort(key=lambda record: datetime.strptime(record['date'], '%d/%m/%Y'))
     
     print(f"\n📅 Processing {len(all_data)} transactions in chronological order...")
     
-    for date_str, product_name, record in all_data:
-        # Calculate fields
-        stock_left = calculate_stock_left(transactions, product_name, record['quantity_received'], record['quantity_sold'])
-        total_purchase = record['quantity_received'] * record['cost_price']
-        total_sales = record['quantity_sold'] * record['selling_price']
-        profit = (record['selling_price'] - record['cost_price']) * record['quantity_sold']
-        
-        # Create transaction record
-        transaction = {
-            'Date': record['date'],
-            'Product Name': record['product_name'],
-            'Quantity Received': record['quantity_received'],
-            'Quantity Sold': record['quantity_sold'],
-            'Stock Left': stock_left,
-            'Cost Price': record['cost_price'],
-            'Selling Price': record['selling_price'],
-            'Total Purchase': total_purchase,
-            'Total Sales': total_sales,
-            'Profit': profit,
-            'Remarks': ''
-        }
-        
-        transactions.append(transaction)
-        print(f"✅ {date_str} - {product_name}: Stock {stock_left}")
+    ledger.ingest_records(all_data)
+    for _, row in ledger.df.iterrows():
+        print(f"✅ {row['Date']} - {row['Product Name']}: Stock {row['Stock Left']}")
     
     # Save to storage file
-    final_data = {
-        'products': products,
-        'transactions': transactions
-    }
-    
-    with open(STORAGE_FILE, 'w') as f:
-        json.dump(final_data, f, indent=4)
+    ledger.save()
     
+    products = ledger.products
+    product_counts = ledger.df['Product Name'].value_counts()
     print(f"\n🎉 SUCCESS! Complete data insertion finished!")
     print(f"📁 Data saved to: {STORAGE_FILE}")
     print(f"📦 Products: {len(products)} ({', '.join(products)})")
-    print(f"📊 Total transactions: {len(transactions)}")
-    print(f"🌾 Wheat transactions: {len([t for t in transactions if t['Product Name'] == 'Wheat'])}")
-    print(f"🧪 DAP transactions: {len([t for t in transactions if t['Product Name'] == 'DAP'])}")
-    print(f"🧪 Urea transactions: {len([t for t in transactions if t['Product Name'] == 'Urea'])}")
+    print(f"📊 Total transactions: {len(ledger.df)}")
+    print(f"🌾 Wheat transactions: {product_counts.get('Wheat', 0)}")
+    print(f"🧪 DAP transactions: {product_counts.get('DAP', 0)}")
+    print(f"🧪 Urea transactions: {product_counts.get('Urea', 0)}")
     print("\n🚀 Now run your Streamlit app to see all the data!")
     print("   Command: python -m streamlit run app.py")
 
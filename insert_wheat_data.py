@@ -3,16 +3,7 @@ Direct Data Insertion Script for Inventory Dashboard
 This script directly inserts wheat data into your app's storage file
 """
 
-import json
-import os
-from datetime import datetime
-
-# Storage Configuration (same as in your app)
-STORAGE_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "InventoryDashboard")
-STORAGE_FILE = os.path.join(STORAGE_DIR, "data.json")
-
-# Ensure storage directory exists
-os.makedirs(STORAGE_DIR, exist_ok=True)
+from inventory import STORAGE_FILE, Ledger
 
 # Your wheat data
 wheat_data = [
@@ -35,76 +26,32 @@ wheat_data = [
     {"date": "13/12/2025", "product_name": "Wheat", "quantity_received": 0, "quantity_sold": 1, "cost_price": 1520.00, "selling_price": 1650.00}
 ]
 
-def calculate_stock_left(transactions, product, qty_received, qty_sold):
-    """Calculate stock left based on previous transactions"""
-    product_transactions = [t for t in transactions if t['Product Name'] == product]
-    if product_transactions:
-        previous_stock = product_transactions[-1]['Stock Left']
-    else:
-        previous_stock = 0
-    
-    new_stock = previous_stock + qty_received - qty_sold
-    return new_stock
-
 def process_wheat_data():
     """Process wheat data and create proper transactions"""
     
     # Load existing data if any
-    existing_data = {"products": ["Wheat", "Urea", "DAP", "Sarson", "Cow Feed", "Gandyal", "Him Cal", "Liv 52"], "transactions": []}
-    
-    if os.path.exists(STORAGE_FILE):
-        try:
-            with open(STORAGE_FILE, 'r') as f:
-                existing_data = json.load(f)
-        except:
-            pass
-    
-    transactions = existing_data.get('transactions', [])
-    products = existing_data.get('products', ["Wheat", "Urea", "DAP", "Sarson", "Cow Feed", "Gandyal", "Him Cal", "Liv 52"])
+    try:
+        ledger = Ledger.load(STORAGE_FILE)
+    except Exception:
+        ledger = Ledger(storage_file=STORAGE_FILE)
     
     # Add Wheat to products if not present
-    if "Wheat" not in products:
-        products.append("Wheat")
+    if "Wheat" not in ledger.products:
+        ledger.add_product("Wheat")
     
     print(f"Processing {len(wheat_data)} wheat transactions...")
     
-    for record in wheat_data:
-        # Calculate fields
-        stock_left = calculate_stock_left(transactions, "Wheat", record['quantity_received'], record['quantity_sold'])
-        total_purchase = record['quantity_received'] * record['cost_price']
-        total_sales = record['quantity_sold'] * record['selling_price']
-        profit = (record['selling_price'] - record['cost_price']) * record['quantity_sold']
-        
-        # Create transaction record
-        transaction = {
-            'Date': record['date'],
-            'Product Name': record['product_name'],
-            'Quantity Received': record['quantity_received'],
-            'Quantity Sold': record['quantity_sold'],
-            'Stock Left': stock_left,
-            'Cost Price': record['cost_price'],
-            'Selling Price': record['selling_price'],
-            'Total Purchase': total_purchase,
-            'Total Sales': total_sales,
-            'Profit': profit,
-            'Remarks': ''
-        }
-        
-        transactions.append(transaction)
-        print(f"✅ Added: {record['date']} - Stock: {stock_left}")
+    start = len(ledger.df)
+    ledger.ingest_records(wheat_data)
+    for _, row in ledger.df.iloc[start:].iterrows():
+        print(f"✅ Added: {row['Date']} - Stock: {row['Stock Left']}")
     
     # Save to storage file
-    final_data = {
-        'products': products,
-        'transactions': transactions
-    }
-    
-    with open(STORAGE_FILE, 'w') as f:
-        json.dump(final_data, f, indent=4)
+    ledger.save()
     
     print(f"\n🎉 SUCCESS! Added {len(wheat_data)} wheat transactions to your app!")
     print(f"📁 Data saved to: {STORAGE_FILE}")
-    print(f"📊 Total transactions now: {len(transactions)}")
+    print(f"📊 Total transactions now: {len(ledger.df)}")
     print("\n🚀 Now run your Streamlit app to see the data!")
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+"""
+Headless inventory core
+Importable without Streamlit - used by the dashboard, the insert scripts and benchmarks.
+"""
+
+from .anomalies import (
+    ANOMALY_FIELDS,
+    ANOMALY_WINDOW,
+    DEFAULT_ANOMALY_THRESHOLD,
+    AnomalyDetector,
+    describe_anomaly,
+)
+from .archive import (
+    FISCAL_YEAR_START_MONTH,
+    OPENING_REMARK,
+    archive_ledger,
+    build_opening_rows,
+    closed_fiscal_years,
+    fiscal_year_end,
+)
+from .batches import NO_EXPIRY, BatchTracker, parse_expiry
+from .branches import DEFAULT_LOCATION, TRANSFER_COLUMNS, Branches
+from .costing import COSTING_METHODS, CostLotEngine, apply_costing
+from .export import create_excel_report, create_excel_separate_sheets
+from .forecast import (
+    DEFAULT_SERVICE_LEVEL,
+    FORECAST_COLUMNS,
+    REORDER_STATUSES,
+    DemandEngine,
+    monthly_factors,
+)
+from .integrity import DERIVED_COLUMNS, check_integrity, expected_derived, repair_integrity
+from .ledger import Ledger
+from .products import DEFAULT_LEAD_TIME, DEFAULT_PRODUCTS, ProductCatalog
+from .queries import (
+    PARTITION_COLUMNS,
+    DateIndex,
+    build_asof_index,
+    consolidate_partitions,
+    format_day,
+    query_asof,
+    stock_statement_asof,
+    summarize_partition,
+    summarize_products,
+)
+from .receivables import AGING_BUCKETS, PAYMENT_COLUMNS, ReceivablesBook
+from .search import RemarksIndex, highlight, tokenize
+from .storage import (
+    BRANCHES_FILE,
+    STORAGE_DIR,
+    STORAGE_FILE,
+    TENANT_PATTERN,
+    StorageBusy,
+    WriterLock,
+    archive_dir,
+    file_stamp,
+    list_tenants,
+    load_storage,
+    location_file,
+    payments_list,
+    read_archive,
+    save_registry,
+    save_storage,
+    tenant_dir,
+    transfers_list,
+    write_archive,
+)
+from .transactions import (
+    EDITABLE_FIELDS,
+    NUMERIC_FIELDS,
+    OPTIONAL_COLUMNS,
+    REQUIRED_IMPORT_FIELDS,
+    add_transaction,
+    add_transactions,
+    apply_transaction_edits,
+    build_bulk_filter_mask,
+    build_ledger_index,
+    bulk_adjust_prices,
+    bulk_delete,
+    calculate_stock_left,
+    create_empty_dataframe,
+    delete_transaction,
+    delete_transaction_by_id,
+    edit_transaction_by_id,
+    normalize_dataframe,
+    parse_date,
+    parse_dates,
+    parse_import_record,
+    recalculate_stock,
+    recalculate_stock_from,
+    to_import_record,
+    validate_import_record,
+    validate_transaction,
+)
+from .metrics import (
+    CACHE_REQUESTS,
+    EXPORT_SECONDS,
+    IMPORT_BATCH_SIZE,
+    LEDGER_ROWS,
+    LOAD_SECONDS,
+    POOL_BYTES,
+    POOL_EVICTIONS,
+    POOL_TENANTS,
+    REGISTRY,
+    SAVE_SECONDS,
+    STORAGE_BYTES,
+    TRANSACTIONS_INGESTED,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    record_cache,
+    start_metrics_server,
+)
+from .money import (
+    FIXED_LIMIT,
+    MAX_PAYMENT,
+    MAX_PRICE,
+    MAX_QUANTITY,
+    MONEY_COLUMNS,
+    MONEY_SCALE,
+    QUANTITY_COLUMNS,
+    QUANTITY_SCALE,
+    check_limit,
+    compute_totals,
+    from_milli,
+    from_paise,
+    line_total,
+    money_sum,
+    quantity_sum,
+    quantize,
+    round_money,
+    round_quantity,
+    to_milli,
+    to_paise,
+)
+from .pipeline import IngestionPipeline
+from .profiling import STAGES, RerunProfiler, log_to_file
+from .tenants import DEFAULT_POOL_MB, TenantHolder, TenantPool, load_tenant, resolve_tenant, tenant_key
+from .trends import (
+    CHANGE_COLUMNS,
+    DEFAULT_TREND_WINDOW,
+    TREND_COLUMNS,
+    TREND_WINDOWS,
+    price_changes,
+    price_trends,
+)
+from .writer import GroupCommitWriter, QueueFull
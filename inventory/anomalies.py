@@ -0,0 +1,136 @@
+"""
+Sales anomaly detection - each transaction scored against its product's recent quantities and prices
+"""
+
+import numpy as np
+import pandas as pd
+
+# (value scored, quantity that must be positive for it to apply)
+ANOMALY_FIELDS = [
+    ('Quantity Sold', 'Quantity Sold'),
+    ('Selling Price', 'Quantity Sold'),
+    ('Quantity Received', 'Quantity Received'),
+    ('Cost Price', 'Quantity Received'),
+]
+# Previous rows of the same product (and field) a row is compared with
+ANOMALY_WINDOW = 30
+MIN_HISTORY = 5
+# Robust z-score from which a row is flagged
+DEFAULT_ANOMALY_THRESHOLD = 6.0
+# Spread never counts as less than this share of the typical value, so steady histories tolerate small changes
+MIN_RELATIVE_SPREAD = 0.05
+MIN_SPREAD = 0.01
+# Interquartile range of a normal distribution in standard deviations
+IQR_TO_SIGMA = 1.349
+
+
+class AnomalyDetector:
+    """Robust z-scores of every row against the previous ANOMALY_WINDOW rows of its product
+
+    For each of quantity sold, selling price, quantity received and cost
+    price, a row is compared with the median and interquartile range of that
+    product's earlier values. Its score is the largest of these distances, so
+    a sale of 230 bags where 20-25 is usual scores far above the threshold,
+    while an ordinary price change does not. Only the last window of values
+    per product is carried between batches, so appended rows are scored
+    without reading the ledger again.
+    """
+
+    def __init__(self, excluded=None, window=ANOMALY_WINDOW, min_history=MIN_HISTORY):
+        self.excluded = excluded    # Callable returning transaction IDs not to score (opening balances, transfers)
+        self.window = window
+        self.min_history = min_history
+        self.reset()
+        self.synced_version = None
+
+    def reset(self):
+        self.tails = {}                                 # field -> last `window` values per product
+        self.scores = np.zeros(0)
+        self.fields = np.zeros(0, dtype=np.int8)        # index into ANOMALY_FIELDS (-1: not scored)
+        self.typical = np.zeros(0)
+
+    @property
+    def applied(self):
+        """Number of ledger rows scored so far"""
+        return len(self.scores)
+
+    def replay(self, df, start=0):
+        """Score ledger rows from `start` onward"""
+        if start == 0:
+            self.reset()
+        rows = df.iloc[start:]
+        excluded = self.excluded() if self.excluded else ()
+        if excluded:
+            # Opening balances carry a whole archived period and transfers move stock at cost,
+            # so they are neither scored nor history
+            skipped = rows['Transaction ID'].isin(list(excluded)).values
+            if skipped.any():
+                rows = rows[['Product Name', 'Quantity Sold', 'Selling Price', 'Quantity Received', 'Cost Price']].copy()
+                rows.loc[skipped, ['Quantity Sold', 'Quantity Received']] = 0
+        scores, fields, typical = self.score(rows, commit=True)
+        self.scores = np.concatenate([self.scores[:start], scores])
+        self.fields = np.concatenate([self.fields[:start], fields])
+        self.typical = np.concatenate([self.typical[:start], typical])
+        return self
+
+    def score(self, rows, commit=False):
+        """Score rows that follow the ledger, in order; `commit` keeps them as history for later rows
+
+        Returns the score, the field behind it and that field's typical value, per row.
+        """
+        count = len(rows)
+        best = np.zeros(count)
+        best_field = np.full(count, -1, dtype=np.int8)
+        typical = np.full(count, np.nan)
+        if count == 0:
+            return best, best_field, typical
+
+        products = np.asarray(rows['Product Name'].astype(object))
+        for code, (column, applies) in enumerate(ANOMALY_FIELDS):
+            mask = rows[applies].astype(float).values > 0
+            if not mask.any():
+                continue
+            new = pd.DataFrame({'product': products[mask], 'value': rows[column].astype(float).values[mask]})
+            tail = self.tails.get(column)
+            combined = new if tail is None else pd.concat([tail, new], ignore_index=True)
+
+            # Grouped rolling quantiles over each product's earlier values (the row itself excluded)
+            rolling = combined.groupby('product', sort=False)['value'].rolling(
+                self.window, min_periods=self.min_history, closed='left')
+            offset = len(combined) - len(new)
+            lower, median, upper = (rolling.quantile(q).reset_index(level=0, drop=True).sort_index().values[offset:]
+                                    for q in (0.25, 0.5, 0.75))
+            spread = np.maximum((upper - lower) / IQR_TO_SIGMA,
+                                np.maximum(np.abs(median) * MIN_RELATIVE_SPREAD, MIN_SPREAD))
+            field_score = np.nan_to_num(np.abs(new['value'].values - median) / spread)
+
+            positions = np.flatnonzero(mask)
+            higher = field_score > best[positions]
+            best[positions[higher]] = field_score[higher]
+            best_field[positions[higher]] = code
+            typical[positions[higher]] = median[higher]
+
+            if commit:
+                self.tails[column] = combined.groupby('product', sort=False).tail(self.window).reset_index(drop=True)
+        return best, best_field, typical
+
+    def rename(self, old_name, new_name):
+        """Carry a product's recent values over to its new name"""
+        for tail in self.tails.values():
+            tail['product'] = tail['product'].replace(old_name, new_name)
+
+    def flagged(self, threshold=DEFAULT_ANOMALY_THRESHOLD):
+        """Ledger positions scoring at or above the threshold"""
+        return np.flatnonzero(self.scores >= threshold)
+
+
+def describe_anomaly(rows, scores, fields, typical):
+    """Human-readable reason per scored row ('' where nothing was scored)"""
+    reasons = []
+    for (_, row), score, field, usual in zip(rows.iterrows(), scores, fields, typical):
+        if field < 0 or score == 0:
+            reasons.append('')
+            continue
+        column = ANOMALY_FIELDS[field][0]
+        reasons.append(f"{column} {float(row[column]):,.2f} vs typical {usual:,.2f}")
+    return reasons
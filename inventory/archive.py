@@ -0,0 +1,130 @@
+"""
+Fiscal-year archiving
+Moves closed periods out of the active ledger into compressed cold storage
+and replaces them with opening-balance rows.
+
+Each product gets one opening row carrying the archived period's cumulative
+Quantity Received, Quantity Sold, Total Purchase, Total Sales and Profit, so
+ledger-wide sums are unchanged. Its Cost Price is the cost basis per unit of
+the closing stock and its Selling Price the average realised price. Every
+batch still open at the cut-off (a batch name or an expiry date) follows as
+its own receipt row at the cost basis, with the batch's Quantity, Batch and
+Expiry Date, and that quantity is taken off the product row's receipts, so
+expiry tracking carries on after archiving.
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .batches import NO_EXPIRY, BatchTracker
+from .money import MONEY_SCALE, QUANTITY_SCALE, from_paise, line_total, to_milli, to_paise
+from .transactions import build_transaction_row, parse_date, parse_dates, recalculate_stock
+
+# Indian fiscal year: April to March
+FISCAL_YEAR_START_MONTH = 4
+
+OPENING_REMARK = "Opening balance"
+
+
+def fiscal_year_end(day):
+    """Last day (31 March) of the fiscal year containing a date"""
+    year = day.year + 1 if day.month >= FISCAL_YEAR_START_MONTH else day.year
+    return date(year, FISCAL_YEAR_START_MONTH, 1) - timedelta(days=1)
+
+
+def closed_fiscal_years(df, today=None, after=None):
+    """Ends of fiscal years that are over and still have rows in the ledger"""
+    if len(df) == 0:
+        return []
+    today = today or date.today()
+    current_end = fiscal_year_end(today)
+    dates = parse_dates(df['Date']).dropna()
+    if after is not None:
+        dates = dates[dates > parse_date(after)]
+    ends = sorted({fiscal_year_end(d) for d in dates.dt.date.unique()})
+    return [end for end in ends if end < current_end]
+
+
+def build_opening_rows(archived, through, start_id, opening_ids=()):
+    """One opening-balance row per product summarising the archived rows, then one per open batch"""
+    through_str = through.strftime('%d/%m/%Y')
+    # Exact integer sums: quantities in thousandths, money in paise
+    fixed = pd.DataFrame({
+        'Product Name': archived['Product Name'].values,
+        'Quantity Received': to_milli(archived['Quantity Received']),
+        'Quantity Sold': to_milli(archived['Quantity Sold']),
+        'Total Purchase': to_paise(archived['Total Purchase']),
+        'Total Sales': to_paise(archived['Total Sales']),
+        'Profit': to_paise(archived['Profit']),
+        'Cost Delta': to_paise(opening_cost_delta(archived, opening_ids)),
+    })
+    totals = fixed.groupby('Product Name', sort=False, observed=True).sum()
+    for col in ['Quantity Received', 'Quantity Sold']:
+        totals[col] = totals[col] / QUANTITY_SCALE
+    for col in ['Total Purchase', 'Total Sales', 'Profit', 'Cost Delta']:
+        totals[col] = totals[col] / MONEY_SCALE
+    last_cost = archived.groupby('Product Name', sort=False, observed=True)['Cost Price'].last()
+    batches = BatchTracker()
+    batches.replay(archived)
+    remark = f"{OPENING_REMARK} (archived through {through_str})"
+
+    rows = []
+    for product, row in totals.iterrows():
+        received = float(row['Quantity Received'])
+        sold = float(row['Quantity Sold'])
+        stock = round(received - sold, 3)
+        # Cost basis: the as-entered cost value left in stock, per unit
+        cost_value = float(row['Cost Delta'])
+        basis = round(cost_value / stock, 2) if stock > 0 else float(last_cost[product])
+        average_price = round(float(row['Total Sales']) / sold, 2) if sold > 0 else 0.0
+
+        # Open batches in expiry order, each at the cost basis
+        batch_rows = []
+        for expiry, _, qty, batch in sorted(batches.heaps.get(product, [])):
+            if round(qty, 3) > 0 and (batch or expiry != NO_EXPIRY):
+                expiry_str = datetime.fromordinal(expiry).strftime('%d/%m/%Y') if expiry != NO_EXPIRY else ''
+                batch_rows.append(build_transaction_row(
+                    start_id + len(rows) + 1 + len(batch_rows), 0, through_str, product, round(qty, 3), 0,
+                    basis, 0, remark, batch, expiry_str))
+        batch_qty = sum(round(r['Quantity Received'] * QUANTITY_SCALE) for r in batch_rows) / QUANTITY_SCALE
+        batch_purchase = sum(round(r['Total Purchase'] * MONEY_SCALE) for r in batch_rows) / MONEY_SCALE
+
+        opening = build_transaction_row(
+            start_id + len(rows), stock, through_str, product, round(received - batch_qty, 3), sold, basis,
+            average_price, remark
+        )
+        opening['Total Purchase'] = round(float(row['Total Purchase']) - batch_purchase, 2)
+        opening['Total Sales'] = float(row['Total Sales'])
+        opening['Profit'] = float(row['Profit'])
+        rows.append(opening)
+        rows.extend(batch_rows)
+    return pd.DataFrame(rows, columns=archived.columns)
+
+
+def archive_ledger(df, through, start_id, opening_ids=()):
+    """Split rows dated on or before `through` into an archive; returns (active, archived, new opening_ids)
+
+    `opening_ids` are the opening rows of earlier archives, which may be archived again.
+    """
+    dates = parse_dates(df['Date'])
+    mask = (dates <= parse_date(through)).values
+    archived = df.loc[mask].reset_index(drop=True)
+    if len(archived) == 0:
+        return df, archived, []
+
+    opening = build_opening_rows(archived, through, start_id, opening_ids)
+    active = pd.concat([opening, df.loc[~mask]], ignore_index=True)
+    active = recalculate_stock(active, opening['Product Name'].tolist())
+    return active, archived, opening['Transaction ID'].tolist()
+
+
+def opening_cost_delta(df, opening_ids):
+    """Per-row change in as-entered cost value, with opening rows carrying their stock at cost basis"""
+    delta = to_paise(df['Total Purchase']) - line_total(df['Quantity Sold'], df['Cost Price'])
+    if opening_ids:
+        mask = df['Transaction ID'].isin(opening_ids).values
+        stock = (to_milli(df['Quantity Received']) - to_milli(df['Quantity Sold'])) / QUANTITY_SCALE
+        delta = np.where(mask, line_total(stock, df['Cost Price']), delta)
+    return from_paise(delta)
@@ -0,0 +1,132 @@
+"""
+Batch and expiry tracking with first-expiry-first-out allocation
+"""
+
+import heapq
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Batch & Expiry Tracking
+NO_EXPIRY = datetime.max.toordinal()
+
+
+def parse_expiry(value):
+    """Convert an Expiry Date cell (DD/MM/YYYY, date or blank) to an ordinal, or NO_EXPIRY"""
+    if value is None or value == '' or (isinstance(value, float) and np.isnan(value)):
+        return NO_EXPIRY
+    if hasattr(value, 'toordinal'):
+        return value.toordinal()
+    try:
+        return datetime.strptime(str(value), '%d/%m/%Y').toordinal()
+    except ValueError:
+        return NO_EXPIRY
+
+
+class BatchTracker:
+    """Keep open batches per product in a min-heap by expiry and allocate sales first-expiry-first-out"""
+
+    def __init__(self):
+        self.heaps = {}         # product -> heap of [expiry_ordinal, seq, qty, batch]
+        self.allocations = []   # Per applied ledger row: list of (batch, qty, expiry_ordinal)
+        self.seq = 0
+        self.synced_version = None
+
+    @property
+    def applied(self):
+        """Number of ledger rows applied so far"""
+        return len(self.allocations)
+
+    def reset(self):
+        """Drop all open batches and applied rows"""
+        self.heaps.clear()
+        self.allocations = []
+        self.seq = 0
+        self.synced_version = None
+
+    def receive(self, product, qty, batch, expiry):
+        """Open a new batch for a receipt"""
+        heap = self.heaps.get(product)
+        if heap is None:
+            heap = self.heaps[product] = []
+        self.seq += 1
+        heapq.heappush(heap, [expiry, self.seq, qty, batch])
+
+    def allocate(self, product, qty, commit=True):
+        """Draw a sale quantity from the earliest-expiring batches"""
+        heap = self.heaps.get(product, [])
+        if not commit:
+            heap = [entry[:] for entry in heap]
+        allocation = []
+        remaining = qty
+        while remaining > 0 and heap:
+            entry = heap[0]
+            take = entry[2] if entry[2] <= remaining else remaining
+            allocation.append((entry[3], take, entry[0]))
+            entry[2] -= take
+            remaining -= take
+            if entry[2] <= 0:
+                heapq.heappop(heap)
+        if remaining > 0:
+            allocation.append(('', remaining, NO_EXPIRY))
+        return allocation
+
+    def rename(self, old, new):
+        """Carry a product's open state over to its new name"""
+        if old in self.heaps:
+            self.heaps[new] = self.heaps.pop(old)
+
+    def apply(self, product, qty_received, qty_sold, batch, expiry):
+        """Apply one transaction (receipt before sale) and return the sale's allocation"""
+        if qty_received > 0:
+            self.receive(product, qty_received, batch, expiry)
+        allocation = self.allocate(product, qty_sold) if qty_sold > 0 else []
+        self.allocations.append(allocation)
+        return allocation
+
+    def replay(self, df, start=0):
+        """Apply ledger rows from `start` onward in ledger order"""
+        if start == 0:
+            self.reset()
+        rows = df.iloc[start:]
+        if len(rows) == 0:
+            return self.allocations
+
+        batches = rows['Batch'].fillna('').astype(str).tolist() if 'Batch' in rows else [''] * len(rows)
+        expiries = rows['Expiry Date'].tolist() if 'Expiry Date' in rows else [''] * len(rows)
+        apply = self.apply
+        for product, qty_received, qty_sold, batch, expiry in zip(
+            rows['Product Name'].tolist(),
+            rows['Quantity Received'].astype(float).tolist(),
+            rows['Quantity Sold'].astype(float).tolist(),
+            batches,
+            expiries,
+        ):
+            apply(product, qty_received, qty_sold, batch, parse_expiry(expiry))
+        return self.allocations
+
+    def expiring_within(self, days, today=None):
+        """List open batches expiring within `days`, walking only heap entries inside the window"""
+        today = (today or datetime.now()).toordinal()
+        cutoff = today + days
+        rows = []
+        for product, heap in self.heaps.items():
+            # Heap children never expire before their parent, so prune whole subtrees past the cutoff
+            stack = [0] if heap else []
+            while stack:
+                i = stack.pop()
+                if i >= len(heap) or heap[i][0] > cutoff:
+                    continue
+                expiry, _, qty, batch = heap[i]
+                if qty > 0:
+                    rows.append({
+                        'Product Name': product,
+                        'Batch': batch,
+                        'Expiry Date': datetime.fromordinal(expiry).strftime('%d/%m/%Y'),
+                        'Quantity': qty,
+                        'Days Left': expiry - today,
+                    })
+                stack.extend((2 * i + 1, 2 * i + 2))
+        report = pd.DataFrame(rows, columns=['Product Name', 'Batch', 'Expiry Date', 'Quantity', 'Days Left'])
+        return report.sort_values('Days Left', kind='mergesort').reset_index(drop=True)
@@ -0,0 +1,328 @@
+"""
+Multi-branch inventory - one ledger partition per location over a shared product catalog
+"""
+
+import os
+import re
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .ledger import Ledger, locked
+from .money import MONEY_SCALE, QUANTITY_SCALE, round_money, round_quantity
+from .products import ProductCatalog
+from .queries import consolidate_partitions
+from .storage import (
+    BRANCHES_FILE,
+    STORAGE_FILE,
+    load_storage,
+    location_file,
+    save_registry,
+    transfers_list,
+)
+from .transactions import parse_date
+
+DEFAULT_LOCATION = "Main"
+
+TRANSFER_COLUMNS = ['Transfer ID', 'Date', 'Product Name', 'Quantity', 'Cost Price', 'From', 'To',
+                    'Out ID', 'In ID', 'Remarks']
+
+# Remarks of a transfer's rows: "Transfer #<id> to <target>[ - <remarks>]" / "... from <source>..."
+TRANSFER_REMARK = re.compile(r'^Transfer #(\d+) (to|from) ')
+
+
+class Branches:
+    """Locations, each with its own Ledger, plus the transfers between them
+
+    Every location is a separate partition: its own transactions, storage file,
+    archives and incremental engines. A transfer posts a stock-out row at the
+    source and a stock-in row at the destination, both at cost. Consolidated
+    figures add up each partition's cached summary instead of combining ledgers.
+    Every location shares one lock, so a change that spans locations (a
+    transfer, a rename) and its save are not interleaved with another session's.
+    """
+
+    def __init__(self, ledgers, catalog, transfers=None, registry_file=BRANCHES_FILE, tenant=None):
+        self.ledgers = dict(ledgers)        # location -> Ledger
+        self.catalog = catalog              # Shared by every location's ledger
+        self.transfers = list(transfers or [])
+        self.registry_file = registry_file
+        self.tenant = tenant                # Labels the ledgers' gauges ('' for the default tenant)
+        self.lock = threading.RLock()
+        for name, ledger in self.ledgers.items():
+            ledger.lock = self.lock
+            ledger.transfer_ids = self.transfer_ids(name)
+            ledger.label_metrics(tenant=tenant or '', location=name)
+
+    @classmethod
+    def load(cls, registry_file=BRANCHES_FILE, storage_file=STORAGE_FILE, tenant=None):
+        """Load every location, or a single main location from plain ledger storage"""
+        data = load_storage(registry_file)
+        if not data:
+            ledger = Ledger.load(storage_file)
+            return cls({DEFAULT_LOCATION: ledger}, ledger.catalog, registry_file=registry_file, tenant=tenant)
+
+        catalog = ProductCatalog.from_records(data['catalog'])
+        base = os.path.dirname(registry_file)
+        ledgers = {entry['name']: Ledger.load(os.path.join(base, entry['file']), catalog)
+                   for entry in data['locations']}
+        branches = cls(ledgers, catalog, transfers_list(data), registry_file, tenant)
+        changed = branches.reconcile()
+        if changed:
+            branches.save(*changed)
+        return branches
+
+    @locked
+    def save(self, *locations):
+        """Save the registry and the given locations' ledgers (every location when none are given)"""
+        for name in (locations or self.ledgers):
+            self.ledgers[name].save()
+        self.save_registry()
+
+    def save_registry(self):
+        """Save the catalog, locations and transfers once there is more than one location"""
+        if len(self.ledgers) < 2 and not os.path.exists(self.registry_file):
+            return
+        base = os.path.dirname(self.registry_file)
+        locations = [{'name': name, 'file': os.path.relpath(ledger.storage_file, base)}
+                     for name, ledger in self.ledgers.items()]
+        save_registry(self.catalog, locations, self.transfers, self.registry_file)
+
+    def forget_metrics(self):
+        """Drop every location's gauge series (the tenant is leaving memory)"""
+        for ledger in self.ledgers.values():
+            ledger.forget_metrics()
+
+    def memory_bytes(self):
+        """Estimated memory held by every location's ledger"""
+        return sum(ledger.memory_bytes() for ledger in self.ledgers.values())
+
+    # ---------- Locations ----------
+
+    def __getitem__(self, location):
+        return self.ledgers[location]
+
+    def __len__(self):
+        return len(self.ledgers)
+
+    def names(self):
+        """Location names in the order they were added"""
+        return list(self.ledgers)
+
+    @locked
+    def add_location(self, name):
+        """Add a location with an empty ledger sharing the product catalog"""
+        name = (name or '').strip()
+        if not name:
+            return False, "⚠️ Location name cannot be empty!"
+        if name in self.ledgers:
+            return False, f"⚠️ '{name}' already exists!"
+        storage_file = location_file(name, os.path.dirname(self.registry_file))
+        if any(ledger.storage_file == storage_file for ledger in self.ledgers.values()):
+            return False, f"⚠️ '{name}' is too close to an existing location name!"
+        self.ledgers[name] = Ledger(storage_file=storage_file, catalog=self.catalog)
+        self.ledgers[name].lock = self.lock
+        self.ledgers[name].label_metrics(tenant=self.tenant or '', location=name)
+        return True, f"✅ Location '{name}' added!"
+
+    # ---------- Products ----------
+
+    @locked
+    def rename_product(self, name, new_name):
+        """Rename a product in the shared catalog and relabel it in every location"""
+        old_name = self.catalog.canonical(name)
+        success, message = self.catalog.rename(name, new_name)
+        if success:
+            for ledger in self.ledgers.values():
+                ledger.product_renamed(old_name)
+        return success, message
+
+    @locked
+    def merge_products(self, source, target):
+        """Merge two products in the shared catalog and move the source's rows in every location"""
+        source_name = self.catalog.canonical(source)
+        success, message = self.catalog.merge(source, target)
+        if success:
+            for ledger in self.ledgers.values():
+                ledger.product_merged(source_name)
+        return success, message
+
+    # ---------- Transfers ----------
+
+    def transfer_cost(self, location, product):
+        """Cost per unit for moving a product out of a location: its last receipt cost, else the catalog default"""
+        rows = self.ledgers[location].product_df(product)
+        receipts = rows['Cost Price'][rows['Quantity Received'] > 0]
+        if len(receipts) > 0:
+            return float(receipts.iat[-1])
+        entry = self.catalog.entry(product)
+        return entry['cost_price'] if entry else 0.0
+
+    @locked
+    def transfer(self, date, product, quantity, source, target, cost_price=None, remarks=''):
+        """Move stock between locations as a paired stock-out and stock-in, posted together or not at all"""
+        if source not in self.ledgers or target not in self.ledgers:
+            return False, "⚠️ Location not found!"
+        if source == target:
+            return False, "⚠️ Choose two different locations!"
+        if product not in self.catalog:
+            return False, f"⚠️ Unknown product: {product}"
+        try:
+            datetime.strptime(str(date), '%d/%m/%Y')
+        except ValueError:
+            return False, f"⚠️ Date must be DD/MM/YYYY, got {date!r}"
+        quantity = round_quantity(quantity or 0)
+        if quantity <= 0:
+            return False, "⚠️ Transfer quantity must be more than zero!"
+        product = self.catalog.canonical(product)
+        available = float(self.ledgers[source].current_stock(product))
+        if quantity > available:
+            return False, f"⚠️ Only {available:,.3f} {product} in stock at {source}!"
+        cost_price = round_money(self.transfer_cost(source, product) if cost_price is None else cost_price)
+
+        transfer_id = max((transfer['Transfer ID'] for transfer in self.transfers), default=0) + 1
+        note = f" - {remarks}" if remarks else ''
+        source_ledger, target_ledger = self.ledgers[source], self.ledgers[target]
+
+        # Build both sides before swapping either in, so a failure leaves both ledgers untouched
+        out_df = source_ledger.prepare_transaction(date, product, 0, quantity, cost_price, cost_price,
+                                                   f"Transfer #{transfer_id} to {target}{note}")
+        in_df = target_ledger.prepare_transaction(date, product, quantity, 0, cost_price, cost_price,
+                                                  f"Transfer #{transfer_id} from {source}{note}")
+        out_id, in_id = int(out_df['Transaction ID'].iat[-1]), int(in_df['Transaction ID'].iat[-1])
+        # Marked before committing, so engines that see the new rows already leave them out
+        source_ledger.transfer_ids.add(out_id)
+        target_ledger.transfer_ids.add(in_id)
+        source_ledger.commit(out_df)
+        target_ledger.commit(in_df)
+        self.transfers.append({
+            'Transfer ID': transfer_id, 'Date': date, 'Product ID': self.catalog.id_for(product),
+            'Quantity': quantity, 'Cost Price': cost_price, 'From': source, 'To': target,
+            'Out ID': out_id, 'In ID': in_id, 'Remarks': remarks,
+        })
+        return True, f"✅ Transfer #{transfer_id}: {quantity:,.3f} {product} from {source} to {target}"
+
+    def transfer_of(self, location, txn_id):
+        """Transfer log entry that posted a transaction of a location, or None"""
+        for transfer in self.transfers:
+            if (transfer['From'], transfer['Out ID']) == (location, txn_id) or \
+                    (transfer['To'], transfer['In ID']) == (location, txn_id):
+                return transfer
+        return None
+
+    @locked
+    def delete_transfer(self, transfer_id):
+        """Delete both sides of a transfer and its log entry"""
+        transfer = next((entry for entry in self.transfers if entry['Transfer ID'] == transfer_id), None)
+        if transfer is None:
+            return False, f"⚠️ Transfer #{transfer_id} not found!"
+        self._remove_transfer(transfer)
+        return True, f"✅ Transfer #{transfer_id} deleted from {transfer['From']} and {transfer['To']}"
+
+    def _remove_transfer(self, transfer):
+        """Drop a transfer from the log and delete whichever of its sides are posted"""
+        self.transfers.remove(transfer)
+        for location, txn_id in ((transfer['From'], transfer['Out ID']), (transfer['To'], transfer['In ID'])):
+            ledger = self.ledgers.get(location)
+            if ledger is not None and txn_id in ledger.index()['ids']:
+                ledger.delete_transfer_leg(txn_id)
+            if ledger is not None:
+                ledger.transfer_ids.discard(txn_id)
+
+    @locked
+    def reconcile(self):
+        """Match the transfer log with the ledgers after an interrupted save; returns the locations changed
+
+        A transfer is saved as the source ledger, then the target ledger,
+        then the log. Logged transfers with a side missing (and not archived)
+        are removed with their other side. Sides of a transfer newer than the
+        log's last one are logged when both are posted, and deleted otherwise.
+        """
+        changed = set()
+        for transfer in list(self.transfers):
+            sides = [(transfer['From'], transfer['Out ID']), (transfer['To'], transfer['In ID'])]
+            if not all(self._posted(location, txn_id, transfer['Date']) for location, txn_id in sides):
+                self._remove_transfer(transfer)
+                changed.update(location for location, _ in sides if location in self.ledgers)
+
+        last = max((transfer['Transfer ID'] for transfer in self.transfers), default=0)
+        unlogged = {}   # transfer number -> {'to' / 'from': (location, row)}
+        for location, ledger in self.ledgers.items():
+            remarks = ledger.df['Remarks'].fillna('').astype(str)
+            for position in np.flatnonzero(remarks.str.match(TRANSFER_REMARK).values):
+                row = ledger.df.iloc[position]
+                number, direction = TRANSFER_REMARK.match(row['Remarks']).groups()
+                if int(number) > last:
+                    unlogged.setdefault(int(number), {})[direction] = (location, row)
+
+        for number, sides in sorted(unlogged.items()):
+            if set(sides) == {'to', 'from'} and sides['to'][0] != sides['from'][0]:
+                (source, out_row), (target, in_row) = sides['to'], sides['from']
+                prefix = f"Transfer #{number} to {target}"
+                remarks = out_row['Remarks'][len(prefix) + 3:] if out_row['Remarks'].startswith(prefix + ' - ') else ''
+                self.transfers.append({
+                    'Transfer ID': number, 'Date': out_row['Date'],
+                    'Product ID': self.catalog.id_for(out_row['Product Name']),
+                    'Quantity': float(out_row['Quantity Sold']), 'Cost Price': float(out_row['Cost Price']),
+                    'From': source, 'To': target, 'Out ID': int(out_row['Transaction ID']),
+                    'In ID': int(in_row['Transaction ID']), 'Remarks': remarks,
+                })
+                self.ledgers[source].transfer_ids.add(int(out_row['Transaction ID']))
+                self.ledgers[target].transfer_ids.add(int(in_row['Transaction ID']))
+                changed.update((source, target))
+            else:
+                for location, row in sides.values():
+                    self.ledgers[location].delete_transfer_leg(int(row['Transaction ID']))
+                    changed.add(location)
+        return sorted(changed)
+
+    def _posted(self, location, txn_id, date):
+        """Whether a transfer's side is in its location's ledger (or was archived with its date)"""
+        ledger = self.ledgers.get(location)
+        if ledger is None:
+            return False
+        if txn_id in ledger.index()['ids']:
+            return True
+        through = ledger.archived_through()
+        return through is not None and parse_date(date).date() <= through
+
+    def transfer_ids(self, location):
+        """Transaction IDs of transfer rows in one location's ledger"""
+        return ({transfer['Out ID'] for transfer in self.transfers if transfer['From'] == location}
+                | {transfer['In ID'] for transfer in self.transfers if transfer['To'] == location})
+
+    def transfers_df(self):
+        """Transfer log, newest first"""
+        rows = [dict(transfer, **{'Product Name': self.catalog.name(transfer['Product ID'])})
+                for transfer in reversed(self.transfers)]
+        return pd.DataFrame(rows, columns=TRANSFER_COLUMNS)
+
+    # ---------- Consolidation ----------
+
+    def partition_summaries(self, date_range=None):
+        """Each location's cached per-product summary (rebuilt only for locations that changed)"""
+        return {name: ledger.partition_summary(self.transfer_ids(name), date_range)
+                for name, ledger in self.ledgers.items()}
+
+    def consolidated_summary(self, date_range=None):
+        """Per-product totals across every location, with transfers between them netted out"""
+        return consolidate_partitions(self.partition_summaries(date_range).values())
+
+    def location_summary(self, date_range=None):
+        """Sales, profit, stock and transfers per location"""
+        rows = []
+        for name, summary in self.partition_summaries(date_range).items():
+            totals = summary.sum()
+            rows.append({
+                'Location': name,
+                'Transactions': int(totals.get('Transactions', 0)),
+                'Total Sales': (totals.get('Total Sales', 0) - totals.get('Transfer Out Value', 0)) / MONEY_SCALE,
+                'Profit': totals.get('Profit', 0) / MONEY_SCALE,
+                'Current Stock': totals.get('Current Stock', 0) / QUANTITY_SCALE,
+                'Transfers In': totals.get('Transfer In', 0) / QUANTITY_SCALE,
+                'Transfers Out': totals.get('Transfer Out', 0) / QUANTITY_SCALE,
+            })
+        return pd.DataFrame(rows, columns=['Location', 'Transactions', 'Total Sales', 'Profit', 'Current Stock',
+                                           'Transfers In', 'Transfers Out'])
@@ -0,0 +1,128 @@
+"""
+Cost lot engine for true COGS under FIFO or weighted-average costing
+"""
+
+from collections import deque
+
+import numpy as np
+
+from .money import from_paise, line_total, to_paise
+
+# Costing Methods
+COSTING_METHODS = ["As Entered", "FIFO", "Weighted Average"]
+
+
+class CostLotEngine:
+    """Track received cost lots per product and compute COGS under FIFO or weighted average"""
+
+    def __init__(self, method="FIFO"):
+        if method not in ("FIFO", "Weighted Average"):
+            raise ValueError(f"Unknown costing method: {method}")
+        self.method = method
+        self.lots = {}          # FIFO: product -> deque of [qty, unit_cost]
+        self.averages = {}      # Weighted Average: product -> [qty, total_cost]
+        self.cogs = []          # COGS per applied ledger row
+        self.synced_version = None
+
+    @property
+    def applied(self):
+        """Number of ledger rows applied so far"""
+        return len(self.cogs)
+
+    def reset(self):
+        """Drop all lots and applied rows"""
+        self.lots.clear()
+        self.averages.clear()
+        self.cogs = []
+        self.synced_version = None
+
+    def rename(self, old, new):
+        """Carry a product's open state over to its new name"""
+        if old in self.lots:
+            self.lots[new] = self.lots.pop(old)
+        if old in self.averages:
+            self.averages[new] = self.averages.pop(old)
+
+    def apply(self, product, qty_received, qty_sold, cost_price):
+        """Apply one transaction (receipt before sale) and return its COGS"""
+        if self.method == "FIFO":
+            cogs = self._apply_fifo(product, qty_received, qty_sold, cost_price)
+        else:
+            cogs = self._apply_average(product, qty_received, qty_sold, cost_price)
+        self.cogs.append(cogs)
+        return cogs
+
+    def _apply_fifo(self, product, qty_received, qty_sold, cost_price):
+        lots = self.lots.get(product)
+        if lots is None:
+            lots = self.lots[product] = deque()
+        if qty_received > 0:
+            lots.append([qty_received, cost_price])
+
+        cogs = 0.0
+        remaining = qty_sold
+        while remaining > 0 and lots:
+            lot = lots[0]
+            take = lot[0] if lot[0] <= remaining else remaining
+            cogs += take * lot[1]
+            remaining -= take
+            lot[0] -= take
+            if lot[0] <= 0:
+                lots.popleft()
+        if remaining > 0:
+            # Sold more than stock on hand: cost the shortfall at the entered price
+            cogs += remaining * cost_price
+        return cogs
+
+    def _apply_average(self, product, qty_received, qty_sold, cost_price):
+        state = self.averages.get(product)
+        if state is None:
+            state = self.averages[product] = [0.0, 0.0]
+        if qty_received > 0:
+            state[0] += qty_received
+            state[1] += qty_received * cost_price
+
+        if qty_sold <= 0:
+            return 0.0
+        if state[0] <= 0:
+            return qty_sold * cost_price
+
+        unit_cost = state[1] / state[0]
+        take = qty_sold if qty_sold <= state[0] else state[0]
+        cogs = take * unit_cost + (qty_sold - take) * cost_price
+        state[0] -= take
+        state[1] -= take * unit_cost
+        return cogs
+
+    def replay(self, df, start=0):
+        """Apply ledger rows from `start` onward in ledger order"""
+        if start == 0:
+            self.reset()
+        rows = df.iloc[start:]
+        if len(rows) == 0:
+            return self.cogs
+
+        apply = self.apply
+        for product, qty_received, qty_sold, cost_price in zip(
+            rows['Product Name'].tolist(),
+            rows['Quantity Received'].astype(float).tolist(),
+            rows['Quantity Sold'].astype(float).tolist(),
+            rows['Cost Price'].astype(float).tolist(),
+        ):
+            apply(product, qty_received, qty_sold, cost_price)
+        return self.cogs
+
+
+def apply_costing(df, method, cogs=None):
+    """Return a copy of the ledger with COGS and Profit under the chosen costing method"""
+    costed = df.copy()
+    if method == "As Entered" or len(df) == 0:
+        costed['COGS'] = from_paise(line_total(costed['Quantity Sold'], costed['Cost Price']))
+        return costed
+
+    if cogs is None:
+        cogs = CostLotEngine(method).replay(df)
+    cogs = to_paise(np.asarray(cogs, dtype=float))
+    costed['COGS'] = from_paise(cogs)
+    costed['Profit'] = from_paise(to_paise(costed['Total Sales']) - cogs)
+    return costed
@@ -0,0 +1,37 @@
+"""
+Excel exports of the ledger
+"""
+
+from io import BytesIO
+
+import pandas as pd
+
+from .metrics import EXPORT_SECONDS
+
+
+def create_excel_separate_sheets(df, products_list):
+    """Create Excel file with separate sheet for each product"""
+    output = BytesIO()
+    with EXPORT_SECONDS.time(format='excel_separate_sheets'), pd.ExcelWriter(output, engine='openpyxl') as writer:
+        # Create a sheet for each product
+        positions = df.groupby('Product Name', sort=False, observed=True).indices
+        for product in products_list:
+            if product in positions:
+                product_df = df.iloc[positions[product]]
+                product_df.to_excel(writer, sheet_name=product[:31], index=False)  # Excel sheet name limit is 31 chars
+        
+        # Create a summary sheet with all data
+        df.to_excel(writer, sheet_name='All Products', index=False)
+    
+    output.seek(0)
+    return output
+
+
+def create_excel_report(sheets):
+    """Create an Excel file from an ordered mapping of sheet name to dataframe"""
+    output = BytesIO()
+    with EXPORT_SECONDS.time(format='excel_report'), pd.ExcelWriter(output, engine='openpyxl') as writer:
+        for sheet_name, sheet_df in sheets.items():
+            sheet_df.to_excel(writer, sheet_name=sheet_name[:31], index=False)  # Excel sheet name limit is 31 chars
+    output.seek(0)
+    return output
@@ -0,0 +1,178 @@
+"""
+Demand forecasting - daily sales rates, monthly seasonality, days of cover and reorder points
+"""
+
+from datetime import datetime
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from .money import QUANTITY_SCALE, to_milli
+from .queries import MISSING_DAY, day_numbers, format_day, to_day
+
+# Trailing windows (days) for the rolling mean daily sales
+ROLLING_WINDOWS = (7, 28, 90)
+# Window whose mean is the base demand rate, and the one whose spread sizes safety stock
+RATE_WINDOW = 28
+VOLATILITY_WINDOW = 90
+# Daily history used for seasonality, and how far ahead stock is projected
+HISTORY_DAYS = 3 * 365
+HORIZON_DAYS = 365
+# Monthly factors need a full year of history, and are kept within these bounds
+SEASONAL_MIN_DAYS = 365
+SEASONAL_BOUNDS = (0.2, 5.0)
+
+DEFAULT_SERVICE_LEVEL = 0.95
+
+# Status labels, most urgent first
+REORDER_STATUSES = ['🔴 Reorder now', '🟠 Reorder soon', '🟢 OK', '⚪ No recent sales']
+
+FORECAST_COLUMNS = ['Product Name', 'Status', 'Current Stock', 'Avg Daily (7d)', 'Avg Daily (28d)',
+                    'Avg Daily (90d)', 'Seasonal Factor', 'Forecast Daily', 'Days of Cover', 'Stockout Date',
+                    'Lead Time (days)', 'Safety Stock', 'Reorder Point']
+
+
+class DemandEngine:
+    """Daily quantity sold per product, extended as rows are appended
+
+    Only the (product, day) totals are kept, so a forecast reads a small
+    products x days matrix rather than the ledger. Rows listed by `excluded`
+    (opening-balance rows that carry an archived period's totals, and stock
+    transfers to other locations) are left out.
+    """
+
+    def __init__(self, excluded=None):
+        self.excluded = excluded    # Callable returning transaction IDs that are not sales
+        self.daily = None           # (product, day) -> quantity sold in thousandths
+        self.rows = 0
+        self.synced_version = None
+
+    @property
+    def applied(self):
+        """Number of ledger rows applied so far"""
+        return self.rows
+
+    def replay(self, df, start=0):
+        """Add daily sales of ledger rows from `start` onward"""
+        if start == 0:
+            self.daily = None
+        rows = df.iloc[start:]
+        if len(rows) > 0:
+            sold = to_milli(rows['Quantity Sold'])
+            days = day_numbers(rows['Date'])
+            keep = (sold > 0) & (days != MISSING_DAY)
+            excluded = self.excluded() if self.excluded else ()
+            if excluded:
+                keep &= ~rows['Transaction ID'].isin(list(excluded)).values
+            if keep.any():
+                products = np.asarray(rows['Product Name'].astype(object))[keep]
+                chunk = pd.Series(sold[keep]).groupby([products, days[keep]]).sum()
+                self.daily = chunk if self.daily is None else self.daily.add(chunk, fill_value=0).astype(np.int64)
+        self.rows = len(df)
+        return self
+
+    def rename(self, old_name, new_name):
+        """Carry a product's history over to its new name"""
+        if self.daily is not None:
+            self.daily = self.daily.rename(index={old_name: new_name}, level=0)
+
+    def matrix(self, products, first, last):
+        """Units sold per product (rows) and day (columns) from day `first` to `last`"""
+        sales = np.zeros((len(products), last - first + 1))
+        if self.daily is not None and len(sales):
+            rows = pd.Index(products).get_indexer(self.daily.index.get_level_values(0))
+            cols = self.daily.index.get_level_values(1).values - first
+            keep = (rows >= 0) & (cols >= 0) & (cols < sales.shape[1])
+            np.add.at(sales, (rows[keep], cols[keep]), self.daily.values[keep] / QUANTITY_SCALE)
+        return sales
+
+    def first_day(self):
+        """Earliest day with a sale, or None"""
+        if self.daily is None or len(self.daily) == 0:
+            return None
+        return int(self.daily.index.get_level_values(1).min())
+
+    def forecast(self, stock, lead_times, as_of=None, service_level=DEFAULT_SERVICE_LEVEL):
+        """Demand rates, days of cover, stockout dates and reorder points, most at-risk first
+
+        `stock` maps products to their current stock and `lead_times` to their
+        lead time in days. All products are computed together on a
+        products x days matrix.
+        """
+        as_of = to_day(as_of or datetime.now())
+        products = list(stock)
+        if not products:
+            return pd.DataFrame(columns=FORECAST_COLUMNS)
+        first = self.first_day()
+        first = as_of if first is None else min(max(first, as_of - HISTORY_DAYS + 1), as_of)
+        sales = self.matrix(products, first, as_of)
+        span = sales.shape[1]
+
+        rolling = {window: sales[:, -window:].sum(axis=1) / min(window, span) for window in ROLLING_WINDOWS}
+        factors = monthly_factors(sales, first)
+        month = _month_of(np.array([as_of]))[0]
+        current = factors[:, month]
+        base = rolling[RATE_WINDOW] / current
+
+        # Projected daily demand over the horizon, following each product's monthly pattern
+        future = _month_of(np.arange(as_of + 1, as_of + HORIZON_DAYS + 1))
+        projected = base[:, None] * factors[:, future]
+        cumulative = projected.cumsum(axis=1)
+
+        on_hand = np.maximum(np.array([float(stock[product]) for product in products]), 0.0)
+        runs_out = cumulative[:, -1] >= on_hand
+        first_short = np.argmax(cumulative >= on_hand[:, None], axis=1) + 1
+        cover = np.where(on_hand <= 0, 0.0, np.where(runs_out & (base > 0), first_short, np.nan))
+
+        lead = np.clip(np.array([int(lead_times.get(product, 1)) for product in products], dtype=np.int64),
+                       1, HORIZON_DAYS)
+        lead_demand = cumulative[np.arange(len(products)), lead - 1]
+        volatility = sales[:, -VOLATILITY_WINDOW:].std(axis=1)
+        safety = NormalDist().inv_cdf(service_level) * volatility * np.sqrt(lead)
+        reorder_point = lead_demand + safety
+
+        status = np.select(
+            [base <= 0, on_hand <= reorder_point, cover <= 2 * lead],
+            [REORDER_STATUSES[3], REORDER_STATUSES[0], REORDER_STATUSES[1]],
+            default=REORDER_STATUSES[2],
+        )
+        report = pd.DataFrame({
+            'Product Name': products,
+            'Status': status,
+            'Current Stock': on_hand,
+            'Avg Daily (7d)': rolling[7],
+            'Avg Daily (28d)': rolling[28],
+            'Avg Daily (90d)': rolling[90],
+            'Seasonal Factor': current,
+            'Forecast Daily': projected[:, :30].mean(axis=1),
+            'Days of Cover': cover,
+            'Stockout Date': [format_day(as_of + int(days)) if not np.isnan(days) else '' for days in cover],
+            'Lead Time (days)': lead,
+            'Safety Stock': safety,
+            'Reorder Point': reorder_point,
+        }, columns=FORECAST_COLUMNS)
+        rank = report['Status'].map({label: i for i, label in enumerate(REORDER_STATUSES)})
+        order = np.lexsort((report['Days of Cover'].fillna(np.inf).values, rank.values))
+        return report.iloc[order].reset_index(drop=True).round(3)
+
+
+def monthly_factors(sales, first):
+    """Each product's mean daily sales per calendar month over its overall mean (1 without a year of history)"""
+    factors = np.ones((sales.shape[0], 12))
+    if sales.shape[1] < SEASONAL_MIN_DAYS:
+        return factors
+    months = _month_of(np.arange(first, first + sales.shape[1]))
+    onehot = np.zeros((sales.shape[1], 12))
+    onehot[np.arange(sales.shape[1]), months] = 1
+    days = onehot.sum(axis=0)
+    means = (sales @ onehot) / np.where(days > 0, days, 1)
+    overall = sales.mean(axis=1, keepdims=True)
+    seasonal = (overall > 0) & (days > 0)
+    factors = np.where(seasonal, means / np.where(overall > 0, overall, 1), 1.0)
+    return np.clip(factors, *SEASONAL_BOUNDS)
+
+
+def _month_of(days):
+    """Calendar month (0-11) of day numbers"""
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64) % 12
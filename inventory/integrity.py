@@ -0,0 +1,135 @@
+"""
+Ledger integrity check and repair
+
+    python -m inventory.integrity [--storage data.json] [--repair]
+
+Stock Left and the row totals are stored rather than derived, so hand edits,
+old loaders or partial saves can leave them out of step with the quantities
+and prices. The check recomputes every derived column in one vectorized pass
+(a grouped cumulative sum for stock) and lists each cell that disagrees.
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from .money import MONEY_SCALE, QUANTITY_SCALE, compute_totals, to_milli, to_paise
+
+# Columns recomputed from quantities and prices
+DERIVED_COLUMNS = ['Stock Left', 'Total Purchase', 'Total Sales', 'Profit']
+
+# Fixed-point scale of each derived column; comparisons are exact on these integers
+DERIVED_SCALES = [QUANTITY_SCALE, MONEY_SCALE, MONEY_SCALE, MONEY_SCALE]
+
+REPORT_COLUMNS = ['Transaction ID', 'Product Name', 'Column', 'Stored', 'Expected']
+
+
+def expected_derived(df, opening_ids=()):
+    """Derived columns recomputed from quantities and prices, as fixed-point integers in ledger order"""
+    delta = pd.Series(to_milli(df['Quantity Received']) - to_milli(df['Quantity Sold']), index=df.index)
+    purchase, sales, profit = compute_totals(df['Quantity Received'], df['Quantity Sold'],
+                                             df['Cost Price'], df['Selling Price'])
+    expected = pd.DataFrame({
+        'Stock Left': delta.groupby(df['Product Name'], sort=False, observed=True).cumsum(),
+        'Total Purchase': purchase,
+        'Total Sales': sales,
+        'Profit': profit,
+    }, index=df.index)
+
+    if opening_ids:
+        # Opening-balance rows carry archived cumulative totals, not qty x price
+        opening = df['Transaction ID'].isin(opening_ids).values
+        for col in ['Total Purchase', 'Total Sales', 'Profit']:
+            expected.loc[opening, col] = to_paise(df.loc[opening, col])
+    return expected
+
+
+def stored_derived(df):
+    """Stored derived columns as fixed-point integers (blanks and text count as 0)"""
+    return pd.DataFrame({
+        col: to_milli(df[col]) if scale == QUANTITY_SCALE else to_paise(df[col])
+        for col, scale in zip(DERIVED_COLUMNS, DERIVED_SCALES)
+    }, index=df.index)
+
+
+def check_integrity(df, opening_ids=()):
+    """Return one report row per derived cell or transaction ID that is inconsistent"""
+    if len(df) == 0:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+
+    expected = expected_derived(df, opening_ids).values
+    stored = stored_derived(df).values
+    missing = df[DERIVED_COLUMNS].isna().values
+    rows, cols = np.nonzero((stored != expected) | missing)
+    scales = np.asarray(DERIVED_SCALES, dtype=float)[cols]
+    report = pd.DataFrame({
+        'Transaction ID': df['Transaction ID'].values[rows],
+        'Product Name': df['Product Name'].values[rows],
+        'Column': np.asarray(DERIVED_COLUMNS, dtype=object)[cols],
+        'Stored': np.where(missing[rows, cols], np.nan, stored[rows, cols] / scales),
+        'Expected': expected[rows, cols] / scales,
+    })
+
+    duplicated = df['Transaction ID'].duplicated(keep='first').values
+    if duplicated.any():
+        ids = pd.DataFrame({
+            'Transaction ID': df['Transaction ID'].values[duplicated],
+            'Product Name': df['Product Name'].values[duplicated],
+            'Column': 'Transaction ID',
+            'Stored': df['Transaction ID'].values[duplicated].astype(float),
+            'Expected': np.nan,
+        })
+        report = pd.concat([report, ids], ignore_index=True)
+    return report
+
+
+def repair_integrity(df, opening_ids=()):
+    """Overwrite derived columns with recomputed values and renumber duplicate IDs"""
+    df = df.copy()
+    expected = expected_derived(df, opening_ids)
+    for col, scale in zip(DERIVED_COLUMNS, DERIVED_SCALES):
+        df[col] = expected[col].values / scale
+
+    duplicated = df['Transaction ID'].duplicated(keep='first').values
+    if duplicated.any():
+        start = int(df['Transaction ID'].max()) + 1
+        df.loc[duplicated, 'Transaction ID'] = np.arange(start, start + duplicated.sum())
+    return df
+
+
+def summarize_report(report):
+    """Mismatch counts per column"""
+    return report.groupby('Column').size().to_dict() if len(report) else {}
+
+
+def main(argv=None):
+    # Imported here: the Ledger itself builds on this module
+    from .ledger import Ledger
+    from .storage import STORAGE_FILE
+
+    parser = argparse.ArgumentParser(description="Check (and optionally repair) the ledger's derived columns")
+    parser.add_argument('--storage', default=STORAGE_FILE, help="ledger JSON file")
+    parser.add_argument('--repair', action='store_true', help="recompute derived columns and save")
+    parser.add_argument('--limit', type=int, default=20, help="mismatches to print")
+    args = parser.parse_args(argv)
+
+    ledger = Ledger.load(args.storage)
+    report = ledger.check_integrity()
+    print(f"Checked {len(ledger.df):,} transactions: {len(report):,} issue(s)")
+    for column, count in summarize_report(report).items():
+        print(f"  {column}: {count:,}")
+    if len(report):
+        print(report.head(args.limit).to_string(index=False))
+
+    if args.repair and len(report):
+        ledger.repair()
+        ledger.save()
+        print(f"Repaired and saved {args.storage}")
+        return 0
+    return 1 if len(report) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,806 @@
+"""
+Ledger - the headless inventory engine
+Holds the transaction table and product catalog, and keeps its indexes and
+incremental engines in step with every mutation.
+"""
+
+import functools
+import math
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .anomalies import DEFAULT_ANOMALY_THRESHOLD, AnomalyDetector, describe_anomaly
+from .archive import archive_ledger, opening_cost_delta
+from .batches import BatchTracker
+from .costing import CostLotEngine, apply_costing
+from .export import create_excel_separate_sheets
+from .forecast import DEFAULT_SERVICE_LEVEL, DemandEngine
+from .integrity import check_integrity, repair_integrity
+from .metrics import (
+    IMPORT_BATCH_SIZE,
+    LEDGER_ROWS,
+    LOAD_SECONDS,
+    SAVE_SECONDS,
+    STORAGE_BYTES,
+    TRANSACTIONS_INGESTED,
+    record_cache,
+)
+from .products import DEFAULT_PRODUCTS, ProductCatalog
+from .queries import (
+    DateIndex,
+    build_asof_index,
+    query_asof,
+    stock_statement_asof,
+    summarize_partition,
+    summarize_products,
+    to_day,
+)
+from .receivables import ReceivablesBook
+from .search import RemarksIndex
+from .money import MAX_PAYMENT, MONEY_SCALE, QUANTITY_SCALE, check_limit, round_money, to_paise, to_storage
+from .storage import (
+    STORAGE_FILE,
+    archive_dir,
+    file_stamp,
+    load_storage,
+    payments_list,
+    read_archive,
+    save_storage,
+    transactions_frame,
+    write_archive,
+)
+from .transactions import (
+    add_transaction,
+    add_transactions,
+    apply_transaction_edits,
+    build_bulk_filter_mask,
+    build_ledger_index,
+    bulk_adjust_prices,
+    bulk_delete,
+    calculate_stock_left,
+    create_empty_dataframe,
+    delete_transaction_by_id,
+    next_transaction_id,
+    normalize_dataframe,
+    parse_date,
+    recalculate_stock,
+    validate_import_record,
+    validate_transaction,
+)
+from .trends import DEFAULT_TREND_WINDOW, price_trends
+
+# Derived values kept per ledger; the least recently used go first
+CACHE_ENTRIES = 64
+
+
+def locked(method):
+    """Run a method while holding its object's `lock`"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class Ledger:
+    """Inventory ledger with ingest, mutation, aggregation, query and export"""
+
+    def __init__(self, df=None, products=None, storage_file=STORAGE_FILE, archives=None, catalog=None,
+                 payments=None, reviewed=None, last_id=0):
+        if catalog is None:
+            catalog = ProductCatalog.from_names(products if products is not None else DEFAULT_PRODUCTS)
+        self.catalog = catalog
+        self.df = catalog.encode(normalize_dataframe(df) if df is not None else create_empty_dataframe())
+        self.storage_file = storage_file
+        self.storage_stamp = None               # file_stamp at load or last save; saves refuse a file changed since
+        self.archives = list(archives or [])    # [{'through', 'file', 'rows', 'opening_ids'}]
+        self._archive_frames = {}
+        self.payments = list(payments or [])    # [{'Payment ID', 'Date', 'Customer', 'Amount', 'Remarks'}]
+        self.reviewed = set(reviewed or [])     # IDs of flagged transactions confirmed as correct
+        self.last_id = max(last_id or 0, next_transaction_id(self.df) - 1)    # Highest transaction ID ever issued
+        self.transfer_ids = set()               # IDs of transfer rows between locations (kept by Branches)
+        self.metric_labels = {}                 # 'tenant' and 'location' labels of this ledger's gauges
+        self.lock = threading.RLock()   # Held by every change, save and engine sync (shared by a tenant's locations)
+        self.version = 0            # Bumped on every change to the transactions
+        self.rewrite_version = 0    # Last version that edited or removed existing rows
+        self._cache = OrderedDict()     # key -> (version, value), least recently used first
+        self._engines = {}
+        self._date_index = DateIndex()
+        self._remarks_index = RemarksIndex()
+        self._receivables = ReceivablesBook(
+            lambda: [self.archived_df(entry['file']) for entry in self.archives])
+
+    # ---------- Storage ----------
+
+    @classmethod
+    def load(cls, storage_file=STORAGE_FILE, catalog=None):
+        """Load a ledger from JSON storage, or start with defaults (a shared catalog overrides the file's)"""
+        with LOAD_SECONDS.time():
+            stamp = file_stamp(storage_file)
+            data = load_storage(storage_file)
+            if not data:
+                ledger = cls(storage_file=storage_file, catalog=catalog)
+            else:
+                if catalog is None and 'catalog' in data:
+                    catalog = ProductCatalog.from_records(data['catalog'])
+                ledger = cls(transactions_frame(data, catalog), data.get('products'), storage_file,
+                             data.get('archives'), catalog, payments_list(data), data.get('anomaly_reviews'),
+                             data.get('last_transaction_id', 0))
+        ledger.storage_stamp = stamp
+        ledger._record_size()
+        return ledger
+
+    @locked
+    def save(self):
+        """Save the product catalog and transactions to JSON storage
+
+        Raises StorageBusy if another process is the file's writer or has saved it since this ledger was loaded.
+        """
+        with SAVE_SECONDS.time():
+            self.storage_stamp = save_storage(self.catalog, self.df, self.storage_file, self.archives, self.payments,
+                                              self.reviewed, self.last_id, self.storage_stamp)
+        self._record_size()
+
+    def memory_bytes(self):
+        """Estimated memory held by the transaction table and loaded archives"""
+        return self._cached('memory', lambda: int(self.df.memory_usage(deep=True).sum()) + sum(
+            int(frame.memory_usage(deep=True).sum()) for frame in self._archive_frames.values()))
+
+    def _record_size(self):
+        """Update the row-count and storage-size gauges"""
+        LEDGER_ROWS.set(len(self.df), **self.metric_labels)
+        if os.path.exists(self.storage_file):
+            STORAGE_BYTES.set(os.path.getsize(self.storage_file), **self.metric_labels)
+
+    def label_metrics(self, **labels):
+        """Move this ledger's gauges to new labels (tenant, location)"""
+        self.forget_metrics()
+        self.metric_labels = dict(self.metric_labels, **labels)
+        self._record_size()
+
+    def forget_metrics(self):
+        """Drop this ledger's gauge series, e.g. once it leaves memory"""
+        LEDGER_ROWS.remove(**self.metric_labels)
+        STORAGE_BYTES.remove(**self.metric_labels)
+
+    # ---------- Change tracking ----------
+
+    def _appended(self, df):
+        """Swap in a ledger that only gained rows at the end"""
+        TRANSACTIONS_INGESTED.inc(len(df) - len(self.df))
+        self.df = self.catalog.encode(df)
+        self.last_id = next_transaction_id(df, self.last_id) - 1
+        self.version += 1
+        LEDGER_ROWS.set(len(df), **self.metric_labels)
+        detector = self._engines.get('anomalies')
+        if detector is not None and detector.synced_version is not None:
+            # Once the detector is in use, new rows are scored as they arrive
+            self._synced(detector)
+
+    def _rewritten(self, df):
+        """Swap in a ledger whose existing rows were edited or removed"""
+        self.df = self.catalog.encode(df)
+        self.last_id = next_transaction_id(df, self.last_id) - 1
+        self.version += 1
+        self.rewrite_version = self.version
+        LEDGER_ROWS.set(len(df), **self.metric_labels)
+        if self.reviewed or self.transfer_ids:
+            # Reviews and transfer marks of removed rows must not carry over to a later row that reuses the ID
+            remaining = set(self.df['Transaction ID'].tolist())
+            self.reviewed &= remaining
+            self.transfer_ids &= remaining
+
+    def _relabelled(self, df):
+        """Swap in a ledger whose rows are unchanged apart from product labels"""
+        self.df = df
+        self.version += 1
+
+    def _cached(self, key, build):
+        """Return a value derived from the ledger, rebuilding it once per version
+
+        Only values of the current version are kept, and at most CACHE_ENTRIES
+        of those, so keys with parameters (date ranges, as-of days, thresholds)
+        cannot pile up.
+        """
+        version = self.version
+        with self.lock:
+            entry = self._cache.get(key)
+            hit = entry is not None and entry[0] == version
+            if hit:
+                self._cache.move_to_end(key)
+        record_cache(key if isinstance(key, str) else key[0], hit)
+        if hit:
+            return entry[1]
+
+        value = build()
+        with self.lock:
+            for stale in [k for k, (built, _) in self._cache.items() if built != self.version]:
+                del self._cache[stale]
+            if version == self.version:
+                self._cache[key] = (version, value)
+                while len(self._cache) > CACHE_ENTRIES:
+                    self._cache.popitem(last=False)
+        return value
+
+    @locked
+    def _synced(self, engine):
+        """Replay only appended rows into an incremental engine, or everything after a rewrite"""
+        if engine.synced_version != self.version:
+            if engine.synced_version is not None and engine.synced_version >= self.rewrite_version \
+                    and engine.applied <= len(self.df):
+                engine.replay(self.df, start=engine.applied)
+            else:
+                engine.replay(self.df)
+            engine.synced_version = self.version
+        return engine
+
+    # ---------- Ingest ----------
+
+    @locked
+    def add_transaction(self, date, product, qty_received, qty_sold, cost_price, selling_price,
+                        remarks='', batch='', expiry_date='', customer=''):
+        """Append one transaction with auto-calculations (a sale with a customer is on credit)"""
+        self.commit(self.prepare_transaction(date, product, qty_received, qty_sold, cost_price, selling_price,
+                                             remarks, batch, expiry_date, customer))
+
+    def prepare_transaction(self, date, product, qty_received, qty_sold, cost_price, selling_price,
+                            remarks='', batch='', expiry_date='', customer=''):
+        """Ledger frame with one more transaction; the ledger is unchanged until it is committed
+
+        Hold `lock` from here until the commit, so no other change lands in between.
+        """
+        validate_transaction(dict(product=product, qty_received=qty_received, qty_sold=qty_sold,
+                                  cost_price=cost_price, selling_price=selling_price))
+        product = self._known({product})[product]
+        return add_transaction(self.df, date, product, qty_received, qty_sold,
+                               cost_price, selling_price, remarks, batch, expiry_date, customer, self.last_id)
+
+    @locked
+    def commit(self, df):
+        """Swap in a frame built by prepare_transaction"""
+        self._appended(df)
+
+    @locked
+    def add_transactions(self, transactions):
+        """Append many transactions (add_transaction keyword dicts) in one step"""
+        if transactions:
+            IMPORT_BATCH_SIZE.observe(len(transactions))
+            names = self._known({txn['product'] for txn in transactions})
+            if any(name != product for product, name in names.items()):
+                transactions = [dict(txn, product=names[txn['product']]) for txn in transactions]
+            self._appended(add_transactions(self.df, transactions, self.last_id))
+
+    @locked
+    def ingest_records(self, records):
+        """Import bulk JSON records, adding unknown products; returns (imported, errors)"""
+        transactions = []
+        errors = []
+        for number, record in enumerate(records, start=1):
+            try:
+                transactions.append(validate_import_record(record))
+            except Exception as e:
+                errors.append((number, str(e)))
+
+        self.ingest(transactions)
+        return len(transactions), errors
+
+    @locked
+    def ingest(self, transactions):
+        """Append parsed transactions, adding unknown products to the catalog"""
+        for product in dict.fromkeys(txn['product'] for txn in transactions):
+            self.catalog.ensure(product)
+        self.add_transactions(transactions)
+
+    def _known(self, products):
+        """Current catalog names for new rows' products, adding unknown ones (and their categories)"""
+        for product in products:
+            if product not in self.catalog:
+                self.catalog.ensure(product, active=False)
+        self.catalog.encode(self.df)
+        return {product: self.catalog.canonical(product) for product in products}
+
+    # ---------- Mutation ----------
+
+    @locked
+    def delete(self, txn_id):
+        """Delete one transaction by ID (a transfer leg only goes with its transfer, see Branches.delete_transfer)"""
+        if txn_id in self.transfer_ids:
+            return False, f"⚠️ Transaction #{txn_id} is one side of a branch transfer - delete the whole transfer!"
+        if txn_id in self.opening_ids():
+            return False, f"⚠️ Transaction #{txn_id} is an opening balance from archiving and cannot be deleted!"
+        return self.delete_transfer_leg(txn_id)
+
+    @locked
+    def delete_transfer_leg(self, txn_id):
+        """Delete one side of a branch transfer; Branches deletes both sides together"""
+        df, success, message = delete_transaction_by_id(self.df.copy(), txn_id, self.index())
+        if success:
+            self._rewritten(df)
+        return success, message
+
+    @locked
+    def delete_first(self, product, date):
+        """Delete the first transaction for a product on a date"""
+        rows = self.product_df(product)
+        rows = rows[rows['Date'] == date]
+        if len(rows) == 0:
+            return False, "⚠️ No transaction found for selected product and date!"
+        return self.delete(int(rows['Transaction ID'].iat[0]))
+
+    @locked
+    def edit(self, edits):
+        """Apply a batch of cell edits {txn_id: {field: value}}"""
+        unknown = [changes['Product Name'] for changes in edits.values()
+                   if 'Product Name' in changes and changes['Product Name'] not in self.catalog]
+        if unknown:
+            return False, f"⚠️ Unknown product: {unknown[0]}"
+        protected = [txn_id for txn_id in edits if txn_id in self.non_trading_ids()]
+        if protected:
+            return False, f"⚠️ Transaction #{protected[0]} is an opening balance or branch transfer and cannot be edited!"
+        edits = {txn_id: dict(changes, **{'Product Name': self.catalog.canonical(changes['Product Name'])})
+                 if 'Product Name' in changes else changes for txn_id, changes in edits.items()}
+        df, success, message = apply_transaction_edits(self.df.copy(), edits, self.index())
+        if success:
+            self._rewritten(df)
+        return success, message
+
+    def filter_mask(self, product=None, date_range=None, remarks_text=None):
+        """Select rows by product, date range and remarks text (never opening balances or transfers)"""
+        return self._editable(build_bulk_filter_mask(self.df, product, date_range, remarks_text))
+
+    def _editable(self, mask):
+        """Drop opening-balance and transfer rows from a filter mask"""
+        protected = self.non_trading_ids()
+        if not protected:
+            return mask
+        return mask & ~self.df['Transaction ID'].isin(protected).values
+
+    @locked
+    def bulk_delete(self, mask):
+        """Delete every row matching a filter mask"""
+        df, success, message = bulk_delete(self.df.copy(), self._editable(mask))
+        if success:
+            self._rewritten(df)
+        return success, message
+
+    @locked
+    def bulk_adjust_prices(self, mask, cost_price=None, selling_price=None, percent=False):
+        """Set or scale prices on every row matching a filter mask"""
+        df, success, message = bulk_adjust_prices(self.df.copy(), self._editable(mask), cost_price, selling_price,
+                                                  percent)
+        if success:
+            self._rewritten(df)
+        return success, message
+
+    # ---------- Archive ----------
+
+    @locked
+    def archive(self, through):
+        """Move rows dated on or before `through` to cold storage behind opening-balance rows"""
+        through = parse_date(through).date()
+        through_str = through.strftime('%d/%m/%Y')
+        last = self.archived_through()
+        if last is not None and through <= last:
+            return False, f"⚠️ Already archived through {last.strftime('%d/%m/%Y')}!"
+
+        df, archived, opening_ids = archive_ledger(self.df.copy(), through, next_transaction_id(self.df, self.last_id),
+                                                   self.opening_ids())
+        if len(archived) == 0:
+            return False, f"⚠️ No transactions on or before {through_str}!"
+
+        name = f"ledger_through_{through.strftime('%Y%m%d')}.json.gz"
+        write_archive(os.path.join(archive_dir(self.storage_file), name), {
+            'through': through_str,
+            'products': self.catalog.names(include_inactive=True),
+            'scales': {'money': MONEY_SCALE, 'quantity': QUANTITY_SCALE},
+            'transactions': to_storage(archived).to_dict('records'),
+        })
+        self._archive_frames[name] = archived
+        self.archives.append({'through': through_str, 'file': name, 'rows': len(archived),
+                              'opening_ids': opening_ids})
+        self._rewritten(df)
+        return True, f"✅ Archived {len(archived)} transaction(s) through {through_str} into {name}"
+
+    def archived_through(self):
+        """Last date moved to cold storage, or None"""
+        if not self.archives:
+            return None
+        return pd.to_datetime(self.archives[-1]['through'], format='%d/%m/%Y').date()
+
+    def opening_ids(self):
+        """Transaction IDs of opening-balance rows written by archiving"""
+        return {txn_id for entry in self.archives for txn_id in entry['opening_ids']}
+
+    def non_trading_ids(self):
+        """Transaction IDs of rows that are not real sales or purchases (opening balances and transfers)"""
+        return self.opening_ids() | self.transfer_ids
+
+    def archived_df(self, name):
+        """Rows of one archive file, read from cold storage on first use"""
+        frame = self._archive_frames.get(name)
+        if frame is None:
+            data = read_archive(os.path.join(archive_dir(self.storage_file), name))
+            frame = self._archive_frames[name] = transactions_frame(data)
+        return frame
+
+    def history(self):
+        """Archived rows followed by the active ledger, without opening-balance rows"""
+        if not self.archives:
+            return self.df
+
+        def build():
+            frames = [self.archived_df(entry['file']) for entry in self.archives] + [self.df]
+            # Archived rows keep the names they were written with
+            full = self.catalog.encode(pd.concat(frames, ignore_index=True))
+            return full[~full['Transaction ID'].isin(self.opening_ids())].reset_index(drop=True)
+        return self._cached('history', build)
+
+    # ---------- Integrity ----------
+
+    def check_integrity(self):
+        """Derived cells and transaction IDs that disagree with the quantities and prices"""
+        return self._cached('integrity', lambda: check_integrity(self.df, self.opening_ids()))
+
+    @locked
+    def repair(self):
+        """Recompute every derived column and renumber duplicate IDs"""
+        issues = len(self.check_integrity())
+        if issues == 0:
+            return False, "✅ Ledger is consistent - nothing to repair"
+        self._rewritten(repair_integrity(self.df, self.opening_ids()))
+        return True, f"✅ Repaired {issues} issue(s) and recalculated derived columns!"
+
+    # ---------- Customer credit ----------
+
+    @locked
+    def add_payment(self, date, customer, amount, remarks=''):
+        """Record a payment received from a credit customer"""
+        customer = (customer or '').strip()
+        if not customer:
+            return False, "⚠️ Customer name cannot be empty!"
+        try:
+            amount = float(amount)
+            if math.isnan(amount):
+                raise ValueError("Payment amount must be a number")
+            check_limit(to_paise(amount), MAX_PAYMENT, MONEY_SCALE, "Payment amount")
+        except (TypeError, ValueError) as e:
+            return False, f"⚠️ {e}"
+        if amount <= 0:
+            return False, "⚠️ Payment amount must be more than zero!"
+        try:
+            datetime.strptime(str(date), '%d/%m/%Y')
+        except ValueError:
+            return False, f"⚠️ Date must be DD/MM/YYYY, got {date!r}"
+        payment_id = max((payment['Payment ID'] for payment in self.payments), default=0) + 1
+        self.payments.append({'Payment ID': payment_id, 'Date': date, 'Customer': customer,
+                              'Amount': round_money(amount), 'Remarks': remarks})
+        return True, f"✅ Payment #{payment_id} of ₹{float(amount):,.2f} from {customer} recorded!"
+
+    @locked
+    def delete_payment(self, payment_id):
+        """Remove a payment (balances are rebuilt on next use)"""
+        remaining = [payment for payment in self.payments if payment['Payment ID'] != payment_id]
+        if len(remaining) == len(self.payments):
+            return False, f"⚠️ Payment #{payment_id} not found!"
+        self.payments = remaining
+        self._receivables.reset()
+        return True, f"✅ Payment #{payment_id} deleted!"
+
+    def receivables(self):
+        """Per-customer balances and open invoices, synced to the ledger and payments"""
+        return self._synced(self._receivables).apply_payments(self.payments)
+
+    def customers(self):
+        """Customers with credit sales or payments, by name"""
+        return sorted(self.receivables().customers)
+
+    def customer_balances(self):
+        """Credit sales, payments and balance per customer"""
+        return self.receivables().balances()
+
+    def aging_report(self, today=None):
+        """Outstanding dues per customer in 0-30 / 31-60 / 61-90 / 90+ day buckets"""
+        return self.receivables().aging(today)
+
+    def customer_statement(self, customer):
+        """One customer's credit sales and payments with the running balance"""
+        return self.receivables().statement(customer)
+
+    # ---------- Anomalies ----------
+
+    def anomaly_detector(self):
+        """Per-row anomaly scores, synced to the ledger"""
+        detector = self._engines.get('anomalies')
+        if detector is None:
+            detector = self._engines['anomalies'] = AnomalyDetector(self.non_trading_ids)
+        return self._synced(detector)
+
+    def anomalies(self, threshold=DEFAULT_ANOMALY_THRESHOLD):
+        """Flagged transactions with their score and reason, highest score first"""
+        def build():
+            detector = self.anomaly_detector()
+            positions = detector.flagged(threshold)
+            rows = self.df.iloc[positions]
+            scores = detector.scores[positions]
+            report = rows.copy()
+            report.insert(0, 'Anomaly Score', scores.round(1))
+            report.insert(1, 'Anomaly Reason', describe_anomaly(rows, scores, detector.fields[positions],
+                                                                detector.typical[positions]))
+            return report.sort_values('Anomaly Score', ascending=False, kind='mergesort')
+        return self._cached(('anomalies', threshold), build)
+
+    def review_queue(self, threshold=DEFAULT_ANOMALY_THRESHOLD):
+        """Flagged transactions not yet confirmed as correct"""
+        flagged = self.anomalies(threshold)
+        return flagged[~flagged['Transaction ID'].isin(self.reviewed)]
+
+    @locked
+    def mark_reviewed(self, txn_ids):
+        """Confirm flagged transactions as correct, taking them off the review queue"""
+        txn_ids = {int(txn_id) for txn_id in txn_ids}
+        if not txn_ids:
+            return False, "⚠️ Select at least one transaction!"
+        self.reviewed |= txn_ids
+        return True, f"✅ {len(txn_ids)} transaction(s) marked as correct!"
+
+    def score_candidates(self, transactions, threshold=DEFAULT_ANOMALY_THRESHOLD):
+        """Anomaly score and reason for transactions not yet added (add_transaction keyword dicts), in order"""
+        rows = pd.DataFrame({
+            'Product Name': [self.catalog.canonical(txn['product']) for txn in transactions],
+            'Quantity Sold': [float(txn['qty_sold']) for txn in transactions],
+            'Selling Price': [float(txn['selling_price']) for txn in transactions],
+            'Quantity Received': [float(txn['qty_received']) for txn in transactions],
+            'Cost Price': [float(txn['cost_price']) for txn in transactions],
+        })
+        scores, fields, typical = self.anomaly_detector().score(rows)
+        reasons = describe_anomaly(rows, scores, fields, typical)
+        return pd.DataFrame({
+            'Anomaly Score': scores.round(1),
+            'Anomaly Reason': [reason if score >= threshold else '' for reason, score in zip(reasons, scores)],
+        })
+
+    # ---------- Products ----------
+
+    @property
+    def products(self):
+        """Active product names in catalog order"""
+        return self.catalog.names()
+
+    def product_name(self, product_id):
+        """Product name for a catalog ID"""
+        return self.catalog.name(product_id)
+
+    @locked
+    def add_product(self, name, sku='', unit='', cost_price=0.0, selling_price=0.0):
+        """Add a product to the catalog"""
+        return self.catalog.add(name, sku, unit, cost_price, selling_price)
+
+    @locked
+    def update_product(self, product_id, **fields):
+        """Change a product's SKU, unit or default prices"""
+        return self.catalog.update(product_id, **fields)
+
+    @locked
+    def remove_product(self, name):
+        """Remove a product from the catalog (its ID and transactions are kept)"""
+        return self.catalog.remove(name)
+
+    @locked
+    def rename_product(self, name, new_name):
+        """Rename a product - relabels its category, leaving the rows untouched"""
+        old_name = self.catalog.canonical(name)
+        success, message = self.catalog.rename(name, new_name)
+        if success:
+            self.product_renamed(old_name)
+        return success, message
+
+    @locked
+    def product_renamed(self, old_name):
+        """Relabel rows after the catalog renamed a product (also used when the catalog is shared)"""
+        new_name = self.catalog.canonical(old_name)
+        df = self.df.copy(deep=False)
+        if old_name in df['Product Name'].cat.categories:
+            df['Product Name'] = df['Product Name'].cat.rename_categories({old_name: new_name})
+        for engine in self._engines.values():
+            engine.rename(old_name, new_name)
+        self._relabelled(self.catalog.encode(df))
+
+    @locked
+    def merge_products(self, source, target):
+        """Fold one product's history into another by remapping category codes, then re-sequence stock"""
+        source_name = self.catalog.canonical(source)
+        success, message = self.catalog.merge(source, target)
+        if success:
+            self.product_merged(source_name)
+        return success, message
+
+    @locked
+    def product_merged(self, source_name):
+        """Move a merged-away product's rows to its target after the catalog merged them"""
+        if source_name not in self.index()['products']:
+            return
+        df = self.catalog.encode(self.df.copy())
+        df['Product Name'] = self.catalog.remap_codes(df['Product Name'], source_name)
+        self._rewritten(recalculate_stock(df, [self.catalog.canonical(source_name)]))
+
+    @locked
+    def reset_products(self):
+        """Make the default products the active ones"""
+        for product_id in self.catalog.ids():
+            self.catalog.entries[product_id]['active'] = False
+        for name in DEFAULT_PRODUCTS:
+            self.catalog.ensure(name)
+        self.catalog.encode(self.df)
+
+    # ---------- Aggregation ----------
+
+    def product_df(self, product):
+        """Transactions of one product (by name or catalog ID) in ledger order"""
+        if not isinstance(product, str):
+            product = self.catalog.name(product)
+        positions = self.index()['products'].get(product)
+        if positions is None:
+            return self.df.iloc[0:0]
+        return self.df.iloc[positions]
+
+    def products_with_transactions(self):
+        """Products that appear in the ledger, in first-seen order"""
+        return list(self.index()['products'].keys())
+
+    def current_stock(self, product):
+        """Latest Stock Left of a product"""
+        positions = self.index()['products'].get(product)
+        if positions is None or len(positions) == 0:
+            return 0
+        return self.df['Stock Left'].iat[positions[-1]]
+
+    def preview_stock(self, product, qty_received, qty_sold):
+        """Stock a new transaction would leave"""
+        return calculate_stock_left(self.product_df(product), product, qty_received, qty_sold)
+
+    def product_summary(self, method="As Entered", date_range=None):
+        """Per-product totals, current stock and margin under a costing method (within a date range)"""
+        if not date_range or date_range == (None, None):
+            return self._cached(('summary', method), lambda: summarize_products(self.costed(method)))
+        return self._cached(('summary', method, *date_range),
+                            lambda: summarize_products(self.select(date_range=date_range, method=method)))
+
+    def partition_summary(self, transfer_ids=(), date_range=None):
+        """Exact per-product totals of this ledger, with branch-transfer rows also totalled apart"""
+        return self._cached(('partition', *(date_range or (None, None))), lambda: summarize_partition(
+            self.select(date_range=date_range), transfer_ids))
+
+    # ---------- Query ----------
+
+    def index(self):
+        """ID-to-position and product-to-positions indexes"""
+        return self._cached('index', lambda: build_ledger_index(self.df))
+
+    def date_index(self):
+        """Ledger positions sorted by date, synced to the ledger"""
+        return self._synced(self._date_index)
+
+    def positions(self, product=None, date_range=None):
+        """Ledger positions of a product (name or ID) within a (start, end) date range, or None for all rows"""
+        start, end = date_range or (None, None)
+        ranged = start is not None or end is not None
+        if product is None:
+            return self.date_index().positions(start, end) if ranged else None
+        if not isinstance(product, str):
+            product = self.catalog.name(product)
+        positions = self.index()['products'].get(product, np.empty(0, dtype=np.int64))
+        return self.date_index().within(positions, start, end) if ranged else positions
+
+    def select(self, product=None, date_range=None, method=None):
+        """Rows of a product and/or date range in ledger order (costed when a method is given)"""
+        df = self.df if method is None else self.costed(method)
+        positions = self.positions(product, date_range)
+        return df if positions is None else df.iloc[positions]
+
+    def remarks_index(self):
+        """Inverted index of remark tokens, synced to the ledger"""
+        return self._synced(self._remarks_index)
+
+    def search_remarks(self, query, product=None, date_range=None):
+        """Transactions whose remarks contain every query word (as a word prefix), in ledger order"""
+        positions = self.remarks_index().search(query)
+        scope = self.positions(product, date_range)
+        if scope is not None:
+            positions = np.intersect1d(positions, scope, assume_unique=True)
+        return self.df.iloc[positions]
+
+    def asof_index(self, as_of=None):
+        """Per-product sorted dates with prefix sums (from the archive for dates before its cut-off)"""
+        through = self.archived_through()
+        if through is not None and as_of is not None and parse_date(as_of).date() < through:
+            return self._cached('history_asof', lambda: build_asof_index(self.history()))
+        return self._cached('asof', lambda: build_asof_index(
+            self.df, opening_cost_delta(self.df, self.opening_ids())))
+
+    def stock_asof(self, product, as_of):
+        """Stock, cost value and cumulative totals of a product at the end of a date"""
+        return query_asof(self.asof_index(as_of), product, as_of)
+
+    def statement_asof(self, as_of):
+        """Point-in-time stock statement for every product"""
+        return stock_statement_asof(self.asof_index(as_of), self.products, as_of)
+
+    def costed(self, method="As Entered"):
+        """Ledger copy with COGS and Profit under a costing method"""
+        if method == "As Entered":
+            return self._cached(('costed', method), lambda: self._keep_opening_profit(apply_costing(self.df, method)))
+        engine = self._engines.get(method)
+        if engine is None:
+            engine = self._engines[method] = CostLotEngine(method)
+        return self._cached(('costed', method), lambda: self._keep_opening_profit(
+            apply_costing(self.df, method, self._synced(engine).cogs)))
+
+    def _keep_opening_profit(self, costed):
+        """Opening-balance rows report the archived period's profit as recorded"""
+        opening = self.opening_ids()
+        if opening:
+            mask = costed['Transaction ID'].isin(opening)
+            if mask.any():
+                profit = self.df.loc[mask, 'Profit'].astype(float)
+                costed['Profit'] = costed['Profit'].astype(float)
+                costed.loc[mask, 'Profit'] = profit
+                costed.loc[mask, 'COGS'] = self.df.loc[mask, 'Total Sales'].astype(float) - profit
+        return costed
+
+    def batch_tracker(self):
+        """Open batches per product, synced to the ledger"""
+        tracker = self._engines.get('batches')
+        if tracker is None:
+            tracker = self._engines['batches'] = BatchTracker()
+        return self._synced(tracker)
+
+    def expiring_within(self, days, today=None):
+        """Open batches expiring within a number of days"""
+        return self.batch_tracker().expiring_within(days, today)
+
+    def demand_engine(self):
+        """Daily sales per product, synced to the ledger"""
+        engine = self._engines.get('demand')
+        if engine is None:
+            engine = self._engines['demand'] = DemandEngine(self.non_trading_ids)
+        return self._synced(engine)
+
+    def reorder_report(self, as_of=None, service_level=DEFAULT_SERVICE_LEVEL):
+        """Demand rates, days of cover, stockout dates and reorder points of active products, most at-risk first"""
+        as_of = to_day(as_of or datetime.now())
+
+        def build():
+            positions = self.index()['products']
+            stock = {product: self.df['Stock Left'].iat[positions[product][-1]]
+                     for product in self.products if product in positions}
+            lead_times = {product: self.catalog.entry(product)['lead_time'] for product in stock}
+            return self.demand_engine().forecast(stock, lead_times, as_of, service_level)
+        return self._cached(('reorder', as_of, service_level), build)
+
+    def price_trends(self, product, method="As Entered", window=DEFAULT_TREND_WINDOW):
+        """Daily and rolling prices and margin of one product (name or ID), plus its price-change points"""
+        if not isinstance(product, str):
+            product = self.catalog.name(product)
+
+        def build():
+            positions = self.positions(product)
+            rows = self.costed(method).iloc[positions]
+            days = self.date_index().days[positions]
+            excluded = self.non_trading_ids()
+            if excluded:
+                # Opening-balance rows carry a whole archived period and transfers move stock at cost, not a price
+                keep = ~rows['Transaction ID'].isin(excluded).values
+                rows, days = rows[keep], days[keep]
+            return price_trends(rows, days, window)
+        return self._cached(('trends', product, method, window), build)
+
+    # ---------- Export ----------
+
+    def to_excel(self, date_range=None):
+        """Excel workbook with one sheet per product plus all transactions (within a date range)"""
+        return create_excel_separate_sheets(self.select(date_range=date_range), self.products)
@@ -0,0 +1,211 @@
+"""
+Prometheus text-format metrics
+A small in-process registry of counters, gauges and histograms, rendered in
+the Prometheus exposition format by the API's /metrics endpoint or by a
+stand-alone local endpoint for the dashboard process.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Default histogram buckets: seconds for latencies
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Row counts for import batches
+BATCH_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ''
+    body = ','.join('{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"')) for name, value in pairs)
+    return '{' + body + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for a named metric with optional labels"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.label_names)
+
+    def remove(self, **labels):
+        """Drop the series of one label set"""
+        with self._lock:
+            self._values.pop(self._key(labels), None)
+
+    def samples(self):
+        """(suffix, label values, extra labels, value) tuples for rendering"""
+        with self._lock:
+            return [('', key, None, value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.label_names, key, extra)} {_format_value(value)}")
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Monotonic count"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Value that goes up and down"""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, with sum and count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['buckets'][i] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        rows = []
+        with self._lock:
+            for key, entry in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, entry['buckets']):
+                    rows.append(('_bucket', key, [('le', _format_value(bound))], count))
+                rows.append(('_sum', key, None, entry['sum']))
+                rows.append(('_count', key, None, entry['count']))
+        return rows
+
+
+class Registry:
+    """Ordered collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+REGISTRY = Registry()
+
+TRANSACTIONS_INGESTED = REGISTRY.register(Counter(
+    'inventory_transactions_ingested_total', "Transactions appended to the ledger"))
+IMPORT_BATCH_SIZE = REGISTRY.register(Histogram(
+    'inventory_import_batch_size', "Transactions per batch append", buckets=BATCH_BUCKETS))
+LOAD_SECONDS = REGISTRY.register(Histogram(
+    'inventory_load_seconds', "Time to load the ledger from storage"))
+SAVE_SECONDS = REGISTRY.register(Histogram(
+    'inventory_save_seconds', "Time to save the ledger to storage"))
+LEDGER_ROWS = REGISTRY.register(Gauge(
+    'inventory_ledger_rows', "Transactions in the active ledger", labels=('tenant', 'location')))
+STORAGE_BYTES = REGISTRY.register(Gauge(
+    'inventory_storage_file_bytes', "Size of the storage file after the last load or save",
+    labels=('tenant', 'location')))
+EXPORT_SECONDS = REGISTRY.register(Histogram(
+    'inventory_export_seconds', "Time to build an export", labels=('format',)))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'inventory_cache_requests_total', "Derived-value cache lookups", labels=('cache', 'result')))
+POOL_TENANTS = REGISTRY.register(Gauge(
+    'inventory_pool_tenants', "Tenant ledgers held in memory"))
+POOL_BYTES = REGISTRY.register(Gauge(
+    'inventory_pool_bytes', "Estimated memory of the tenant ledgers held in memory"))
+POOL_EVICTIONS = REGISTRY.register(Counter(
+    'inventory_pool_evictions_total', "Tenant ledgers dropped from memory to stay within the budget"))
+
+
+def record_cache(cache, hit):
+    """Count one cache lookup as a hit or a miss"""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Serves the registry at /metrics"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port, host='127.0.0.1'):
+    """Serve /metrics from a background thread (once per process)"""
+    global _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            _metrics_server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+            _metrics_server.daemon_threads = True
+            threading.Thread(target=_metrics_server.serve_forever, name='metrics-server', daemon=True).start()
+    return _metrics_server
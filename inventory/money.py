@@ -0,0 +1,151 @@
+"""
+Fixed-point money and quantities
+Money is counted in int64 paise and quantities in int64 thousandths of a unit.
+Totals, stock and aggregates are computed on those integers, so sums are exact
+however large the ledger grows. The ledger DataFrame keeps rupee and unit
+floats for display, always quantized to the paisa / thousandth, and storage
+writes the integers.
+"""
+
+import numpy as np
+import pandas as pd
+
+MONEY_SCALE = 100           # paise per rupee
+QUANTITY_SCALE = 1000       # quantities are kept to 0.001 unit
+
+# Largest quantity and per-unit price accepted on a transaction, so that
+# thousandths x paise line totals stay well inside int64
+MAX_QUANTITY = 10_000_000
+MAX_PRICE = 1_000_000
+
+# Largest customer payment accepted: one line total at those limits
+MAX_PAYMENT = MAX_QUANTITY * MAX_PRICE
+
+# Fixed-point values must stay below this to fit int64
+FIXED_LIMIT = 2.0 ** 63
+
+MONEY_COLUMNS = ['Cost Price', 'Selling Price', 'Total Purchase', 'Total Sales', 'Profit']
+QUANTITY_COLUMNS = ['Quantity Received', 'Quantity Sold', 'Stock Left']
+
+
+def to_fixed(values, scale):
+    """Floats (scalar or array) to int64 fixed-point at a scale; blanks become 0
+
+    Raises ValueError for infinite values or values too large for int64,
+    rather than letting them wrap around.
+    """
+    values = pd.to_numeric(values, errors='coerce') if isinstance(values, pd.Series) else values
+    arr = np.asarray(values, dtype=float)
+    scaled = np.rint(np.where(np.isnan(arr), 0.0, arr) * scale)
+    out = ~(np.abs(scaled) < FIXED_LIMIT)
+    if out.any():
+        raise ValueError(f"amount out of range: {float(arr[out].flat[0])}")
+    return scaled.astype(np.int64)
+
+
+def check_limit(fixed, limit, scale, field):
+    """Raise ValueError unless every fixed-point value lies from 0 to `limit` units"""
+    fixed = np.asarray(fixed)
+    bad = (fixed < 0) | (fixed > limit * scale)
+    if bad.any():
+        raise ValueError(f"{field} must be a number from 0 to {limit:,}, got {fixed[bad][0] / scale:,}")
+
+
+def from_fixed(values, scale):
+    """int64 fixed-point back to floats"""
+    return np.asarray(values, dtype=np.int64) / scale
+
+
+def to_paise(values):
+    return to_fixed(values, MONEY_SCALE)
+
+
+def from_paise(values):
+    return from_fixed(values, MONEY_SCALE)
+
+
+def to_milli(values):
+    return to_fixed(values, QUANTITY_SCALE)
+
+
+def from_milli(values):
+    return from_fixed(values, QUANTITY_SCALE)
+
+
+def round_money(value):
+    """One amount snapped to the paisa"""
+    return round(float(value) * MONEY_SCALE) / MONEY_SCALE
+
+
+def round_quantity(value):
+    """One quantity snapped to the thousandth"""
+    return round(float(value) * QUANTITY_SCALE) / QUANTITY_SCALE
+
+
+def fixed_line_total(quantity_milli, price_paise):
+    """Thousandths x paise to paise, rounded half up (ints or int64 arrays)"""
+    return (quantity_milli * price_paise + QUANTITY_SCALE // 2) // QUANTITY_SCALE
+
+
+def line_total(quantity, price):
+    """quantity x price in paise, rounded half up to the paisa"""
+    return fixed_line_total(to_milli(quantity), to_paise(price))
+
+
+def fixed_totals(received_milli, sold_milli, cost_paise, selling_paise):
+    """Total Purchase, Total Sales and Profit in paise from fixed-point inputs"""
+    purchase = fixed_line_total(received_milli, cost_paise)
+    sales = fixed_line_total(sold_milli, selling_paise)
+    profit = sales - fixed_line_total(sold_milli, cost_paise)
+    return purchase, sales, profit
+
+
+def compute_totals(qty_received, qty_sold, cost_price, selling_price):
+    """Total Purchase, Total Sales and Profit in paise"""
+    return fixed_totals(to_milli(qty_received), to_milli(qty_sold), to_paise(cost_price), to_paise(selling_price))
+
+
+def money_sum(values):
+    """Exact rupee sum of a money column"""
+    return float(to_paise(values).sum()) / MONEY_SCALE
+
+
+def quantity_sum(values):
+    """Exact sum of a quantity column"""
+    return float(to_milli(values).sum()) / QUANTITY_SCALE
+
+
+def quantize(df):
+    """Snap money columns to the paisa and quantities to the thousandth (as floats)"""
+    for col in MONEY_COLUMNS:
+        if col in df.columns:
+            df[col] = from_paise(to_paise(df[col]))
+    for col in QUANTITY_COLUMNS:
+        if col in df.columns:
+            df[col] = from_milli(to_milli(df[col]))
+    return df
+
+
+def to_storage(df):
+    """Copy of the ledger with money in int paise and quantities in int thousandths"""
+    stored = df.copy()
+    for col in MONEY_COLUMNS:
+        if col in stored.columns:
+            stored[col] = to_paise(stored[col])
+    for col in QUANTITY_COLUMNS:
+        if col in stored.columns:
+            stored[col] = to_milli(stored[col])
+    return stored
+
+
+def from_storage(df, scales):
+    """Convert stored fixed-point columns back to rupees and units"""
+    money_scale = scales.get('money', MONEY_SCALE)
+    quantity_scale = scales.get('quantity', QUANTITY_SCALE)
+    for col in MONEY_COLUMNS:
+        if col in df.columns:
+            df[col] = from_fixed(to_fixed(df[col], 1), money_scale)
+    for col in QUANTITY_COLUMNS:
+        if col in df.columns:
+            df[col] = from_fixed(to_fixed(df[col], 1), quantity_scale)
+    return df
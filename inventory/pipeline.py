@@ -0,0 +1,356 @@
+"""
+Asyncio ingestion pipeline
+
+    python -m inventory.pipeline --stdin < sales.jsonl
+    python -m inventory.pipeline --watch /srv/dropbox --watch /srv/billing
+
+Stages:
+    sources  -> raw queue -> validate -> GroupCommitWriter (batch compute + group commit)
+
+Both queues are bounded: when storage falls behind, the writer stops draining,
+the queues fill up and sources block on put - backpressure reaches all the way
+to the file reader or stdin pipe. The writer flushes when a batch is full or
+the oldest queued transaction has waited max_delay seconds.
+
+A dropped file is moved to processed/ only once every record in it has been
+saved or rejected, or to failed/ if it cannot be read or every record in it was
+rejected. Files are listed, read and moved off the event loop. On Ctrl-C the pipeline stops picking up new files, finishes queueing
+the file it is reading and saves everything queued before exiting.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+from .ledger import Ledger
+from .storage import STORAGE_FILE, WriterLock
+from .transactions import validate_import_record
+from .writer import GroupCommitWriter, QueueFull
+
+# End-of-stream marker passed down the stages
+_DONE = object()
+
+# Seconds between attempts to hand a transaction to a full (or failing) writer
+SUBMIT_RETRY = 0.05
+
+
+class StageStats:
+    """Throughput counters for one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.started = time.monotonic()
+
+    def rate(self):
+        """Items per second since the stage started"""
+        elapsed = time.monotonic() - self.started
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self):
+        return {
+            'stage': self.name,
+            'count': self.count,
+            'errors': self.errors,
+            'rate_per_s': round(self.rate(), 1),
+            'busy_s': round(self.busy, 3),
+        }
+
+
+class IngestionPipeline:
+    """Sources feed a bounded queue; validated transactions are committed in groups by GroupCommitWriter"""
+
+    def __init__(self, ledger, max_batch=1000, max_delay=1.0, queue_size=10000, report_interval=5.0,
+                 report=None):
+        self.ledger = ledger
+        self.queue_size = queue_size
+        self.report_interval = report_interval
+        self.report = report or self._print_report
+        self.stats = {name: StageStats(name) for name in ('source', 'validate', 'commit')}
+        self.writer = GroupCommitWriter(ledger, max_batch=max_batch, max_delay=max_delay, max_queue=queue_size,
+                                        on_commit=self._saved, on_dead_letter=self._dead_lettered)
+        self.raw = None
+        self._files = {}                    # path -> {'folder', 'name', 'outstanding', 'saved'} until all are done
+        self._files_lock = threading.Lock() # Settled from both the event loop and the commit thread
+        self._stopping = asyncio.Event()
+
+    @property
+    def commits(self):
+        return self.writer.commits
+
+    def stop(self):
+        """Stop taking new input; queued records are still saved before run() returns"""
+        self._stopping.set()
+
+    async def _unless_stopped(self, awaitable):
+        """Result of an awaitable, or None if a stop is requested first"""
+        task = asyncio.ensure_future(awaitable)
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        done, _ = await asyncio.wait({task, stopping}, return_when=asyncio.FIRST_COMPLETED)
+        stopping.cancel()
+        if task in done:
+            return task.result()
+        task.cancel()
+        return None
+
+    @staticmethod
+    async def _in_thread(func, *args):
+        """Run blocking file I/O in the default executor"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    # ---------- Sources ----------
+
+    async def _put_records(self, payload, source=None):
+        """Queue one decoded JSON payload (a record or a list of records)"""
+        records = payload if isinstance(payload, list) else [payload]
+        for record in records:
+            await self.raw.put((record, source))
+            self.stats['source'].count += 1
+
+    async def stdin_source(self, stream=None):
+        """Read JSON records from a pipe, one object or list per line"""
+        stream = stream or sys.stdin
+        loop = asyncio.get_running_loop()
+        lines = asyncio.Queue(maxsize=1)
+
+        def read():
+            # A daemon thread, so a stop never waits on a blocked read
+            for line in stream:
+                asyncio.run_coroutine_threadsafe(lines.put(line), loop).result()
+            asyncio.run_coroutine_threadsafe(lines.put(None), loop).result()
+
+        threading.Thread(target=read, name="stdin-source", daemon=True).start()
+        while True:
+            line = await self._unless_stopped(lines.get())
+            if line is None:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                payload = json.loads(line)
+            except json.JSONDecodeError:
+                self.stats['source'].errors += 1
+                continue
+            await self._put_records(payload)
+
+    async def folder_source(self, folder, poll_interval=1.0, once=False):
+        """Pick up *.json / *.jsonl files dropped in a folder, moving each aside once its records are saved"""
+        processed = os.path.join(folder, 'processed')
+        failed = os.path.join(folder, 'failed')
+        os.makedirs(processed, exist_ok=True)
+        os.makedirs(failed, exist_ok=True)
+
+        while not self._stopping.is_set():
+            names = sorted(name for name in await self._in_thread(os.listdir, folder)
+                           if name.endswith(('.json', '.jsonl')) and not name.startswith('.'))
+            for name in names:
+                path = os.path.join(folder, name)
+                if self._stopping.is_set():
+                    return
+                with self._files_lock:
+                    if path in self._files:
+                        continue    # Still being saved
+                try:
+                    payloads = await self._in_thread(self._read_file, path)
+                except (OSError, json.JSONDecodeError):
+                    self.stats['source'].errors += 1
+                    await self._in_thread(os.replace, path, os.path.join(failed, name))
+                    continue
+                records = [record for payload in payloads
+                           for record in (payload if isinstance(payload, list) else [payload])]
+                with self._files_lock:
+                    self._files[path] = {'folder': folder, 'name': name, 'outstanding': len(records),
+                                         'saved': not records}
+                if not records:
+                    await self._in_thread(self._settle, path, 0)
+                # A file is always queued whole, even when a stop comes in meanwhile
+                await self._put_records(records, path)
+            if once:
+                break
+            await self._unless_stopped(asyncio.sleep(poll_interval))
+
+    @staticmethod
+    def _read_file(path):
+        """JSON payloads of a dropped file: one per line for .jsonl, else the whole file"""
+        with open(path, 'r') as f:
+            if path.endswith('.jsonl'):
+                return [json.loads(line) for line in f if line.strip()]
+            return [json.load(f)]
+
+    def _settle(self, path, count=1, saved=False):
+        """Count records of a file as done, moving the file once none are left
+
+        The file goes to processed/ if any of its records were saved, and to
+        failed/ if every one was rejected. Blocking: call off the event loop.
+        """
+        with self._files_lock:
+            entry = self._files[path]
+            entry['outstanding'] -= count
+            entry['saved'] = entry['saved'] or saved
+            if entry['outstanding'] > 0:
+                return
+            del self._files[path]
+        folder = 'processed' if entry['saved'] else 'failed'
+        os.replace(path, os.path.join(entry['folder'], folder, entry['name']))
+
+    def _saved(self, tags):
+        """Writer callback: these transactions are saved"""
+        self.stats['commit'].count += len(tags)
+        for path, count in Counter(tag for tag in tags if tag is not None).items():
+            self._settle(path, count, saved=True)
+
+    def _dead_lettered(self, tags):
+        """Writer callback: these transactions were given up on and written to the dead-letter file"""
+        for path, count in Counter(tag for tag in tags if tag is not None).items():
+            self._settle(path, count)
+
+    # ---------- Stages ----------
+
+    async def _validate(self):
+        stats = self.stats['validate']
+        dropping = False
+        while True:
+            item = await self.raw.get()
+            if item is _DONE:
+                return
+            if dropping:
+                continue
+            record, source = item
+            start = time.perf_counter()
+            try:
+                txn = validate_import_record(record)
+            except (ValueError, TypeError):
+                stats.errors += 1
+                if source is not None:
+                    await self._in_thread(self._settle, source)
+                continue
+            finally:
+                stats.busy += time.perf_counter() - start
+            stats.count += 1
+            while True:
+                try:
+                    self.writer.submit([txn], source)
+                    break
+                except QueueFull:
+                    if self._stopping.is_set() and not self.writer.healthy:
+                        # Saving is failing and a stop was asked for: leave the rest (and their files) unsaved,
+                        # but keep taking records so sources blocked on a full queue can finish
+                        dropping = True
+                        break
+                    # The writer is full or retrying a failed save - wait, so backpressure reaches the sources
+                    await asyncio.sleep(SUBMIT_RETRY)
+
+    # ---------- Reporting ----------
+
+    def snapshot(self):
+        """Per-stage throughput and current queue depths"""
+        commit = self.stats['commit']
+        commit.busy, commit.errors = self.writer.busy, self.writer.failures
+        return {
+            'stages': [stats.snapshot() for stats in self.stats.values()],
+            'raw_queue': self.raw.qsize() if self.raw else 0,
+            'write_queue': self.writer.queue.qsize(),
+            'commits': self.commits,
+            'dead_lettered': self.writer.dead_lettered,
+            'last_error': self.writer.last_error,
+        }
+
+    @staticmethod
+    def _print_report(snapshot):
+        print(json.dumps(snapshot), file=sys.stderr, flush=True)
+
+    async def _reporter(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.report(self.snapshot())
+
+    # ---------- Run ----------
+
+    async def run(self, sources):
+        """Run until every source is exhausted (or stop() is called) and all queued transactions are saved
+
+        Raises RuntimeError if queued transactions could not be saved; their
+        files stay in the drop-folder for the next run.
+        """
+        loop = asyncio.get_running_loop()
+        self.raw = asyncio.Queue(maxsize=self.queue_size)
+        for stats in self.stats.values():
+            stats.started = time.monotonic()
+
+        self.writer.start()
+        sources = [asyncio.ensure_future(source) for source in sources]
+        validator = asyncio.create_task(self._validate())
+        reporter = asyncio.create_task(self._reporter())
+        try:
+            await asyncio.gather(*sources)
+            await self.raw.put(_DONE)
+            await validator
+        finally:
+            reporter.cancel()
+            validator.cancel()
+            for source in sources:
+                source.cancel()
+            # Save everything handed to the writer, off the event loop
+            await loop.run_in_executor(None, self.writer.stop)
+        self.report(self.snapshot())
+        return self.snapshot()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Asyncio ingestion pipeline for the inventory ledger")
+    parser.add_argument('--stdin', action='store_true', help="read JSON records from stdin, one per line")
+    parser.add_argument('--watch', action='append', default=[], help="drop-folder to watch (repeatable)")
+    parser.add_argument('--once', action='store_true', help="process files already in the folders, then exit")
+    parser.add_argument('--storage', default=STORAGE_FILE, help="ledger JSON file")
+    parser.add_argument('--max-batch', type=int, default=1000, help="transactions per commit")
+    parser.add_argument('--max-delay', type=float, default=1.0, help="seconds before a partial batch is flushed")
+    parser.add_argument('--queue-size', type=int, default=10000, help="bound of each stage queue")
+    parser.add_argument('--report-interval', type=float, default=5.0, help="seconds between stats lines")
+    args = parser.parse_args(argv)
+
+    if not args.stdin and not args.watch:
+        parser.error("give --stdin and/or at least one --watch folder")
+
+    async def run(pipeline):
+        loop = asyncio.get_running_loop()
+
+        def stop():
+            # The first Ctrl-C drains and saves; a second one interrupts as usual
+            loop.remove_signal_handler(signal.SIGINT)
+            pipeline.stop()
+
+        try:
+            loop.add_signal_handler(signal.SIGINT, stop)
+            loop.add_signal_handler(signal.SIGTERM, pipeline.stop)
+        except NotImplementedError:
+            pass    # No asyncio signal handlers on Windows
+        sources = [pipeline.folder_source(folder, once=args.once) for folder in args.watch]
+        if args.stdin:
+            sources.append(pipeline.stdin_source())
+        await pipeline.run(sources)
+
+    try:
+        # The only writer of the ledger file while it runs
+        with WriterLock(args.storage, "the ingestion pipeline"):
+            pipeline = IngestionPipeline(Ledger.load(args.storage), max_batch=args.max_batch,
+                                         max_delay=args.max_delay, queue_size=args.queue_size,
+                                         report_interval=args.report_interval)
+            asyncio.run(run(pipeline))
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
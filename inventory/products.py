@@ -0,0 +1,301 @@
+"""
+Product list and catalog management
+"""
+
+import numpy as np
+import pandas as pd
+
+from .money import MAX_PRICE, MONEY_SCALE, round_money
+
+# Default Product List (Initial Options)
+DEFAULT_PRODUCTS = ["Wheat", "Urea", "DAP", "Sarson", "Cow Feed", "Gandyal", "Him Cal", "Liv 52"]
+
+# Days from placing an order to the stock arriving, unless a product sets its own
+DEFAULT_LEAD_TIME = 7
+
+
+def product_key(name):
+    """Normalized product name: a string without surrounding whitespace"""
+    return str(name).strip()
+
+
+class ProductCatalog:
+    """Products keyed by stable integer IDs, with hash indexes by name and SKU
+
+    Removing a product only deactivates it - its ID keeps resolving for the
+    transactions that reference it, and re-adding the name brings it back.
+    Renamed and merged-away names stay as aliases, and a merged product's
+    entry stays behind as a redirect, so IDs are never reused.
+    """
+
+    def __init__(self, records=()):
+        self.entries = {}       # id -> {'id', 'name', 'sku', 'unit', 'cost_price', 'selling_price', 'lead_time',
+                                #        'active', 'aliases', 'merged_into'}
+        self._by_name = {}
+        self._by_sku = {}
+        self._dtype = None
+        for record in records:
+            self._insert(record)
+
+    @classmethod
+    def from_names(cls, names):
+        """Catalog with one active product per name, in list order"""
+        catalog = cls()
+        for name in names:
+            catalog.ensure(name)
+        return catalog
+
+    @classmethod
+    def from_records(cls, records):
+        """Catalog from stored records (prices in paise)"""
+        return cls(dict(record, cost_price=record.get('cost_price', 0) / MONEY_SCALE,
+                        selling_price=record.get('selling_price', 0) / MONEY_SCALE) for record in records)
+
+    def to_records(self):
+        """Records for storage (prices in paise)"""
+        return [dict(entry, cost_price=round(entry['cost_price'] * MONEY_SCALE),
+                     selling_price=round(entry['selling_price'] * MONEY_SCALE))
+                for entry in self.entries.values()]
+
+    def _insert(self, record):
+        entry = {
+            'id': int(record['id']),
+            'name': product_key(record['name']),
+            'sku': str(record.get('sku') or ''),
+            'unit': str(record.get('unit') or ''),
+            'cost_price': round_money(record.get('cost_price') or 0),
+            'selling_price': round_money(record.get('selling_price') or 0),
+            'lead_time': int(record.get('lead_time') or DEFAULT_LEAD_TIME),
+            'active': bool(record.get('active', True)),
+            'aliases': list(record.get('aliases') or []),
+            'merged_into': record.get('merged_into'),
+        }
+        owner = self._by_name.get(entry['name'])
+        if owner is not None and owner != (entry['merged_into'] or entry['id']):
+            raise ValueError(f"product name {entry['name']!r} is already used by product #{owner}")
+        self.entries[entry['id']] = entry
+        self._by_name[entry['name']] = entry['merged_into'] or entry['id']
+        for alias in entry['aliases']:
+            self._by_name[alias] = entry['id']
+        if entry['sku']:
+            self._by_sku[entry['sku']] = entry['id']
+        self._dtype = None
+        return entry
+
+    def _taken(self, name):
+        canonical = self.canonical(name)
+        if canonical == name:
+            return f"⚠️ '{name}' already exists!"
+        return f"⚠️ '{name}' is already a name of '{canonical}'!"
+
+    def next_id(self):
+        return max(self.entries, default=0) + 1
+
+    # ---------- Lookup ----------
+
+    def __contains__(self, name):
+        return product_key(name) in self._by_name
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, product_id):
+        """Entry for an ID, or None"""
+        return self.entries.get(product_id)
+
+    def id_for(self, name):
+        """ID of a product name, or None"""
+        return self._by_name.get(product_key(name))
+
+    def id_for_sku(self, sku):
+        """ID of a SKU, or None"""
+        return self._by_sku.get(sku)
+
+    def entry(self, name):
+        """Entry for a product name, or None"""
+        product_id = self._by_name.get(product_key(name))
+        return None if product_id is None else self.entries[product_id]
+
+    def canonical(self, name):
+        """Current name for a product name or alias (unknown names pass through, normalized)"""
+        name = product_key(name)
+        product_id = self._by_name.get(name)
+        return name if product_id is None else self.entries[product_id]['name']
+
+    def name(self, product_id):
+        return self.entries[product_id]['name']
+
+    def ids(self, include_inactive=False):
+        """Product IDs in the order they were added"""
+        return [pid for pid, entry in self.entries.items() if include_inactive or entry['active']]
+
+    def names(self, include_inactive=False):
+        """Product names in the order they were added"""
+        return [entry['name'] for entry in self.entries.values() if include_inactive or entry['active']]
+
+    # ---------- Changes ----------
+
+    def ensure(self, name, active=True):
+        """ID of a product name, adding it when unknown"""
+        name = product_key(name)
+        product_id = self._by_name.get(name)
+        if product_id is None:
+            product_id = self._insert({'id': self.next_id(), 'name': name, 'active': active})['id']
+        elif active:
+            self.entries[product_id]['active'] = True
+        return product_id
+
+    def add(self, name, sku='', unit='', cost_price=0.0, selling_price=0.0):
+        """Add a product (or bring back a removed one)"""
+        if not name or not name.strip():
+            return False, "⚠️ Product name cannot be empty!"
+        name = name.strip()
+        entry = self.entry(name)
+        if entry is not None and entry['active']:
+            return False, self._taken(name)
+        sku = (sku or '').strip()
+        owner = self._by_sku.get(sku) if sku else None
+        if owner is not None and (entry is None or owner != entry['id']):
+            return False, f"⚠️ SKU '{sku}' is already used by '{self.name(owner)}'!"
+        product_id = self.ensure(name)
+        self.update(product_id, sku=sku, unit=unit, cost_price=cost_price, selling_price=selling_price)
+        return True, f"✅ '{name}' added successfully!"
+
+    def remove(self, name):
+        """Deactivate a product (its transactions keep referencing the ID)"""
+        entry = self.entry(name)
+        if entry is None or not entry['active']:
+            return False, "⚠️ Product not found!"
+        entry['active'] = False
+        return True, f"✅ '{name}' removed successfully!"
+
+    def rename(self, name, new_name):
+        """Rename a product, keeping the old name as an alias"""
+        entry = self.entry(name)
+        if entry is None:
+            return False, "⚠️ Product not found!"
+        new_name = (new_name or '').strip()
+        if not new_name:
+            return False, "⚠️ Product name cannot be empty!"
+        taken = self._by_name.get(new_name)
+        # One of its own earlier names is free to take back (a merged-away product keeps its own name)
+        own_alias = taken == entry['id'] and new_name in entry['aliases'] and not any(
+            other['name'] == new_name for other in self.entries.values())
+        if taken is not None and not own_alias:
+            return False, self._taken(new_name)
+        old_name = entry['name']
+        if own_alias:
+            entry['aliases'].remove(new_name)
+        entry['aliases'].append(old_name)
+        entry['name'] = new_name
+        self._by_name[new_name] = entry['id']
+        self._dtype = None
+        return True, f"✅ '{old_name}' renamed to '{new_name}'!"
+
+    def merge(self, source, target):
+        """Fold one product into another; the source's ID redirects to the target from now on"""
+        source_entry, target_entry = self.entry(source), self.entry(target)
+        if source_entry is None or target_entry is None:
+            return False, "⚠️ Product not found!"
+        if source_entry['id'] == target_entry['id']:
+            return False, "⚠️ Choose two different products to merge!"
+        source_id, target_id = source_entry['id'], target_entry['id']
+
+        # Every name that resolved to the source (its own, aliases, earlier merges) now resolves to the target
+        for alias, product_id in self._by_name.items():
+            if product_id == source_id:
+                self._by_name[alias] = target_id
+                if alias != target_entry['name'] and alias not in target_entry['aliases']:
+                    target_entry['aliases'].append(alias)
+        for entry in self.entries.values():
+            if entry['merged_into'] == source_id:
+                entry['merged_into'] = target_id
+        if source_entry['sku']:
+            self._by_sku.pop(source_entry['sku'], None)
+            if not target_entry['sku']:
+                target_entry['sku'] = source_entry['sku']
+                self._by_sku[source_entry['sku']] = target_id
+        target_entry['active'] = target_entry['active'] or source_entry['active']
+        source_entry.update(active=False, aliases=[], sku='', merged_into=target_id)
+        return True, f"✅ '{source_entry['name']}' merged into '{target_entry['name']}'!"
+
+    def update(self, product_id, sku=None, unit=None, cost_price=None, selling_price=None, lead_time=None):
+        """Change the SKU, unit, default prices or reorder lead time of a product"""
+        entry = self.entries.get(product_id)
+        if entry is None:
+            return False, "⚠️ Product not found!"
+        if sku is not None:
+            sku = sku.strip()
+            owner = self._by_sku.get(sku)
+            if sku and owner is not None and owner != product_id:
+                return False, f"⚠️ SKU '{sku}' is already used by '{self.name(owner)}'!"
+            self._by_sku.pop(entry['sku'], None)
+            entry['sku'] = sku
+            if sku:
+                self._by_sku[sku] = product_id
+        if unit is not None:
+            entry['unit'] = unit.strip()
+        for field, value in (('cost_price', cost_price), ('selling_price', selling_price)):
+            if value is not None:
+                if not 0 <= float(value) <= MAX_PRICE:
+                    return False, f"⚠️ Default prices must be from 0 to {MAX_PRICE:,}!"
+                entry[field] = round_money(value)
+        if lead_time is not None:
+            if int(lead_time) < 1:
+                return False, "⚠️ Lead time must be at least 1 day!"
+            entry['lead_time'] = int(lead_time)
+        return True, f"✅ '{entry['name']}' updated!"
+
+    # ---------- Ledger encoding ----------
+
+    @property
+    def dtype(self):
+        """Categorical dtype for the ledger's Product Name column (one category per ID)"""
+        if self._dtype is None:
+            names = self.names(include_inactive=True)
+            if len(set(names)) != len(names):
+                raise ValueError("product catalog names are not unique")
+            self._dtype = pd.CategoricalDtype(names)
+        return self._dtype
+
+    def encode(self, df):
+        """Store Product Name as catalog categories in place, adding unknown names as inactive products"""
+        names = df['Product Name']
+        if isinstance(names.dtype, pd.CategoricalDtype):
+            if names.cat.categories.equals(self.dtype.categories):
+                return df
+            if names.cat.categories.isin(self.dtype.categories).all():
+                # Only new products since the column was encoded - codes carry over
+                df['Product Name'] = names.astype(self.dtype)
+                return df
+        names = names.astype(object)
+        aliases = {}
+        for name in pd.unique(names):
+            # Non-string or padded names are stored under their normalized key
+            if product_key(name) not in self._by_name:
+                self.ensure(name, active=False)
+            if self.canonical(name) != name:
+                aliases[name] = self.canonical(name)
+        if aliases:
+            names = names.replace(aliases)
+        df['Product Name'] = names.astype(self.dtype)
+        return df
+
+    def remap_codes(self, names, source):
+        """Encoded Product Name column with every row of a merged-away product pointing at its target"""
+        categories = list(self.dtype.categories)
+        codes = names.cat.codes.values.copy()
+        codes[codes == categories.index(source)] = categories.index(self.canonical(source))
+        return pd.Categorical.from_codes(codes, dtype=self.dtype)
+
+    def product_ids(self, names):
+        """Product IDs of an encoded Product Name column"""
+        names = names.astype(self.dtype)
+        lookup = np.array([self._by_name[name] for name in self.dtype.categories], dtype=np.int64)
+        return lookup[names.cat.codes.values]
+
+    def decode(self, product_ids):
+        """Encoded Product Name values for an array of product IDs"""
+        positions = np.full(self.next_id(), -1, dtype=np.int64)
+        positions[self.ids(include_inactive=True)] = np.arange(len(self.entries))
+        return pd.Categorical.from_codes(positions[np.asarray(product_ids, dtype=np.int64)], dtype=self.dtype)
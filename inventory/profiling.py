@@ -0,0 +1,109 @@
+"""
+Opt-in rerun profiling
+Times named stages (storage, filtering, aggregation, charting, export) inside
+one run of the app, keeps the last few runs for a debug panel and emits every
+span as a JSON log line for offline analysis.
+"""
+
+import json
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:     # Not available on Windows
+    resource = None
+
+STAGES = ['storage', 'filtering', 'aggregation', 'charting', 'export']
+
+logger = logging.getLogger('inventory.profiling')
+
+
+def peak_rss_mb():
+    """Peak resident memory of the process in MB, where the platform reports it"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 1024, 1)    # Linux reports KB
+
+
+def log_to_file(path):
+    """Append span log lines to a JSON-lines file (once per path)"""
+    for handler in logger.handlers:
+        if getattr(handler, 'baseFilename', None) == path:
+            return
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+class RerunProfiler:
+    """Stage timings for the current run plus a rolling history of earlier runs"""
+
+    def __init__(self, history=20, enabled=False):
+        self.enabled = enabled
+        self.history = deque(maxlen=history)
+        self.current = None
+        self.runs = 0
+
+    def begin(self):
+        """Start timing a new run"""
+        self.runs += 1
+        self.current = {'run': self.runs, 'started': time.perf_counter(),
+                        'timestamp': datetime.now().isoformat(timespec='seconds'), 'spans': []}
+
+    @contextmanager
+    def span(self, stage, label='', rows=None):
+        """Time a block under a stage; a no-op while profiling is off"""
+        if not self.enabled or self.current is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {'stage': stage, 'label': label, 'seconds': time.perf_counter() - start, 'rows': rows}
+            self.current['spans'].append(record)
+            logger.info(json.dumps({'event': 'span', 'run': self.current['run'], **record}))
+
+    def end(self, page='', rows=None, ledger_mb=None):
+        """Close the current run and add it to the history"""
+        if self.current is None:
+            return None
+        run = self.current
+        self.current = None
+        if not self.enabled:
+            return None
+
+        run['total'] = time.perf_counter() - run.pop('started')
+        run['page'] = page
+        run['rows'] = rows
+        run['ledger_mb'] = ledger_mb
+        run['peak_rss_mb'] = peak_rss_mb()
+        run['stages'] = self.stage_breakdown(run)
+        self.history.append(run)
+        logger.info(json.dumps({'event': 'run', **{k: v for k, v in run.items() if k != 'spans'}}))
+        return run
+
+    @staticmethod
+    def stage_breakdown(run):
+        """Seconds per stage for one run, with the untimed remainder as 'other'"""
+        stages = dict.fromkeys(STAGES, 0.0)
+        for record in run['spans']:
+            stages[record['stage']] = stages.get(record['stage'], 0.0) + record['seconds']
+        stages['other'] = max(run['total'] - sum(stages.values()), 0.0)
+        return stages
+
+    def table(self):
+        """History as rows (newest first) for display"""
+        rows = []
+        for run in reversed(self.history):
+            row = {'Run': run['run'], 'Page': run['page'], 'Total ms': round(run['total'] * 1000, 1)}
+            row.update({f"{stage} ms": round(seconds * 1000, 1) for stage, seconds in run['stages'].items()})
+            row.update({'Rows': run['rows'], 'Ledger MB': run['ledger_mb'], 'Peak RSS MB': run['peak_rss_mb']})
+            rows.append(row)
+        return rows
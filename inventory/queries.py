@@ -0,0 +1,249 @@
+"""
+Aggregations and point-in-time queries over the ledger
+"""
+
+import numpy as np
+import pandas as pd
+
+from .money import MONEY_SCALE, QUANTITY_SCALE, from_milli, from_paise, line_total, to_milli, to_paise
+from .transactions import parse_date, parse_dates
+
+
+def summarize_products(df):
+    """Aggregate quantities, totals, current stock and margin per product"""
+    # Exact integer sums: quantities in thousandths, money in paise
+    fixed = pd.DataFrame({
+        'Product Name': df['Product Name'].values,
+        'Quantity Received': to_milli(df['Quantity Received']),
+        'Quantity Sold': to_milli(df['Quantity Sold']),
+        'Total Purchase': to_paise(df['Total Purchase']),
+        'Total Sales': to_paise(df['Total Sales']),
+        'Profit': to_paise(df['Profit']),
+    })
+    summary_df = fixed.groupby('Product Name', observed=True).sum().reset_index()
+    for col in ['Quantity Received', 'Quantity Sold']:
+        summary_df[col] = summary_df[col] / QUANTITY_SCALE
+    for col in ['Total Purchase', 'Total Sales', 'Profit']:
+        summary_df[col] = summary_df[col] / MONEY_SCALE
+
+    # Current stock is each product's last Stock Left in ledger order
+    last_rows = df.drop_duplicates('Product Name', keep='last').set_index('Product Name')
+    summary_df['Current Stock'] = summary_df['Product Name'].map(last_rows['Stock Left']).values
+
+    sales = summary_df['Total Sales'].astype(float)
+    summary_df['Profit Margin %'] = np.where(
+        sales > 0, summary_df['Profit'].astype(float) / sales.where(sales > 0, 1) * 100, 0.0
+    )
+
+    return summary_df[['Product Name', 'Current Stock', 'Quantity Received', 'Quantity Sold',
+                       'Total Purchase', 'Total Sales', 'Profit', 'Profit Margin %']]
+
+
+# Integer columns of a partition summary: quantities in thousandths, money in paise
+PARTITION_COLUMNS = ['Transactions', 'Quantity Received', 'Quantity Sold', 'Total Purchase', 'Total Sales',
+                     'Profit', 'Current Stock', 'Transfer In', 'Transfer Out', 'Transfer In Value',
+                     'Transfer Out Value']
+
+
+def summarize_partition(df, transfer_ids=()):
+    """Exact integer totals per product for one location's ledger, transfer rows totalled apart
+
+    Summaries of several locations add up column by column (see consolidate_partitions),
+    so a consolidated view never needs the ledgers themselves.
+    """
+    received = to_milli(df['Quantity Received'])
+    sold = to_milli(df['Quantity Sold'])
+    purchase = to_paise(df['Total Purchase'])
+    sales = to_paise(df['Total Sales'])
+    transfer = df['Transaction ID'].isin(list(transfer_ids)).values
+    fixed = pd.DataFrame({
+        'Product Name': np.asarray(df['Product Name'].astype(object)),
+        'Transactions': np.ones(len(df), dtype=np.int64),
+        'Quantity Received': received,
+        'Quantity Sold': sold,
+        'Total Purchase': purchase,
+        'Total Sales': sales,
+        'Profit': to_paise(df['Profit']),
+        'Current Stock': np.zeros(len(df), dtype=np.int64),
+        'Transfer In': np.where(transfer, received, 0),
+        'Transfer Out': np.where(transfer, sold, 0),
+        'Transfer In Value': np.where(transfer, purchase, 0),
+        'Transfer Out Value': np.where(transfer, sales, 0),
+    })
+    summary = fixed.groupby('Product Name', sort=False).sum()
+    last_rows = df.drop_duplicates('Product Name', keep='last')
+    stock = pd.Series(to_milli(last_rows['Stock Left']), index=last_rows['Product Name'].astype(object).values)
+    summary['Current Stock'] = stock.reindex(summary.index).fillna(0).astype(np.int64).values
+    return summary[PARTITION_COLUMNS]
+
+
+def consolidate_partitions(summaries):
+    """Per-product summary across locations from partition summaries, with branch transfers netted out
+
+    Transfers move stock between locations at cost, so they are left out of the
+    consolidated quantities, purchases and sales; stock and profit add up as they are.
+    """
+    frames = [summary for summary in summaries if len(summary) > 0]
+    if not frames:
+        total = pd.DataFrame(0, index=pd.Index([], name='Product Name'), columns=PARTITION_COLUMNS)
+    else:
+        total = pd.concat(frames).groupby(level=0, sort=False).sum()
+    report = pd.DataFrame({
+        'Product Name': total.index.values,
+        'Current Stock': from_milli(total['Current Stock'].values),
+        'Quantity Received': from_milli((total['Quantity Received'] - total['Transfer In']).values),
+        'Quantity Sold': from_milli((total['Quantity Sold'] - total['Transfer Out']).values),
+        'Total Purchase': from_paise((total['Total Purchase'] - total['Transfer In Value']).values),
+        'Total Sales': from_paise((total['Total Sales'] - total['Transfer Out Value']).values),
+        'Profit': from_paise(total['Profit'].values),
+    })
+    sales = report['Total Sales'].astype(float)
+    report['Profit Margin %'] = np.where(sales > 0, report['Profit'] / sales.where(sales > 0, 1) * 100, 0.0)
+    return report
+
+
+# Day number of rows whose date could not be parsed (NaT) - sorts before every real date
+MISSING_DAY = np.iinfo(np.int64).min
+
+
+def day_numbers(dates):
+    """Days since the epoch for a Date column (MISSING_DAY where the date cannot be parsed)"""
+    return parse_dates(dates).values.astype('datetime64[D]').astype(np.int64)
+
+
+def to_day(value):
+    """Day number of a date, Timestamp or DD/MM/YYYY string (day numbers pass through)"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(np.datetime64(parse_date(value).date(), 'D').astype(np.int64))
+
+
+def format_day(day):
+    """DD/MM/YYYY string of a day number ('' for None or MISSING_DAY)"""
+    if day is None or day == MISSING_DAY:
+        return ''
+    return pd.Timestamp(np.datetime64(int(day), 'D')).strftime('%d/%m/%Y')
+
+
+class DateIndex:
+    """Ledger positions sorted by date, sliced by binary search and extended as rows are appended"""
+
+    def __init__(self):
+        self.days = np.empty(0, dtype=np.int64)          # Day number per ledger row (ledger order)
+        self.sorted_days = np.empty(0, dtype=np.int64)
+        self.order = np.empty(0, dtype=np.int64)         # Ledger positions in date order
+        self.synced_version = None
+
+    @property
+    def applied(self):
+        """Number of ledger rows applied so far"""
+        return len(self.days)
+
+    def replay(self, df, start=0):
+        """Index ledger rows from `start` onward"""
+        if start == 0:
+            self.__init__()
+        days = day_numbers(df['Date'].iloc[start:])
+        if len(days) == 0:
+            return self
+
+        # Stable sort keeps ledger order for same-day entries
+        chunk = np.argsort(days, kind='stable')
+        chunk_days = days[chunk]
+        positions = chunk + start
+        if len(self.sorted_days) == 0 or chunk_days[0] >= self.sorted_days[-1]:
+            # Usual case: new entries are dated on or after everything indexed
+            self.sorted_days = np.concatenate([self.sorted_days, chunk_days])
+            self.order = np.concatenate([self.order, positions])
+        else:
+            slots = np.searchsorted(self.sorted_days, chunk_days, side='right')
+            self.sorted_days = np.insert(self.sorted_days, slots, chunk_days)
+            self.order = np.insert(self.order, slots, positions)
+        self.days = np.concatenate([self.days, days])
+        return self
+
+    def positions(self, start=None, end=None):
+        """Ledger positions dated from `start` to `end` (inclusive, either may be None), in ledger order"""
+        lo = np.searchsorted(self.sorted_days, MISSING_DAY + 1 if start is None else to_day(start), side='left')
+        hi = len(self.sorted_days) if end is None else np.searchsorted(self.sorted_days, to_day(end), side='right')
+        return np.sort(self.order[lo:hi])
+
+    def within(self, positions, start=None, end=None):
+        """Subset of ledger positions dated from `start` to `end`"""
+        days = self.days[positions]
+        keep = days > MISSING_DAY
+        if start is not None:
+            keep &= days >= to_day(start)
+        if end is not None:
+            keep &= days <= to_day(end)
+        return positions[keep]
+
+
+def build_asof_index(df, cost_delta=None):
+    """Build per-product sorted date arrays with prefix sums for point-in-time queries"""
+    index = {}
+    if len(df) == 0:
+        return index
+
+    # Prefix sums run on integers (thousandths / paise) so they stay exact
+    purchase = to_paise(df['Total Purchase'])
+    work = pd.DataFrame({
+        'Product Name': df['Product Name'].values,
+        'Date': parse_dates(df['Date']).values,
+        'Stock Delta': to_milli(df['Quantity Received']) - to_milli(df['Quantity Sold']),
+        'Cost Delta': to_paise(cost_delta) if cost_delta is not None else (
+            purchase - line_total(df['Quantity Sold'], df['Cost Price'])),
+        'Total Purchase': purchase,
+        'Total Sales': to_paise(df['Total Sales']),
+        'Profit': to_paise(df['Profit']),
+    })
+    work = work.dropna(subset=['Date'])
+    # Stable sort keeps ledger order for same-day entries
+    work = work.sort_values(['Product Name', 'Date'], kind='mergesort')
+
+    for product, group in work.groupby('Product Name', sort=False, observed=True):
+        index[product] = {
+            'dates': group['Date'].values,
+            'stock': from_milli(np.cumsum(group['Stock Delta'].values)),
+            'cost_value': from_paise(np.cumsum(group['Cost Delta'].values)),
+            'purchase': from_paise(np.cumsum(group['Total Purchase'].values)),
+            'sales': from_paise(np.cumsum(group['Total Sales'].values)),
+            'profit': from_paise(np.cumsum(group['Profit'].values)),
+        }
+    return index
+
+
+def query_asof(index, product, as_of):
+    """Return stock, cost value and cumulative totals for a product at end of a date"""
+    result = {
+        'Product Name': product,
+        'Stock': 0.0,
+        'Cost Value': 0.0,
+        'Total Purchase': 0.0,
+        'Total Sales': 0.0,
+        'Cumulative Profit': 0.0,
+    }
+    entry = index.get(product)
+    if entry is None:
+        return result
+
+    # Binary search: number of transactions on or before the as-of date
+    pos = np.searchsorted(entry['dates'], np.datetime64(parse_date(as_of).normalize()), side='right')
+    if pos == 0:
+        return result
+
+    result['Stock'] = float(entry['stock'][pos - 1])
+    result['Cost Value'] = float(entry['cost_value'][pos - 1])
+    result['Total Purchase'] = float(entry['purchase'][pos - 1])
+    result['Total Sales'] = float(entry['sales'][pos - 1])
+    result['Cumulative Profit'] = float(entry['profit'][pos - 1])
+    return result
+
+
+def stock_statement_asof(index, products_list, as_of):
+    """Create a point-in-time stock statement for every product"""
+    products = list(products_list) + [p for p in index if p not in products_list]
+    rows = [query_asof(index, product, as_of) for product in products]
+    return pd.DataFrame(rows, columns=[
+        'Product Name', 'Stock', 'Cost Value', 'Total Purchase', 'Total Sales', 'Cumulative Profit'
+    ])
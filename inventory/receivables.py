@@ -0,0 +1,160 @@
+"""
+Customer credit (udhaar) - receivables kept per customer from credit sales and payments
+"""
+
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .money import MONEY_SCALE, from_paise, to_paise
+from .queries import MISSING_DAY, day_numbers, format_day, to_day
+
+# Aging buckets: (label, lowest age in days); the last one is open-ended
+AGING_BUCKETS = [('0-30 days', 0), ('31-60 days', 31), ('61-90 days', 61), ('90+ days', 91)]
+
+PAYMENT_COLUMNS = ['Payment ID', 'Date', 'Customer', 'Amount', 'Remarks']
+
+
+class ReceivablesBook:
+    """Per-customer running balances with open invoices settled oldest first
+
+    A sale with a Customer is on credit. Payments settle the oldest open
+    invoices; anything beyond them is held as an advance against later
+    sales. Only unsettled invoices are kept, so aging walks those alone.
+    """
+
+    def __init__(self, history=None):
+        self.history = history      # Callable returning archived frames to apply before row 0
+        self.customers = {}         # customer -> {'sales', 'paid', 'advance', 'open': deque of [day, paise], 'entries'}
+        self.rows = 0
+        self.payments_applied = 0
+        self.synced_version = None
+
+    @property
+    def applied(self):
+        """Number of ledger rows applied so far"""
+        return self.rows
+
+    def reset(self):
+        """Drop all balances and applied rows and payments"""
+        self.customers.clear()
+        self.rows = 0
+        self.payments_applied = 0
+        self.synced_version = None
+
+    def _customer(self, customer):
+        state = self.customers.get(customer)
+        if state is None:
+            state = self.customers[customer] = {'sales': 0, 'paid': 0, 'advance': 0, 'open': deque(), 'entries': []}
+        return state
+
+    def sale(self, customer, day, amount, txn_id=None, product=''):
+        """Record a credit sale of `amount` paise"""
+        state = self._customer(customer)
+        state['sales'] += amount
+        state['entries'].append((day, 'Sale', txn_id, product, amount))
+        settled = min(state['advance'], amount)
+        state['advance'] -= settled
+        if amount > settled:
+            state['open'].append([day, amount - settled])
+
+    def payment(self, customer, day, amount, payment_id=None):
+        """Record a payment of `amount` paise, settling the oldest invoices first"""
+        state = self._customer(customer)
+        state['paid'] += amount
+        state['entries'].append((day, 'Payment', payment_id, '', -amount))
+        remaining = amount
+        open_invoices = state['open']
+        while remaining > 0 and open_invoices:
+            invoice = open_invoices[0]
+            take = min(invoice[1], remaining)
+            invoice[1] -= take
+            remaining -= take
+            if invoice[1] == 0:
+                open_invoices.popleft()
+        state['advance'] += remaining
+
+    def _apply_rows(self, rows):
+        if 'Customer' not in rows or len(rows) == 0:
+            return
+        customers = rows['Customer'].fillna('').astype(str).str.strip().values
+        credit = (customers != '') & (rows['Total Sales'].values > 0)
+        if not credit.any():
+            return
+        sales = rows.loc[credit]
+        for customer, day, amount, txn_id, product in zip(
+            customers[credit].tolist(),
+            day_numbers(sales['Date']).tolist(),
+            to_paise(sales['Total Sales']).tolist(),
+            sales['Transaction ID'].tolist(),
+            sales['Product Name'].astype(str).tolist(),
+        ):
+            self.sale(customer, day, amount, txn_id, product)
+
+    def replay(self, df, start=0):
+        """Apply ledger rows from `start` onward (archived rows first when starting over)"""
+        if start == 0:
+            self.reset()
+            for frame in (self.history() if self.history else []):
+                self._apply_rows(frame)
+        self._apply_rows(df.iloc[start:])
+        self.rows = len(df)
+        return self
+
+    def apply_payments(self, payments):
+        """Apply payments recorded since the last call"""
+        for payment in payments[self.payments_applied:]:
+            amount = round(float(payment['Amount']) * MONEY_SCALE)
+            self.payment(payment['Customer'], to_day(payment['Date']), amount, payment['Payment ID'])
+        self.payments_applied = len(payments)
+        return self
+
+    # ---------- Reports ----------
+
+    def balances(self):
+        """Credit sales, payments and balance per customer, largest balance first"""
+        rows = []
+        for customer, state in self.customers.items():
+            oldest = state['open'][0][0] if state['open'] else None
+            rows.append({
+                'Customer': customer,
+                'Credit Sales': state['sales'],
+                'Payments': state['paid'],
+                'Balance': state['sales'] - state['paid'],
+                'Oldest Due': format_day(oldest),
+            })
+        report = pd.DataFrame(rows, columns=['Customer', 'Credit Sales', 'Payments', 'Balance', 'Oldest Due'])
+        for col in ['Credit Sales', 'Payments', 'Balance']:
+            report[col] = from_paise(report[col].values.astype(np.int64))
+        return report.sort_values('Balance', ascending=False, kind='mergesort').reset_index(drop=True)
+
+    def aging(self, today=None):
+        """Outstanding amounts per customer by age of the unsettled invoices"""
+        today = to_day(today or datetime.now())
+        labels = [label for label, _ in AGING_BUCKETS]
+        lows = np.array([low for _, low in AGING_BUCKETS])
+        rows = []
+        for customer, state in self.customers.items():
+            if not state['open']:
+                continue
+            buckets = np.zeros(len(AGING_BUCKETS), dtype=np.int64)
+            for day, amount in state['open']:
+                age = today - day if day != MISSING_DAY else 0
+                buckets[max(np.searchsorted(lows, age, side='right') - 1, 0)] += amount
+            rows.append([customer, *buckets.tolist(), int(buckets.sum())])
+        report = pd.DataFrame(rows, columns=['Customer', *labels, 'Total Due'])
+        for col in [*labels, 'Total Due']:
+            report[col] = from_paise(report[col].values.astype(np.int64))
+        return report.sort_values('Total Due', ascending=False, kind='mergesort').reset_index(drop=True)
+
+    def statement(self, customer):
+        """Sales and payments of one customer by date, with the running balance"""
+        state = self.customers.get(customer)
+        entries = sorted(state['entries'], key=lambda entry: entry[0]) if state else []
+        report = pd.DataFrame(entries, columns=['Day', 'Type', 'Reference', 'Product Name', 'Amount'])
+        report['Balance'] = from_paise(np.cumsum(report['Amount'].values.astype(np.int64)))
+        report['Amount'] = from_paise(report['Amount'].values.astype(np.int64))
+        report.insert(0, 'Date', [format_day(day) for day in report['Day']])
+        return report.drop(columns='Day')
@@ -0,0 +1,116 @@
+"""
+Remarks full-text search with an incrementally maintained inverted index
+"""
+
+import html
+import re
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+TOKEN_PATTERN = r'\w+'
+_TOKEN_RE = re.compile(TOKEN_PATTERN)
+
+
+def tokenize(text):
+    """Lower-case word tokens of a remark or query"""
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+class RemarksIndex:
+    """Token -> ledger positions, extended as rows are appended
+
+    A query matches rows whose remarks contain every query word as a word
+    prefix, so "urea sup" finds "Initial Urea stock from Supplier A".
+    """
+
+    def __init__(self):
+        self.postings = {}      # token -> list of sorted position arrays (one per replayed chunk)
+        self.rows = 0
+        self.synced_version = None
+        self._vocabulary = None
+
+    @property
+    def applied(self):
+        """Number of ledger rows applied so far"""
+        return self.rows
+
+    def replay(self, df, start=0):
+        """Index remarks of ledger rows from `start` onward"""
+        if start == 0:
+            self.__init__()
+        remarks = df['Remarks'].iloc[start:] if 'Remarks' in df else pd.Series([''] * (len(df) - start))
+        if len(remarks) == 0:
+            return self
+
+        # Tokenize each distinct remark once, then fan tokens out to the rows that share it
+        codes, uniques = pd.factorize(remarks.fillna('').astype(str))
+        tokens = pd.Series(uniques).str.lower().str.findall(TOKEN_PATTERN).explode().dropna()
+        pairs = pd.DataFrame({'code': tokens.index.values, 'token': tokens.values}).drop_duplicates()
+        rows = pd.DataFrame({'code': codes, 'position': np.arange(start, start + len(codes), dtype=np.int64)})
+        hits = rows.merge(pairs, on='code')
+        positions = hits['position'].values
+        for token, idx in hits.groupby('token', sort=False).indices.items():
+            self.postings.setdefault(token, []).append(np.sort(positions[idx]))
+
+        self.rows = start + len(remarks)
+        self._vocabulary = None
+        return self
+
+    def _positions(self, token):
+        chunks = self.postings[token]
+        if len(chunks) > 1:
+            # Compact on first read so later queries take one array
+            chunks[:] = [np.concatenate(chunks)]
+        return chunks[0]
+
+    def vocabulary(self):
+        """Indexed tokens in sorted order"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    def matching_tokens(self, prefix):
+        """Indexed tokens starting with a prefix (binary search over the sorted vocabulary)"""
+        vocabulary = self.vocabulary()
+        tokens = []
+        for i in range(bisect_left(vocabulary, prefix), len(vocabulary)):
+            if not vocabulary[i].startswith(prefix):
+                break
+            tokens.append(vocabulary[i])
+        return tokens
+
+    def search(self, query):
+        """Ledger positions whose remarks contain every query word as a prefix, in ledger order"""
+        result = None
+        for term in dict.fromkeys(tokenize(query)):
+            tokens = self.matching_tokens(term)
+            if not tokens:
+                return np.empty(0, dtype=np.int64)
+            if len(tokens) == 1:
+                matches = self._positions(tokens[0])
+            else:
+                matches = np.unique(np.concatenate([self._positions(token) for token in tokens]))
+            result = matches if result is None else np.intersect1d(result, matches, assume_unique=True)
+            if len(result) == 0:
+                break
+        return np.empty(0, dtype=np.int64) if result is None else result
+
+
+def highlight(text, query):
+    """HTML-escaped text with words matching the query wrapped in <mark>"""
+    terms = tokenize(query)
+    if not terms:
+        return html.escape(str(text))
+
+    parts = []
+    last = 0
+    text = str(text)
+    for match in _TOKEN_RE.finditer(text):
+        if any(match.group().lower().startswith(term) for term in terms):
+            parts.append(html.escape(text[last:match.start()]))
+            parts.append(f"<mark>{html.escape(match.group())}</mark>")
+            last = match.end()
+    parts.append(html.escape(text[last:]))
+    return ''.join(parts)
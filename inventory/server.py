@@ -0,0 +1,190 @@
+"""
+Local HTTP ingestion API for POS terminals
+
+    python -m inventory.server --port 8765
+
+Endpoints:
+    POST /transactions        one record in the bulk-import JSON format
+    POST /transactions/bulk   a list of records
+    GET  /stock[?product=X]   current stock per product
+    GET  /summary             per-product totals
+    GET  /health              queue depth and commit counters
+    GET  /metrics             Prometheus text-format metrics
+
+Writes are validated on arrival, queued and committed in groups by
+GroupCommitWriter, so bursts of sales cost one storage save per batch.
+"""
+
+import argparse
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .ledger import Ledger
+from .metrics import CONTENT_TYPE, REGISTRY
+from .storage import STORAGE_FILE, StorageBusy, WriterLock
+from .transactions import validate_import_record
+from .writer import GroupCommitWriter, QueueFull
+
+# Largest request body accepted (bytes)
+MAX_BODY = 10 * 1024 * 1024
+
+
+class InventoryRequestHandler(BaseHTTPRequestHandler):
+    """JSON request handler; the server carries the ledger, lock and writer"""
+
+    server_version = "InventoryAPI/1.0"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, status, text, content_type):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0:
+            raise ValueError("request body is empty")
+        if length > MAX_BODY:
+            raise ValueError("request body is too large")
+        return json.loads(self.rfile.read(length))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        ledger = self.server.ledger
+
+        if url.path == '/health':
+            writer = self.server.writer
+            self._send_json(200 if writer.healthy else 503, {
+                'status': 'ok' if writer.healthy else 'failing',
+                'queued': writer.queue.qsize(),
+                'pending': writer.pending,
+                'committed': writer.committed,
+                'commits': writer.commits,
+                'failures': writer.failures,
+                'dead_lettered': writer.dead_lettered,
+                'last_error': writer.last_error,
+            })
+        elif url.path == '/metrics':
+            self._send_text(200, REGISTRY.render(), CONTENT_TYPE)
+        elif url.path == '/stock':
+            with self.server.lock:
+                if 'product' in params:
+                    products = params['product']
+                else:
+                    products = ledger.products_with_transactions()
+                stock = {product: float(ledger.current_stock(product)) for product in products}
+            self._send_json(200, {'stock': stock})
+        elif url.path == '/summary':
+            with self.server.lock:
+                summary = ledger.product_summary().to_dict('records')
+            self._send_json(200, {'summary': summary})
+        else:
+            self._send_json(404, {'error': f"unknown endpoint {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path not in ('/transactions', '/transactions/bulk'):
+            self._send_json(404, {'error': f"unknown endpoint {url.path}"})
+            return
+
+        try:
+            payload = self._read_json()
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        records = payload if url.path == '/transactions/bulk' else [payload]
+        if not isinstance(records, list):
+            self._send_json(400, {'error': "bulk body must be a JSON list"})
+            return
+
+        transactions = []
+        errors = []
+        for number, record in enumerate(records, start=1):
+            try:
+                transactions.append(validate_import_record(record))
+            except (ValueError, TypeError) as e:
+                errors.append({'record': number, 'error': str(e)})
+        if errors:
+            # Reject the whole request so a POS can resend it corrected
+            self._send_json(400, {'errors': errors})
+            return
+
+        try:
+            queued = self.server.writer.submit(transactions)
+        except QueueFull as e:
+            self._send_json(503, {'error': str(e)})
+            return
+        self._send_json(202, {'accepted': len(transactions), 'queued': queued})
+
+
+class InventoryServer(ThreadingHTTPServer):
+    """HTTP server bound to one ledger and its group-commit writer"""
+
+    daemon_threads = True
+
+    def __init__(self, address, ledger, max_batch=500, max_delay=0.5, quiet=False):
+        super().__init__(address, InventoryRequestHandler)
+        self.ledger = ledger
+        self.lock = threading.RLock()
+        self.writer = GroupCommitWriter(ledger, self.lock, max_batch=max_batch, max_delay=max_delay)
+        self.quiet = quiet
+
+    def serve_forever(self, poll_interval=0.5):
+        self.writer.start()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self.writer.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP ingestion API for the inventory ledger")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--storage', default=STORAGE_FILE, help="ledger JSON file")
+    parser.add_argument('--max-batch', type=int, default=500, help="transactions per commit")
+    parser.add_argument('--max-delay', type=float, default=0.5, help="seconds to wait for a batch to fill")
+    parser.add_argument('--quiet', action='store_true', help="do not log every request")
+    args = parser.parse_args(argv)
+
+    # The only writer of the ledger file while it runs
+    lock = WriterLock(args.storage, "the POS API")
+    try:
+        lock.acquire()
+    except StorageBusy as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    server = InventoryServer((args.host, args.port), Ledger.load(args.storage),
+                             max_batch=args.max_batch, max_delay=args.max_delay, quiet=args.quiet)
+    print(f"📡 Inventory API listening on http://{args.host}:{args.port} (storage: {args.storage})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        lock.release()
+
+
+if __name__ == '__main__':
+    main()
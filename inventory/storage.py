@@ -0,0 +1,271 @@
+"""
+JSON storage for the inventory ledger
+"""
+
+import gzip
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+    import msvcrt
+
+from .money import MONEY_SCALE, QUANTITY_SCALE, from_storage, to_storage
+
+# Storage Configuration
+STORAGE_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "InventoryDashboard")
+STORAGE_FILE = os.path.join(STORAGE_DIR, "data.json")
+BRANCHES_FILE = os.path.join(STORAGE_DIR, "branches.json")
+
+# Tenant (shop) names: lower-case letters, digits, '-' and '_'
+TENANT_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+
+
+def load_storage(storage_file=STORAGE_FILE):
+    """Load data from JSON storage, or None when nothing has been saved yet"""
+    if not os.path.exists(storage_file):
+        return None
+    with open(storage_file, 'r') as f:
+        return json.load(f)
+
+
+def save_storage(catalog, df, storage_file=STORAGE_FILE, archives=None, payments=None, reviewed=None, last_id=0,
+                 expected=None):
+    """Save the product catalog and transactions (plus the archive catalogue, payments and reviewed anomalies, if any) to JSON storage
+
+    Rows reference products by catalog ID rather than repeating the name.
+    `last_id` is the highest transaction ID ever issued, kept so deleted IDs are not reused.
+    With `expected` (the file_stamp seen at load or the last save), the save is
+    refused if another process wrote the file since. Returns the new stamp.
+    """
+    os.makedirs(os.path.dirname(storage_file), exist_ok=True)
+    with exclusive_writer(storage_file):
+        if expected is not None and file_stamp(storage_file) != expected:
+            raise StorageBusy(f"{storage_file} was changed by another process since it was loaded - "
+                              f"refresh and try again")
+        _write_ledger(catalog, df, storage_file, archives, payments, reviewed, last_id)
+        return file_stamp(storage_file)
+
+
+def _write_ledger(catalog, df, storage_file, archives, payments, reviewed, last_id):
+    """Serialise a ledger to its storage file"""
+    rows = to_storage(df)
+    rows.insert(rows.columns.get_loc('Product Name'), 'Product ID', catalog.product_ids(df['Product Name']))
+    data = {
+        'catalog': catalog.to_records(),
+        'scales': {'money': MONEY_SCALE, 'quantity': QUANTITY_SCALE},
+        'transactions': rows.drop(columns='Product Name').to_dict('records'),
+        'last_transaction_id': int(last_id),
+    }
+    if archives:
+        data['archives'] = archives
+    if payments:
+        data['payments'] = [dict(payment, Amount=round(payment['Amount'] * MONEY_SCALE)) for payment in payments]
+    if reviewed:
+        data['anomaly_reviews'] = sorted(reviewed)
+    write_json(data, storage_file)
+
+
+def write_json(data, path):
+    """Write JSON to a temporary file, sync it and swap it in, so a failed or interrupted save leaves the old file"""
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w') as f:
+        json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def file_stamp(path):
+    """(modification time, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class StorageBusy(RuntimeError):
+    """Raised when another process is the storage file's writer, or wrote it since it was loaded"""
+
+
+# Writer locks held by this process: lock file path -> WriterLock
+_held_locks = {}
+
+# Seconds to wait for another process's save to finish before giving up
+LOCK_TIMEOUT = 2.0
+
+
+def _lock_file(f):
+    """Take a non-blocking exclusive lock on an open file, raising OSError if another process holds it"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+class WriterLock:
+    """Exclusive lock file making one process the only writer of a storage file while it runs
+
+    The POS API and the pipeline hold it for their lifetime; any other save
+    of that file (the dashboard, the insert scripts) is refused meanwhile.
+    """
+
+    def __init__(self, storage_file, holder):
+        self.storage_file = storage_file
+        self.path = f"{storage_file}.lock"
+        self.holder = holder    # Shown to processes that find the file locked
+        self._file = None
+
+    def acquire(self, timeout=LOCK_TIMEOUT):
+        """Take the lock, raising StorageBusy if another process still holds it after `timeout` seconds"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        f = open(self.path, 'a+')
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                _lock_file(f)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    f.close()
+                    raise StorageBusy(f"{_lock_holder(self.path)} is the only writer of {self.storage_file} "
+                                      f"while it runs")
+                time.sleep(0.05)
+        f.seek(0)
+        f.truncate()
+        f.write(f"{self.holder} (pid {os.getpid()})")
+        f.flush()
+        self._file = f
+        _held_locks[self.path] = self
+        return self
+
+    def release(self):
+        """Give up the lock"""
+        if self._file is not None:
+            _held_locks.pop(self.path, None)
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def _lock_holder(path):
+    """Description written by the process holding a lock file"""
+    try:
+        with open(path) as f:
+            return f.read().strip() or "another process"
+    except OSError:
+        return "another process"
+
+
+@contextmanager
+def exclusive_writer(storage_file):
+    """Hold a storage file's writer lock for one save, unless this process already holds it"""
+    if f"{storage_file}.lock" in _held_locks:
+        yield
+        return
+    lock = WriterLock(storage_file, "a save").acquire()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+def transactions_frame(data, catalog=None):
+    """Ledger DataFrame from loaded storage (or archive) data, in rupees and units"""
+    if 'transactions' not in data:
+        return None
+    df = pd.DataFrame(data['transactions'])
+    if 'scales' in data:
+        # Money in paise and quantities in thousandths; older files hold plain floats
+        df = from_storage(df, data['scales'])
+    if catalog is not None and 'Product ID' in df.columns:
+        # Older files name the product on every row
+        df.insert(df.columns.get_loc('Product ID'), 'Product Name', catalog.decode(df['Product ID'].values))
+        df = df.drop(columns='Product ID')
+    return df
+
+
+def payments_list(data):
+    """Customer payments from loaded storage data, with amounts in rupees"""
+    scale = data.get('scales', {}).get('money', MONEY_SCALE)
+    return [dict(payment, Amount=payment['Amount'] / scale) for payment in data.get('payments', [])]
+
+
+def tenant_dir(tenant=None, storage_dir=STORAGE_DIR):
+    """Storage folder of one tenant - the default tenant (None) keeps the original folder"""
+    if not tenant:
+        return storage_dir
+    if not TENANT_PATTERN.match(tenant):
+        raise ValueError(f"Invalid tenant name {tenant!r} - use lower-case letters, digits, '-' or '_'")
+    return os.path.join(storage_dir, 'tenants', tenant)
+
+
+def list_tenants(storage_dir=STORAGE_DIR):
+    """Tenants with a storage folder, by name"""
+    root = os.path.join(storage_dir, 'tenants')
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root) if TENANT_PATTERN.match(name))
+
+
+def location_file(name, storage_dir=STORAGE_DIR):
+    """Storage file of a branch location's ledger partition (each gets its own folder and archives)"""
+    slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or 'location'
+    return os.path.join(storage_dir, 'locations', slug, 'data.json')
+
+
+def save_registry(catalog, locations, transfers, registry_file=BRANCHES_FILE):
+    """Save the shared catalog, the locations and the branch-transfer log
+
+    Each location's transactions live in its own storage file; this file only
+    says where they are, so saving one location never rewrites the others.
+    """
+    os.makedirs(os.path.dirname(registry_file), exist_ok=True)
+    data = {
+        'catalog': catalog.to_records(),
+        'scales': {'money': MONEY_SCALE, 'quantity': QUANTITY_SCALE},
+        'locations': locations,
+        'transfers': [dict(transfer, Quantity=round(transfer['Quantity'] * QUANTITY_SCALE),
+                           **{'Cost Price': round(transfer['Cost Price'] * MONEY_SCALE)})
+                      for transfer in transfers],
+    }
+    write_json(data, registry_file)
+
+
+def transfers_list(data):
+    """Branch transfers from a loaded registry, in units and rupees"""
+    return [dict(transfer, Quantity=transfer['Quantity'] / data['scales']['quantity'],
+                 **{'Cost Price': transfer['Cost Price'] / data['scales']['money']})
+            for transfer in data.get('transfers', [])]
+
+
+def archive_dir(storage_file=STORAGE_FILE):
+    """Cold-storage folder that sits next to the storage file"""
+    return os.path.join(os.path.dirname(storage_file), 'archive')
+
+
+def write_archive(path, data):
+    """Write an archive as gzip-compressed JSON"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def read_archive(path):
+    """Read a gzip-compressed JSON archive"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,168 @@
+"""
+Multi-tenant ledger pool - tenants load on first use and the least recently used are evicted to a memory budget
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+from .branches import Branches
+from .metrics import POOL_BYTES, POOL_EVICTIONS, POOL_TENANTS, record_cache
+from .storage import STORAGE_DIR, tenant_dir
+
+# Default memory budget for the ledgers held by one process (INVENTORY_POOL_MB overrides)
+DEFAULT_POOL_MB = 512
+
+
+def tenant_key(tenant, secret=None):
+    """Access key of a tenant's link (?tenant=<name>&key=<key>), signed with INVENTORY_TENANT_SECRET"""
+    secret = secret if secret is not None else os.environ['INVENTORY_TENANT_SECRET']
+    return hmac.new(secret.encode(), tenant.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def resolve_tenant(params, environ=os.environ):
+    """Tenant of a new session from its link's query parameters, raising ValueError for a link it may not use
+
+    INVENTORY_TENANT pins the process to one tenant and ignores the link. With
+    INVENTORY_TENANT_SECRET set, ?tenant= needs the matching &key= from
+    tenant_key. Without either, ?tenant= is taken as given: tenants are then
+    kept apart for storage and memory only, not from each other's users.
+    """
+    if environ.get('INVENTORY_TENANT'):
+        return environ['INVENTORY_TENANT']
+    tenant = params.get('tenant') or None
+    secret = environ.get('INVENTORY_TENANT_SECRET')
+    if tenant and secret and not hmac.compare_digest(str(params.get('key') or ''), tenant_key(tenant, secret)):
+        raise ValueError("This shop link is missing its key or the key does not match")
+    return tenant
+
+
+def load_tenant(tenant=None, storage_dir=STORAGE_DIR):
+    """Every location's ledger for one tenant, from its own storage folder"""
+    folder = tenant_dir(tenant, storage_dir)
+    return Branches.load(os.path.join(folder, 'branches.json'), os.path.join(folder, 'data.json'), tenant)
+
+
+class TenantHolder:
+    """A session's claim on the tenants it requests; the pool keeps them while the holder is alive"""
+
+
+class TenantPool:
+    """Tenants' ledgers shared by every session of a process, within a memory budget
+
+    A tenant is loaded on first request and moved to the back of the LRU order
+    on every request after that. When the held ledgers grow past the budget,
+    the least recently used tenants are dropped. Every change is saved as it is
+    made, so a dropped tenant is simply loaded again on its next request. The
+    most recently requested tenant always stays, even when it alone is over
+    the budget, and so does every tenant a live TenantHolder requested: a
+    session never works on a copy the pool has let go of while a second copy
+    is loaded for the next request.
+    """
+
+    def __init__(self, budget_bytes=None, loader=load_tenant):
+        if budget_bytes is None:
+            budget_bytes = int(float(os.environ.get('INVENTORY_POOL_MB', DEFAULT_POOL_MB)) * 2**20)
+        self.budget_bytes = budget_bytes
+        self.loader = loader
+        self._tenants = OrderedDict()   # tenant -> Branches, least recently used first
+        self._lock = threading.Lock()
+        self._loading = {}              # tenant -> lock held while it loads
+        self._holders = {}              # tenant -> WeakSet of the TenantHolders that requested it
+
+    def __contains__(self, tenant):
+        return tenant in self._tenants
+
+    def __len__(self):
+        return len(self._tenants)
+
+    def tenants(self):
+        """Tenants held in memory, least recently used first"""
+        with self._lock:
+            return list(self._tenants)
+
+    def get(self, tenant=None, holder=None):
+        """A tenant's ledgers, loading them on first use (a holder keeps them from eviction while it lives)"""
+        if holder is not None:
+            with self._lock:
+                self._holders.setdefault(tenant, weakref.WeakSet()).add(holder)
+        branches = self._lookup(tenant)
+        if branches is not None:
+            return branches
+
+        # One load per tenant; requests for other tenants are not held up meanwhile
+        with self._lock:
+            loading = self._loading.setdefault(tenant, threading.Lock())
+        with loading:
+            branches = self._lookup(tenant)
+            if branches is None:
+                try:
+                    branches = self.loader(tenant)
+                finally:
+                    with self._lock:
+                        self._loading.pop(tenant, None)
+                with self._lock:
+                    self._tenants[tenant] = branches
+                    self._evict(keep=tenant)
+        return branches
+
+    def _lookup(self, tenant):
+        with self._lock:
+            branches = self._tenants.get(tenant)
+            record_cache('tenant_pool', branches is not None)
+            if branches is not None:
+                self._tenants.move_to_end(tenant)
+        return branches
+
+    def reload(self, tenant=None):
+        """Drop a tenant's ledgers and load them again from storage"""
+        self.drop(tenant)
+        return self.get(tenant)
+
+    def drop(self, tenant=None):
+        """Remove a tenant from memory (it is loaded again on its next request)"""
+        with self._lock:
+            branches = self._tenants.pop(tenant, None)
+            if branches is not None:
+                branches.forget_metrics()
+            self._record()
+
+    def memory_bytes(self):
+        """Estimated memory of the tenants held"""
+        with self._lock:
+            return sum(branches.memory_bytes() for branches in self._tenants.values())
+
+    def trim(self, keep=None):
+        """Evict least recently used tenants until the pool fits its budget"""
+        with self._lock:
+            self._evict(keep)
+
+    def _held(self, tenant):
+        """Whether a live holder has requested a tenant (call with the pool lock held)"""
+        holders = self._holders.get(tenant)
+        if holders is not None and not holders:
+            del self._holders[tenant]
+            return False
+        return holders is not None
+
+    def _evict(self, keep=None):
+        sizes = {tenant: branches.memory_bytes() for tenant, branches in self._tenants.items()}
+        total = sum(sizes.values())
+        for tenant in list(self._tenants):
+            if total <= self.budget_bytes:
+                break
+            if tenant == keep or self._held(tenant):
+                continue
+            self._tenants.pop(tenant).forget_metrics()
+            total -= sizes[tenant]
+            POOL_EVICTIONS.inc()
+        self._record(total)
+
+    def _record(self, total=None):
+        POOL_TENANTS.set(len(self._tenants))
+        if total is None:
+            total = sum(branches.memory_bytes() for branches in self._tenants.values())
+        POOL_BYTES.set(total)
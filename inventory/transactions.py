@@ -0,0 +1,482 @@
+"""
+Transaction-level ledger operations
+Every function takes the ledger DataFrame and returns the updated one
+"""
+
+import math
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .money import (
+    MONEY_COLUMNS,
+    MAX_PRICE,
+    MAX_QUANTITY,
+    MONEY_SCALE,
+    QUANTITY_SCALE,
+    check_limit,
+    compute_totals,
+    fixed_totals,
+    from_milli,
+    from_paise,
+    quantize,
+    round_money,
+    round_quantity,
+    to_milli,
+    to_paise,
+)
+
+# Columns added after the original 11-column layout (blank for older records)
+OPTIONAL_COLUMNS = ['Batch', 'Expiry Date', 'Customer']
+
+# Fields that may be changed on an existing transaction
+EDITABLE_FIELDS = ['Date', 'Product Name', 'Quantity Received', 'Quantity Sold',
+                   'Cost Price', 'Selling Price', 'Remarks', 'Batch', 'Expiry Date', 'Customer']
+
+NUMERIC_FIELDS = ['Quantity Received', 'Quantity Sold', 'Cost Price', 'Selling Price']
+
+# Keys every bulk-import record must carry
+REQUIRED_IMPORT_FIELDS = ['date', 'product_name', 'quantity_received', 'quantity_sold', 'cost_price', 'selling_price']
+
+
+def create_empty_dataframe():
+    """Create empty dataframe with required columns"""
+    return pd.DataFrame(columns=[
+        'Transaction ID', 'Date', 'Product Name', 'Quantity Received', 'Quantity Sold', 
+        'Stock Left', 'Cost Price', 'Selling Price', 'Total Purchase', 
+        'Total Sales', 'Profit', 'Remarks'
+    ] + OPTIONAL_COLUMNS)
+
+
+def calculate_stock_left(df, product, qty_received, qty_sold):
+    """Calculate stock left based on previous transactions"""
+    product_df = df[df['Product Name'] == product]
+    if len(product_df) > 0:
+        previous_stock = product_df.iloc[-1]['Stock Left']
+    else:
+        previous_stock = 0
+    
+    # Fixed-point so long runs of receipts and sales never drift
+    new_stock = sum(round(float(value) * QUANTITY_SCALE) * sign
+                    for value, sign in ((previous_stock, 1), (qty_received, 1), (qty_sold, -1)))
+    return new_stock / QUANTITY_SCALE
+
+
+def normalize_dataframe(df):
+    """Bring a loaded ledger up to the current column layout"""
+    if df.empty:
+        return create_empty_dataframe()
+    for col in OPTIONAL_COLUMNS:
+        if col not in df.columns:
+            df[col] = ''
+    return quantize(assign_transaction_ids(df))
+
+
+def encode_like(df, products):
+    """Product names in the ledger's encoding, so appended rows keep a categorical column"""
+    dtype = df['Product Name'].dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return pd.Categorical(products, dtype=dtype)
+    return products
+
+
+def build_transaction_row(txn_id, stock_left, date, product, qty_received, qty_sold, cost_price,
+                          selling_price, remarks='', batch='', expiry_date='', customer=''):
+    """Create a ledger row with auto-calculated totals (computed in paise)"""
+    received, sold = round(float(qty_received) * QUANTITY_SCALE), round(float(qty_sold) * QUANTITY_SCALE)
+    cost, selling = round(float(cost_price) * MONEY_SCALE), round(float(selling_price) * MONEY_SCALE)
+    purchase, sales, profit = fixed_totals(received, sold, cost, selling)
+    return {
+        'Transaction ID': txn_id,
+        'Date': date,
+        'Product Name': product,
+        'Quantity Received': received / QUANTITY_SCALE,
+        'Quantity Sold': sold / QUANTITY_SCALE,
+        'Stock Left': stock_left,
+        'Cost Price': cost / MONEY_SCALE,
+        'Selling Price': selling / MONEY_SCALE,
+        'Total Purchase': purchase / MONEY_SCALE,
+        'Total Sales': sales / MONEY_SCALE,
+        'Profit': profit / MONEY_SCALE,
+        'Remarks': remarks,
+        'Batch': batch,
+        'Expiry Date': expiry_date,
+        'Customer': customer
+    }
+
+
+def add_transaction(df, date, product, qty_received, qty_sold, cost_price, selling_price, remarks,
+                    batch='', expiry_date='', customer='', last_id=0):
+    """Add new transaction with auto-calculations (IDs continue after `last_id`, the highest ever issued)"""
+    stock_left = calculate_stock_left(df, product, qty_received, qty_sold)
+    new_row = build_transaction_row(
+        next_transaction_id(df, last_id), stock_left, date, product, qty_received, qty_sold,
+        cost_price, selling_price, remarks, batch, expiry_date, customer
+    )
+    
+    # Append to dataframe
+    new_df = pd.DataFrame([new_row])
+    new_df['Product Name'] = encode_like(df, new_df['Product Name'].values)
+    df = pd.concat([df, new_df], ignore_index=True)
+    return df
+
+
+def add_transactions(df, transactions, last_id=0):
+    """Append many transactions (add_transaction keyword dicts) in one vectorized step"""
+    if not transactions:
+        return df
+
+    batch = pd.DataFrame(transactions)
+    received = to_milli(batch['qty_received'])
+    sold = to_milli(batch['qty_sold'])
+    cost = to_paise(batch['cost_price'])
+    selling = to_paise(batch['selling_price'])
+    for values, limit, scale, field in ((received, MAX_QUANTITY, QUANTITY_SCALE, 'qty_received'),
+                                        (sold, MAX_QUANTITY, QUANTITY_SCALE, 'qty_sold'),
+                                        (cost, MAX_PRICE, MONEY_SCALE, 'cost_price'),
+                                        (selling, MAX_PRICE, MONEY_SCALE, 'selling_price')):
+        check_limit(values, limit, scale, field)
+    products = batch['product'].values
+
+    # Each product's last Stock Left (in thousandths) plus a running sum through the batch
+    if len(df) > 0:
+        last_rows = df.drop_duplicates('Product Name', keep='last')
+        opening = pd.Series(to_milli(last_rows['Stock Left']), index=last_rows['Product Name'].values)
+        opening = batch['product'].map(opening).fillna(0).astype(np.int64).values
+    else:
+        opening = 0
+    stock = pd.Series(received - sold).groupby(products, sort=False).cumsum().values + opening
+
+    purchase, sales, profit = fixed_totals(received, sold, cost, selling)
+    next_id = next_transaction_id(df, last_id)
+    new_rows = pd.DataFrame({
+        'Transaction ID': np.arange(next_id, next_id + len(batch), dtype=np.int64),
+        'Date': batch['date'].values,
+        'Product Name': encode_like(df, products),
+        'Quantity Received': from_milli(received),
+        'Quantity Sold': from_milli(sold),
+        'Stock Left': from_milli(stock),
+        'Cost Price': from_paise(cost),
+        'Selling Price': from_paise(selling),
+        'Total Purchase': from_paise(purchase),
+        'Total Sales': from_paise(sales),
+        'Profit': from_paise(profit),
+        'Remarks': batch['remarks'].fillna('').values if 'remarks' in batch else '',
+        'Batch': batch['batch'].fillna('').values if 'batch' in batch else '',
+        'Expiry Date': batch['expiry_date'].fillna('').values if 'expiry_date' in batch else '',
+        'Customer': batch['customer'].fillna('').values if 'customer' in batch else '',
+    })
+
+    if len(df) == 0:
+        return new_rows
+    return pd.concat([df, new_rows], ignore_index=True)
+
+
+def parse_import_record(record):
+    """Convert a bulk-import record (JSON keys) into add_transaction keyword arguments"""
+    return {
+        'date': record.get('date', ''),
+        'product': record.get('product_name', ''),
+        'qty_received': float(record.get('quantity_received', 0)),
+        'qty_sold': float(record.get('quantity_sold', 0)),
+        'cost_price': float(record.get('cost_price', 0)),
+        'selling_price': float(record.get('selling_price', 0)),
+        'remarks': record.get('remarks', ''),
+        'batch': str(record.get('batch', '') or ''),
+        'expiry_date': record.get('expiry_date', '') or '',
+        'customer': str(record.get('customer', '') or '').strip(),
+    }
+
+
+def to_import_record(txn):
+    """Convert add_transaction keyword arguments back into a bulk-import record (JSON keys)"""
+    return {
+        'date': txn['date'],
+        'product_name': txn['product'],
+        'quantity_received': txn['qty_received'],
+        'quantity_sold': txn['qty_sold'],
+        'cost_price': txn['cost_price'],
+        'selling_price': txn['selling_price'],
+        'remarks': txn.get('remarks', ''),
+        'batch': txn.get('batch', ''),
+        'expiry_date': txn.get('expiry_date', ''),
+        'customer': txn.get('customer', ''),
+    }
+
+
+def validate_import_record(record):
+    """Parse a bulk-import record strictly, raising ValueError on bad input"""
+    if not isinstance(record, dict):
+        raise ValueError("record must be a JSON object")
+    missing = [key for key in REQUIRED_IMPORT_FIELDS if key not in record]
+    if missing:
+        raise ValueError(f"missing required fields: {', '.join(missing)}")
+
+    if not isinstance(record['product_name'], str):
+        raise ValueError("product_name must be a string")
+    txn = parse_import_record(record)
+    try:
+        datetime.strptime(str(txn['date']), '%d/%m/%Y')
+    except ValueError:
+        raise ValueError(f"date must be DD/MM/YYYY, got {txn['date']!r}")
+    return validate_transaction(txn)
+
+
+def validate_transaction(txn):
+    """Check a transaction's product name and amounts (add_transaction keyword dict), raising ValueError"""
+    product = txn['product']
+    if not isinstance(product, str) or not product.strip():
+        raise ValueError("product name must be a non-empty string")
+    for field, limit in (('qty_received', MAX_QUANTITY), ('qty_sold', MAX_QUANTITY),
+                         ('cost_price', MAX_PRICE), ('selling_price', MAX_PRICE)):
+        value = float(txn[field])
+        if not math.isfinite(value) or not 0 <= value <= limit:
+            raise ValueError(f"{field} must be a number from 0 to {limit:,}, got {txn[field]!r}")
+    if product != product.strip():
+        txn = dict(txn, product=product.strip())
+    return txn
+
+
+def delete_transaction(df, product, date):
+    """Delete transaction for specific product and date, then recalculate stock"""
+    # Find matching transactions
+    mask = (df['Product Name'] == product) & (df['Date'] == date)
+    
+    if mask.any():
+        # Delete the first matching transaction by its ID
+        position = int(np.flatnonzero(mask.values)[0])
+        df, success, _ = delete_transaction_by_id(df, df['Transaction ID'].iat[position])
+        return df, success, "✅ Transaction deleted and stock recalculated!"
+    else:
+        return df, False, "⚠️ No transaction found for selected product and date!"
+
+
+def next_transaction_id(df, last_id=0):
+    """Return the next unused transaction ID
+
+    `last_id` is the highest ID ever issued, so IDs of deleted rows are
+    never handed out again.
+    """
+    if len(df) == 0 or 'Transaction ID' not in df.columns:
+        return last_id + 1
+    return max(int(df['Transaction ID'].max()), last_id) + 1
+
+
+def assign_transaction_ids(df):
+    """Give legacy rows without a Transaction ID sequential IDs in ledger order"""
+    if 'Transaction ID' not in df.columns:
+        df.insert(0, 'Transaction ID', np.arange(1, len(df) + 1, dtype=np.int64))
+    elif df['Transaction ID'].isna().any():
+        missing = df['Transaction ID'].isna()
+        start = int(df['Transaction ID'].max()) + 1 if (~missing).any() else 1
+        df.loc[missing, 'Transaction ID'] = np.arange(start, start + missing.sum())
+        df['Transaction ID'] = df['Transaction ID'].astype(np.int64)
+    return df
+
+
+def build_ledger_index(df):
+    """Build the ID-to-position and product-to-positions indexes for a ledger"""
+    if len(df) == 0:
+        return {'ids': {}, 'products': {}}
+    return {
+        'ids': dict(zip(df['Transaction ID'].tolist(), range(len(df)))),
+        'products': df.groupby('Product Name', sort=False, observed=True).indices,
+    }
+
+
+def ensure_float_columns(df, columns):
+    """Cast integer columns to float so fractional values can be written in place"""
+    for col in columns:
+        if df[col].dtype.kind in 'iu':
+            df[col] = df[col].astype(float)
+    return df
+
+
+def recalculate_stock_from(df, product, start):
+    """Recompute Stock Left for a product's rows at or after position `start`"""
+    names = df['Product Name'].values
+    positions = np.flatnonzero(names[start:] == product) + start
+    if len(positions) == 0:
+        return df
+
+    # Opening balance is the product's last Stock Left before the affected suffix
+    prior = np.flatnonzero(names[:start] == product)
+    opening = int(to_milli(df['Stock Left'].iat[prior[-1]])) if len(prior) > 0 else 0
+
+    received = to_milli(df['Quantity Received'].values[positions])
+    sold = to_milli(df['Quantity Sold'].values[positions])
+    df = ensure_float_columns(df, ['Stock Left'])
+    stock_col = df.columns.get_loc('Stock Left')
+    df.iloc[positions, stock_col] = from_milli(opening + np.cumsum(received - sold))
+    return df
+
+
+def delete_transaction_by_id(df, txn_id, index=None):
+    """Delete one transaction by ID and recompute only its product's later stock"""
+    if index is None:
+        index = build_ledger_index(df)
+    position = index['ids'].get(txn_id)
+    if position is None:
+        return df, False, f"⚠️ Transaction #{txn_id} not found!"
+
+    product = df['Product Name'].iat[position]
+    df = df.drop(df.index[position]).reset_index(drop=True)
+    df = recalculate_stock_from(df, product, position)
+    return df, True, f"✅ Transaction #{txn_id} deleted and stock recalculated!"
+
+
+def edit_transaction_by_id(df, txn_id, updates, index=None):
+    """Edit one transaction in place by ID and recompute only the affected product suffixes"""
+    df, success, message = apply_transaction_edits(df, {txn_id: updates}, index)
+    if success:
+        message = f"✅ Transaction #{txn_id} updated and stock recalculated!"
+    return df, success, message
+
+
+def apply_transaction_edits(df, edits, index=None):
+    """Apply a batch of cell edits {txn_id: {field: value}} and recompute derived columns once"""
+    if index is None:
+        index = build_ledger_index(df)
+
+    # Validate the whole batch before touching the ledger
+    positions = {}
+    for txn_id, changes in edits.items():
+        position = index['ids'].get(txn_id)
+        if position is None:
+            return df, False, f"⚠️ Transaction #{txn_id} not found!"
+        invalid = [field for field in changes if field not in EDITABLE_FIELDS]
+        if invalid:
+            return df, False, f"⚠️ Cannot edit: {', '.join(invalid)}"
+        for field in NUMERIC_FIELDS:
+            if field in changes:
+                limit = MAX_QUANTITY if field.startswith('Quantity') else MAX_PRICE
+                value = changes[field]
+                if value is None or not math.isfinite(float(value)) or not 0 <= float(value) <= limit:
+                    return df, False, f"⚠️ {field} must be from 0 to {limit:,} (transaction #{txn_id})"
+        if 'Date' in changes:
+            try:
+                datetime.strptime(str(changes['Date']), '%d/%m/%Y')
+            except ValueError:
+                return df, False, f"⚠️ Date must be DD/MM/YYYY (transaction #{txn_id})"
+        positions[txn_id] = position
+
+    if not positions:
+        return df, False, "⚠️ No edits to apply!"
+
+    df = ensure_float_columns(df, NUMERIC_FIELDS + ['Total Purchase', 'Total Sales', 'Profit'])
+
+    # Earliest edited position per product (old and new names) bounds the recompute
+    touched = {}
+    for txn_id, changes in edits.items():
+        position = positions[txn_id]
+        old_product = df['Product Name'].iat[position]
+        touched[old_product] = min(position, touched.get(old_product, position))
+        for field, value in changes.items():
+            if field in NUMERIC_FIELDS:
+                value = round_money(value) if field in MONEY_COLUMNS else round_quantity(value)
+            df.iat[position, df.columns.get_loc(field)] = value
+        new_product = df['Product Name'].iat[position]
+        touched[new_product] = min(position, touched.get(new_product, position))
+
+    # Recompute row totals for edited rows only
+    rows = np.fromiter(positions.values(), dtype=np.int64)
+    totals = compute_totals(*(df[col].values[rows] for col in NUMERIC_FIELDS))
+    for col, values in zip(['Total Purchase', 'Total Sales', 'Profit'], totals):
+        df.iloc[rows, df.columns.get_loc(col)] = from_paise(values)
+
+    for product, start in touched.items():
+        df = recalculate_stock_from(df, product, start)
+    return df, True, f"✅ {len(positions)} transaction(s) updated and stock recalculated!"
+
+
+def recalculate_stock(df, products):
+    """Recompute Stock Left for whole products with one grouped cumulative sum"""
+    mask = df['Product Name'].isin(list(products)).values
+    if not mask.any():
+        return df
+    df = ensure_float_columns(df, ['Stock Left'])
+    delta = pd.Series(to_milli(df['Quantity Received']) - to_milli(df['Quantity Sold']), index=df.index)
+    stock = delta[mask].groupby(df['Product Name'][mask], sort=False, observed=True).cumsum()
+    df.loc[mask, 'Stock Left'] = from_milli(stock.values)
+    return df
+
+
+def build_bulk_filter_mask(df, product=None, date_range=None, remarks_text=None):
+    """Select ledger rows by product, inclusive date range and remarks text"""
+    mask = pd.Series(True, index=df.index)
+    if product and product != "All Products":
+        mask &= df['Product Name'] == product
+    if date_range:
+        start, end = date_range
+        dates = parse_dates(df['Date'])
+        mask &= (dates >= parse_date(start)) & (dates <= parse_date(end))
+    if remarks_text and remarks_text.strip():
+        mask &= df['Remarks'].fillna('').astype(str).str.contains(remarks_text.strip(), case=False, regex=False)
+    return mask
+
+
+def bulk_delete(df, mask):
+    """Delete every row matching a filter and recompute stock once per touched product"""
+    count = int(mask.sum())
+    if count == 0:
+        return df, False, "⚠️ No transactions match the filter!"
+    touched = df.loc[mask, 'Product Name'].unique()
+    df = df.loc[~mask].reset_index(drop=True)
+    df = recalculate_stock(df, touched)
+    return df, True, f"✅ Deleted {count} transaction(s) and recalculated stock for {len(touched)} product(s)!"
+
+
+def bulk_adjust_prices(df, mask, cost_price=None, selling_price=None, percent=False):
+    """Set (or scale by a percentage) cost and selling prices on every row matching a filter"""
+    count = int(mask.sum())
+    if count == 0:
+        return df, False, "⚠️ No transactions match the filter!"
+    if cost_price is None and selling_price is None:
+        return df, False, "⚠️ No price change given!"
+
+    changes = [(col, float(value)) for col, value in (('Cost Price', cost_price), ('Selling Price', selling_price))
+               if value is not None]
+    if not all(math.isfinite(value) for _, value in changes):
+        return df, False, "⚠️ Price change must be a finite number!"
+
+    df = ensure_float_columns(df, ['Cost Price', 'Selling Price', 'Total Purchase', 'Total Sales', 'Profit'])
+    for col, value in changes:
+        if percent:
+            prices = (df.loc[mask, col].astype(float) * (1 + value / 100)).round(2)
+        else:
+            prices = round_money(value)
+        try:
+            check_limit(to_paise(prices), MAX_PRICE, MONEY_SCALE, col)
+        except ValueError as e:
+            return df, False, f"⚠️ {e}"
+        df.loc[mask, col] = prices
+
+    rows = df.loc[mask]
+    totals = compute_totals(*(rows[col] for col in NUMERIC_FIELDS))
+    for col, values in zip(['Total Purchase', 'Total Sales', 'Profit'], totals):
+        df.loc[mask, col] = from_paise(values)
+    return df, True, f"✅ Updated prices on {count} transaction(s)!"
+
+
+def parse_dates(dates):
+    """Parse a Date column (DD/MM/YYYY strings or date objects) into datetime64"""
+    parsed = pd.to_datetime(dates, format='%d/%m/%Y', errors='coerce')
+    missing = parsed.isna() & dates.notna()
+    if missing.any():
+        # Fall back for date objects / ISO strings written by older versions
+        parsed[missing] = pd.to_datetime(dates[missing], dayfirst=True, errors='coerce')
+    return parsed
+
+
+def parse_date(value):
+    """Timestamp of one date, Timestamp or date string; strings are read day-first (DD/MM/YYYY)"""
+    if isinstance(value, str):
+        # DD/MM/YYYY first, then unambiguous ISO (YYYY-MM-DD); anything else is read day-first
+        for kwargs in ({'format': '%d/%m/%Y'}, {'format': 'ISO8601'}):
+            try:
+                return pd.to_datetime(value, **kwargs)
+            except ValueError:
+                pass
+        return pd.to_datetime(value, dayfirst=True)
+    return pd.Timestamp(value)
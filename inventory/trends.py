@@ -0,0 +1,120 @@
+"""
+Price and margin trends - rolling average prices and margin, and the price-change points of one product
+"""
+
+import numpy as np
+import pandas as pd
+
+from .money import MONEY_SCALE, QUANTITY_SCALE, to_milli, to_paise
+from .queries import MISSING_DAY
+
+# Trailing windows (days) offered for the rolling averages
+TREND_WINDOWS = (7, 30, 90)
+DEFAULT_TREND_WINDOW = 30
+
+TREND_COLUMNS = ['Date', 'Selling Price', 'Cost Price', 'Avg Selling Price', 'Avg Cost Price', 'Margin %',
+                 'Units Sold', 'Profit']
+CHANGE_COLUMNS = ['Date', 'Price', 'From', 'To', 'Change %', 'Units Sold Before', 'Units Sold After',
+                  'Margin % Before', 'Margin % After', 'Profit Effect']
+
+# (price, quantity that must be positive for a row to set it, sign of its effect on profit)
+TRACKED_PRICES = [('Selling Price', 'Quantity Sold', 1), ('Cost Price', 'Quantity Received', -1)]
+
+
+def price_trends(rows, days, window=DEFAULT_TREND_WINDOW):
+    """Daily and rolling prices and margin of one product's rows, plus its price-change points
+
+    `days` holds each row's day number. Rows are put in date order (same-day
+    rows keep ledger order) and totalled per day in paise and thousandths.
+    Time-based rolling sums over the last `window` days then give the
+    quantity-weighted average selling and cost prices and the margin.
+    """
+    dated = days != MISSING_DAY
+    order = np.argsort(days[dated], kind='stable')
+    rows = rows[dated].iloc[order]
+    days = days[dated][order]
+    if len(rows) == 0:
+        return pd.DataFrame(columns=TREND_COLUMNS), pd.DataFrame(columns=CHANGE_COLUMNS)
+
+    totals = pd.DataFrame({
+        'sold': to_milli(rows['Quantity Sold']),
+        'sales': to_paise(rows['Total Sales']),
+        'profit': to_paise(rows['Profit']),
+        'received': to_milli(rows['Quantity Received']),
+        'purchases': to_paise(rows['Total Purchase']),
+    }, index=pd.DatetimeIndex(days.astype('datetime64[D]'))).groupby(level=0).sum()
+    rolling = totals.rolling(f'{window}D').sum()
+
+    def ratio(value, quantity):
+        # Paise per thousandth of a unit, as rupees per unit
+        return (value / quantity.where(quantity > 0) * QUANTITY_SCALE / MONEY_SCALE).values
+
+    trend = pd.DataFrame({
+        'Date': totals.index,
+        'Selling Price': ratio(totals['sales'], totals['sold']),
+        'Cost Price': ratio(totals['purchases'], totals['received']),
+        # The last average holds through windows without sales or receipts
+        'Avg Selling Price': pd.Series(ratio(rolling['sales'], rolling['sold'])).ffill().values,
+        'Avg Cost Price': pd.Series(ratio(rolling['purchases'], rolling['received'])).ffill().values,
+        'Margin %': (rolling['profit'] / rolling['sales'].where(rolling['sales'] > 0) * 100).values,
+        'Units Sold': totals['sold'].values / QUANTITY_SCALE,
+        'Profit': totals['profit'].values / MONEY_SCALE,
+    }, columns=TREND_COLUMNS)
+    return _rounded(trend), price_changes(rows, days)
+
+
+def price_changes(rows, days):
+    """Points where a product's selling or cost price changed, with sales and margin either side
+
+    Each change starts a segment that runs to the next change of the same
+    price. The profit effect is the price difference times the units sold
+    in the new segment: what the change added to (or took from) profit at
+    the volume actually sold.
+    """
+    sold = to_milli(rows['Quantity Sold'])
+    sales = to_paise(rows['Total Sales'])
+    profit = to_paise(rows['Profit'])
+    frames = []
+    for column, quantity, sign in TRACKED_PRICES:
+        active = np.flatnonzero(rows[quantity].astype(float).values > 0)
+        prices = to_paise(rows[column])[active]
+        changed = np.flatnonzero(prices[1:] != prices[:-1]) + 1
+        if len(changed) == 0:
+            continue
+
+        # Segment of every row: how many changes happened at or before it
+        starts = np.zeros(len(rows), dtype=np.int64)
+        starts[active[changed]] = 1
+        segment = np.cumsum(starts)
+        count = len(changed) + 1
+        units = np.bincount(segment, weights=sold, minlength=count)
+        segment_sales = np.bincount(segment, weights=sales, minlength=count)
+        segment_profit = np.bincount(segment, weights=profit, minlength=count)
+        margin = np.where(segment_sales > 0, segment_profit / np.where(segment_sales > 0, segment_sales, 1) * 100,
+                          np.nan)
+
+        old, new = prices[changed - 1], prices[changed]
+        frames.append(pd.DataFrame({
+            'Day': days[active[changed]],
+            'Price': column,
+            'From': old / MONEY_SCALE,
+            'To': new / MONEY_SCALE,
+            'Change %': np.where(old > 0, (new - old) / np.where(old > 0, old, 1) * 100, np.nan),
+            'Units Sold Before': units[:-1] / QUANTITY_SCALE,
+            'Units Sold After': units[1:] / QUANTITY_SCALE,
+            'Margin % Before': margin[:-1],
+            'Margin % After': margin[1:],
+            'Profit Effect': sign * (new - old) * units[1:] / QUANTITY_SCALE / MONEY_SCALE,
+        }))
+    if not frames:
+        return pd.DataFrame(columns=CHANGE_COLUMNS)
+    changes = pd.concat(frames, ignore_index=True).sort_values('Day', kind='mergesort')
+    changes.insert(0, 'Date', changes.pop('Day').values.astype('datetime64[D]'))
+    return _rounded(changes.reset_index(drop=True)[CHANGE_COLUMNS])
+
+
+def _rounded(report):
+    """Numbers to two decimals (dates left alone)"""
+    numeric = report.select_dtypes('number').columns
+    report[numeric] = report[numeric].round(2)
+    return report
@@ -0,0 +1,201 @@
+"""
+Group-commit writer
+Coalesces incoming transactions in a bounded in-memory queue and commits them
+to the ledger in batches, so a burst of writes costs one save instead of one each.
+
+A batch that still cannot be saved after max_retries attempts is taken back
+out of the ledger and appended to a dead-letter file as bulk-import records,
+so one bad batch or a long storage outage cannot block the queue forever.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from .transactions import to_import_record
+
+logger = logging.getLogger('inventory.writer')
+
+# Dead-letter file, next to the ledger's storage file
+DEAD_LETTER_FILE = 'dead_letter.jsonl'
+
+
+class QueueFull(Exception):
+    """Raised when the write queue cannot take more transactions"""
+
+
+class GroupCommitWriter:
+    """Background thread that appends queued transactions and saves once per batch"""
+
+    def __init__(self, ledger, lock=None, max_batch=500, max_delay=0.5, max_queue=50000, retry_delay=1.0,
+                 on_commit=None, max_retries=5, dead_letter_file=None, on_dead_letter=None):
+        self.ledger = ledger
+        self.lock = lock or threading.RLock()
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        self.dead_letter_file = dead_letter_file or os.path.join(os.path.dirname(ledger.storage_file),
+                                                                 DEAD_LETTER_FILE)
+        self.on_commit = on_commit  # Called from the commit thread with the tags of every saved transaction
+        self.on_dead_letter = on_dead_letter    # Likewise, with the tags of every dead-lettered transaction
+        self.queue = queue.Queue(maxsize=max_queue)     # (transaction, tag) pairs
+        self.committed = 0
+        self.commits = 0
+        self.failures = 0
+        self.dead_lettered = 0
+        self.busy = 0.0         # Seconds spent appending and saving
+        self.last_error = None
+        self._attempts = 0      # Failed commits in a row of the held transactions
+        self._retry = []        # Taken off the queue, but not in the ledger yet
+        self._unsaved = []      # (transaction, tag) pairs in the ledger, but not saved yet
+        self._unsaved_ids = []  # Their transaction IDs
+        self._submit_lock = threading.Lock()   # Capacity check and enqueue happen as one step
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def healthy(self):
+        """False while a commit is failing (acknowledged transactions are held and retried)"""
+        return self.last_error is None
+
+    @property
+    def pending(self):
+        """Acknowledged transactions not saved yet"""
+        return self.queue.qsize() + len(self._retry) + len(self._unsaved)
+
+    def submit(self, transactions, tag=None):
+        """Queue parsed transactions for the next commit; returns the queue depth
+
+        `tag` is handed back to on_commit once the transactions are saved.
+        """
+        if not self.healthy:
+            raise QueueFull(f"commits are failing ({self.pending} pending): {self.last_error}")
+        with self._submit_lock:
+            # Only submit() adds to the queue, so room seen here cannot be taken by another request:
+            # a request is queued whole or rejected whole
+            if self.queue.qsize() + len(transactions) > self.queue.maxsize:
+                raise QueueFull(f"write queue is full ({self.queue.qsize()} pending)")
+            for txn in transactions:
+                self.queue.put_nowait((txn, tag))
+            return self.queue.qsize()
+
+    def start(self):
+        """Start the background commit thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the commit thread after flushing everything queued"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def flush(self):
+        """Commit everything queued right now, raising RuntimeError if it cannot be saved"""
+        while True:
+            if not self._commit(self._drain(block=False)):
+                raise RuntimeError(f"{self.pending} acknowledged transaction(s) could not be saved: "
+                                   f"{self.last_error}")
+            if self.queue.empty():
+                return
+
+    def _drain(self, block=True):
+        """Collect up to max_batch transactions, waiting at most max_delay for the batch to fill"""
+        batch = []
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                if block and timeout > 0:
+                    batch.append(self.queue.get(timeout=timeout))
+                else:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, batch):
+        """Append one batch and save once; returns False when that failed
+
+        Every transaction here was acknowledged to a client, so nothing is
+        dropped on failure: a batch that did not reach the ledger is kept for
+        the next attempt, and one that did is only saved again. After
+        max_retries failures in a row the commit thread dead-letters them.
+        """
+        batch = self._retry + batch
+        if not batch and not self._unsaved:
+            return True
+        start = time.perf_counter()
+        try:
+            with self.lock:
+                if batch:
+                    first = self.ledger.last_id + 1
+                    self.ledger.ingest([txn for txn, _ in batch])
+                    self._unsaved += batch
+                    self._unsaved_ids.extend(range(first, self.ledger.last_id + 1))
+                    batch = []
+                self.ledger.save()
+        except Exception as e:
+            self._retry = batch
+            self.failures += 1
+            self._attempts += 1
+            self.last_error = str(e)
+            logger.exception("Commit of %d acknowledged transaction(s) failed (attempt %d of %d)",
+                             self.pending, self._attempts, self.max_retries)
+            return False
+        finally:
+            self.busy += time.perf_counter() - start
+        saved, self._unsaved, self._unsaved_ids, self._retry = self._unsaved, [], [], []
+        self._attempts = 0
+        self.committed += len(saved)
+        self.commits += 1
+        self.last_error = None
+        if self.on_commit is not None:
+            self.on_commit([tag for _, tag in saved])
+        return True
+
+    def _dead_letter(self):
+        """Move the held transactions out of the ledger and into the dead-letter file; returns False if that failed"""
+        held = self._retry + self._unsaved
+        try:
+            with open(self.dead_letter_file, 'a') as f:
+                for txn, _ in held:
+                    f.write(json.dumps(to_import_record(txn), default=str) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            logger.exception("Could not write %d transaction(s) to %s; still retrying", len(held),
+                             self.dead_letter_file)
+            return False
+        with self.lock:
+            if self._unsaved_ids:
+                # In memory only: drop them so a later save does not store them as well
+                self.ledger.bulk_delete(self.ledger.df['Transaction ID'].isin(self._unsaved_ids))
+        logger.error("Gave up on %d transaction(s) after %d failed commits (%s); appended to %s",
+                     len(held), self._attempts, self.last_error, self.dead_letter_file)
+        self._retry, self._unsaved, self._unsaved_ids = [], [], []
+        self._attempts = 0
+        self.dead_lettered += len(held)
+        self.last_error = None
+        if self.on_dead_letter is not None:
+            self.on_dead_letter([tag for _, tag in held])
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._retry or self._unsaved:
+                # Retry the failed batch before taking more, so the queue fills and new writes get 503
+                if not self._commit([]):
+                    if self._attempts >= self.max_retries and self._dead_letter():
+                        continue
+                    self._stop.wait(self.retry_delay)
+                continue
+            self._commit(self._drain())
@@ -0,0 +1,36 @@
+"""Shared fixtures: ledgers in a temporary storage folder"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from inventory.ledger import Ledger
+
+PRODUCTS = ['Wheat', 'Urea', 'DAP']
+
+
+def add_rows(ledger, start, count, seed):
+    """Alternating batch receipts and sales of a few products, one day apart from 01/01/2025"""
+    rng = np.random.default_rng(seed)
+    for i in range(start, start + count):
+        day = pd.Timestamp('2025-01-01') + pd.Timedelta(days=i)
+        product = PRODUCTS[i % len(PRODUCTS)]
+        if i % 2 == 0:
+            ledger.add_transaction(day.strftime('%d/%m/%Y'), product, float(rng.integers(5, 50)), 0,
+                                   round(float(rng.uniform(10, 30)), 2), 0, batch=f"B{i}",
+                                   expiry_date=(day + pd.Timedelta(days=60)).strftime('%d/%m/%Y'))
+        else:
+            ledger.add_transaction(day.strftime('%d/%m/%Y'), product, 0, float(rng.integers(1, 10)),
+                                   round(float(rng.uniform(10, 30)), 2), round(float(rng.uniform(20, 40)), 2))
+
+
+@pytest.fixture
+def empty_ledger(tmp_path):
+    return Ledger(storage_file=str(tmp_path / 'data.json'))
+
+
+@pytest.fixture
+def ledger(empty_ledger):
+    """120 rows of three products from 01/01/2025"""
+    add_rows(empty_ledger, 0, 120, seed=1)
+    return empty_ledger
@@ -0,0 +1,22 @@
+"""Sales anomaly detection and the review queue"""
+
+import numpy as np
+
+from inventory.anomalies import AnomalyDetector
+from conftest import add_rows
+
+
+def test_incremental_scores_match_a_full_replay(ledger):
+    ledger.anomaly_detector()
+    for batch in range(3):
+        add_rows(ledger, 120 + batch * 20, 20, seed=batch + 2)
+    full = AnomalyDetector(ledger.non_trading_ids).replay(ledger.df)
+    assert np.allclose(ledger.anomaly_detector().scores, full.scores)
+
+
+def test_outlier_is_flagged_until_reviewed(ledger):
+    ledger.add_transaction('01/06/2025', 'Wheat', 0, 500, 20, 30)
+    txn_id = int(ledger.df['Transaction ID'].iat[-1])
+    assert txn_id in ledger.review_queue()['Transaction ID'].tolist()
+    assert ledger.mark_reviewed([txn_id])[0]
+    assert txn_id not in ledger.review_queue()['Transaction ID'].tolist()
@@ -0,0 +1,72 @@
+"""Fiscal-year archiving with carried-forward opening balances"""
+
+from datetime import datetime
+
+import pandas as pd
+
+from inventory.batches import BatchTracker
+from inventory.ledger import Ledger
+from conftest import PRODUCTS
+
+
+def test_archive_keeps_totals_and_stock(ledger):
+    before = ledger.product_summary()
+    stock = {product: ledger.current_stock(product) for product in PRODUCTS}
+    rows = len(ledger.df)
+
+    success, message = ledger.archive('31/03/2025')
+    assert success, message
+    assert len(ledger.df) < rows
+    pd.testing.assert_frame_equal(ledger.product_summary(), before, check_dtype=False)
+    assert {product: ledger.current_stock(product) for product in PRODUCTS} == stock
+    assert len(ledger.history()) == rows
+
+    # A second archive through the same date is refused
+    assert not ledger.archive('31/03/2025')[0]
+
+
+def test_archive_and_opening_balances_survive_save_and_load(ledger):
+    assert ledger.archive('31/03/2025')[0]
+    ledger.save()
+
+    loaded = Ledger.load(ledger.storage_file)
+    assert loaded.archives == ledger.archives
+    assert loaded.opening_ids() == ledger.opening_ids()
+    pd.testing.assert_frame_equal(loaded.df, ledger.df, check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(loaded.history().reset_index(drop=True), ledger.history().reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(loaded.product_summary(), ledger.product_summary(), check_dtype=False)
+
+
+def test_archive_cut_off_is_read_day_first(ledger):
+    # 01/02/2025 is 1 February: only January's rows (and 1 February) are archived
+    assert ledger.archive('01/02/2025')[0]
+    assert ledger.archives[0]['rows'] == 32
+
+
+def test_open_batches_survive_archiving(ledger):
+    today = datetime(2025, 4, 1)
+    expiring = ledger.expiring_within(90, today=today)
+    assert len(expiring) > 0
+
+    assert ledger.archive('31/03/2025')[0]
+    pd.testing.assert_frame_equal(ledger.expiring_within(90, today=today), expiring, check_dtype=False)
+    assert ledger.batch_tracker().allocations == BatchTracker().replay(ledger.df)
+
+    ledger.save()
+    pd.testing.assert_frame_equal(Ledger.load(ledger.storage_file).expiring_within(90, today=today), expiring,
+                                  check_dtype=False)
+
+
+def test_opening_rows_cannot_be_edited_or_deleted(ledger):
+    assert ledger.archive('31/03/2025')[0]
+    opening_id = min(ledger.opening_ids())
+    assert not ledger.delete(opening_id)[0]
+    assert not ledger.edit({opening_id: {'Cost Price': 1.0}})[0]
+
+    rows = len(ledger.df)
+    assert not ledger.filter_mask().loc[ledger.df['Transaction ID'].isin(ledger.opening_ids())].any()
+    assert ledger.bulk_adjust_prices(ledger.df['Transaction ID'] > 0, cost_price=1.0)[0]
+    assert ledger.bulk_delete(ledger.df['Transaction ID'] > 0)[0]
+    assert len(ledger.df) == len(ledger.opening_ids()) < rows
+    assert ledger.check_integrity().empty
@@ -0,0 +1,29 @@
+"""Point-in-time stock and valuation queries"""
+
+import pandas as pd
+
+from inventory.queries import format_day, to_day
+from inventory.transactions import parse_date
+
+
+def test_date_strings_are_read_day_first():
+    assert parse_date('05/01/2026') == pd.Timestamp('2026-01-05')
+    assert parse_date('2026-01-05') == pd.Timestamp('2026-01-05')
+    assert format_day(to_day('05/01/2026')) == '05/01/2026'
+
+
+def test_stock_asof_matches_the_running_stock(ledger):
+    rows = ledger.df[ledger.df['Product Name'] == 'Wheat']
+    day = rows['Date'].iat[10]
+    assert ledger.stock_asof('Wheat', day)['Stock'] == float(rows['Stock Left'].iat[10])
+
+
+def test_as_of_dates_are_read_day_first(ledger):
+    # 05/02/2025 is 5 February, not 2 May
+    early = ledger.stock_asof('Wheat', '05/02/2025')
+    assert early == ledger.stock_asof('Wheat', pd.Timestamp('2025-02-05'))
+    assert early != ledger.stock_asof('Wheat', pd.Timestamp('2025-05-02'))
+
+
+def test_before_the_first_transaction(ledger):
+    assert ledger.stock_asof('Wheat', '01/01/2000')['Stock'] == 0.0
@@ -0,0 +1,25 @@
+"""Expiry-tracked batches with FEFO allocation"""
+
+from datetime import datetime
+
+from inventory.batches import BatchTracker
+from conftest import add_rows
+
+
+def test_sales_draw_from_the_earliest_expiry_first(empty_ledger):
+    ledger = empty_ledger
+    ledger.add_transaction('01/01/2026', 'Urea', 10, 0, 5, 0, batch='LATE', expiry_date='01/12/2026')
+    ledger.add_transaction('02/01/2026', 'Urea', 10, 0, 5, 0, batch='EARLY', expiry_date='01/06/2026')
+    ledger.add_transaction('03/01/2026', 'Urea', 0, 12, 5, 8)
+    assert ledger.batch_tracker().allocations[-1] == [
+        ('EARLY', 10.0, datetime(2026, 6, 1).toordinal()), ('LATE', 2.0, datetime(2026, 12, 1).toordinal())]
+
+    expiring = ledger.expiring_within(400, today=datetime(2026, 1, 3))
+    assert expiring[['Batch', 'Quantity']].values.tolist() == [['LATE', 8.0]]
+
+
+def test_incremental_allocations_match_a_full_replay(ledger):
+    ledger.batch_tracker()
+    for batch in range(3):
+        add_rows(ledger, 120 + batch * 20, 20, seed=batch + 2)
+    assert ledger.batch_tracker().allocations == BatchTracker().replay(ledger.df)
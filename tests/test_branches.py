@@ -0,0 +1,97 @@
+"""Multi-branch locations and stock transfers"""
+
+import os
+
+import pytest
+
+from inventory.branches import Branches
+from inventory.ledger import Ledger
+from inventory.storage import location_file
+
+
+@pytest.fixture
+def branches(tmp_path):
+    main = Ledger(storage_file=str(tmp_path / 'data.json'))
+    branches = Branches({'Main': main}, main.catalog, registry_file=str(tmp_path / 'branches.json'))
+    assert branches.add_location('North')[0]
+    main.add_transaction('01/01/2026', 'Wheat', 100, 0, 20, 0)
+    main.add_transaction('02/01/2026', 'Wheat', 0, 10, 20, 25)
+    branches.save()
+    return branches
+
+
+def reload(branches):
+    return Branches.load(branches.registry_file)
+
+
+def test_transfer_moves_stock_and_nets_out_of_the_consolidated_summary(branches):
+    assert branches.transfer('03/01/2026', 'Wheat', 30, 'Main', 'North')[0]
+    assert branches['Main'].current_stock('Wheat') == 60
+    assert branches['North'].current_stock('Wheat') == 30
+    summary = branches.consolidated_summary().set_index('Product Name')
+    assert summary.loc['Wheat', 'Total Sales'] == 250.0
+    assert summary.loc['Wheat', 'Current Stock'] == 90
+
+
+def test_transfer_needs_stock_at_the_source(branches):
+    success, _ = branches.transfer('03/01/2026', 'Wheat', 500, 'Main', 'North')
+    assert not success
+    assert branches.transfers == []
+
+
+def test_a_transfer_side_cannot_be_deleted_alone(branches):
+    assert branches.transfer('03/01/2026', 'Wheat', 30, 'Main', 'North')[0]
+    out_id = branches.transfers[0]['Out ID']
+    assert not branches['Main'].delete(out_id)[0]
+    assert not branches['Main'].edit({out_id: {'Quantity Sold': 1}})[0]
+    assert branches['Main'].bulk_delete(branches['Main'].df['Transaction ID'] > 0)[0]
+    assert branches['Main'].df['Transaction ID'].tolist() == [out_id]
+
+
+def test_deleting_a_transfer_removes_both_sides_and_the_log_entry(branches):
+    assert branches.transfer('03/01/2026', 'Wheat', 30, 'Main', 'North')[0]
+    transfer = branches.transfer_of('North', branches.transfers[0]['In ID'])
+    assert branches.delete_transfer(transfer['Transfer ID'])[0]
+    branches.save('Main', 'North')
+
+    assert branches.transfers == []
+    assert branches['Main'].current_stock('Wheat') == 90
+    assert branches['North'].current_stock('Wheat') == 0
+
+    # The next sale gets a new ID, which is not reported as a transfer after a reload
+    branches['Main'].add_transaction('04/01/2026', 'Wheat', 0, 5, 20, 25)
+    branches.save('Main')
+    loaded = reload(branches)
+    assert loaded.transfer_ids('Main') == set()
+    assert loaded['Main'].product_summary().set_index('Product Name').loc['Wheat', 'Total Sales'] == 375.0
+
+
+def test_load_logs_a_transfer_saved_in_both_ledgers_but_not_the_log(branches):
+    assert branches.transfer('03/01/2026', 'Wheat', 30, 'Main', 'North', remarks='truck 7')[0]
+    # Interrupted before the log was written
+    branches['Main'].save()
+    branches['North'].save()
+
+    loaded = reload(branches)
+    assert len(loaded.transfers) == 1
+    transfer = loaded.transfers[0]
+    assert (transfer['From'], transfer['To'], transfer['Quantity'], transfer['Remarks']) == \
+        ('Main', 'North', 30.0, 'truck 7')
+    assert loaded['North'].current_stock('Wheat') == 30
+
+
+def test_load_rolls_back_a_transfer_saved_on_one_side_only(branches):
+    assert branches.transfer('03/01/2026', 'Wheat', 30, 'Main', 'North')[0]
+    # Interrupted after the source ledger was written
+    branches['Main'].save()
+
+    loaded = reload(branches)
+    assert loaded.transfers == []
+    assert loaded['Main'].current_stock('Wheat') == 90
+    # The rollback is saved
+    assert reload(loaded)['Main'].current_stock('Wheat') == 90
+
+
+def test_locations_get_their_own_storage(branches, tmp_path):
+    assert os.path.exists(location_file('North', str(tmp_path)))
+    assert not branches.add_location('north')[0]
@@ -0,0 +1,85 @@
+"""Product catalog: IDs, SKUs, renames, aliases and merges"""
+
+from inventory.ledger import Ledger
+from inventory.products import ProductCatalog
+
+
+def test_names_are_normalized_and_unique():
+    catalog = ProductCatalog.from_names(['Wheat', ' Wheat ', 'Urea'])
+    assert catalog.names() == ['Wheat', 'Urea']
+    assert catalog.ensure('Urea ') == catalog.id_for('Urea')
+    assert not catalog.add(' Wheat')[0]
+    assert not catalog.add('  ')[0]
+
+
+def test_skus_are_unique():
+    catalog = ProductCatalog.from_names(['Wheat'])
+    assert catalog.add('Urea', sku='U-46')[0]
+    assert catalog.id_for_sku('U-46') == catalog.id_for('Urea')
+    assert not catalog.add('DAP', sku='U-46')[0]
+    assert not catalog.update(catalog.id_for('Wheat'), sku='U-46')[0]
+    assert catalog.update(catalog.id_for('Urea'), sku='U-47')[0]
+    assert catalog.id_for_sku('U-46') is None
+
+
+def test_removing_a_product_keeps_its_id():
+    catalog = ProductCatalog.from_names(['Wheat', 'Urea'])
+    product_id = catalog.id_for('Urea')
+    assert catalog.remove('Urea')[0]
+    assert catalog.names() == ['Wheat']
+    assert catalog.name(product_id) == 'Urea'
+    assert catalog.add('Urea')[0]
+    assert catalog.id_for('Urea') == product_id
+    assert catalog.next_id() == 3
+
+
+def test_default_prices_are_range_checked(empty_ledger):
+    product_id = empty_ledger.catalog.id_for('Wheat')
+    assert empty_ledger.update_product(product_id, cost_price=20.256, selling_price=25)[0]
+    assert empty_ledger.catalog.get(product_id)['cost_price'] == 20.26
+    assert not empty_ledger.update_product(product_id, cost_price=-1)[0]
+
+
+def test_catalog_survives_a_reload(ledger):
+    assert ledger.add_product('Potash', sku='K-60', unit='bag', cost_price=900, selling_price=950)[0]
+    ledger.save()
+    loaded = Ledger.load(ledger.storage_file)
+    assert loaded.catalog.to_records() == ledger.catalog.to_records()
+    assert loaded.catalog.id_for_sku('K-60') == ledger.catalog.id_for('Potash')
+
+
+def test_rename_keeps_the_rows_and_the_old_name_as_an_alias(ledger):
+    stock = ledger.current_stock('Urea')
+    assert ledger.rename_product('Urea', 'Urea 46%')[0]
+    assert ledger.current_stock('Urea 46%') == stock
+    assert ledger.catalog.canonical('Urea') == 'Urea 46%'
+    assert 'Urea' not in ledger.products
+
+
+def test_rename_back_to_an_earlier_name(ledger):
+    stock = ledger.current_stock('Urea')
+    assert ledger.rename_product('Urea', 'Urea 46%')[0]
+    assert ledger.rename_product('Urea 46%', 'Urea')[0]
+    assert ledger.catalog.entry('Urea')['aliases'] == ['Urea 46%']
+    assert ledger.current_stock('Urea') == stock
+
+    ledger.save()
+    loaded = Ledger.load(ledger.storage_file)
+    assert loaded.catalog.canonical('Urea 46%') == 'Urea'
+    assert loaded.current_stock('Urea') == stock
+
+
+def test_rename_to_another_products_name_is_refused(ledger):
+    assert ledger.rename_product('Urea', 'Urea 46%')[0]
+    assert not ledger.rename_product('DAP', 'Urea')[0]
+    assert not ledger.rename_product('DAP', 'Wheat')[0]
+    assert not ledger.rename_product('DAP', 'DAP')[0]
+
+
+def test_merge_moves_history_and_redirects_names(ledger):
+    total = ledger.current_stock('Urea') + ledger.current_stock('DAP')
+    assert ledger.merge_products('DAP', 'Urea')[0]
+    assert ledger.current_stock('Urea') == total
+    assert ledger.catalog.canonical('DAP') == 'Urea'
+    # The merged-away product keeps its own name
+    assert not ledger.rename_product('Urea', 'DAP')[0]
@@ -0,0 +1,61 @@
+"""FIFO and weighted-average cost of goods sold"""
+
+import pytest
+
+from inventory.costing import CostLotEngine, apply_costing
+from conftest import add_rows
+
+
+@pytest.fixture
+def lots(empty_ledger):
+    ledger = empty_ledger
+    ledger.add_transaction('01/01/2026', 'Wheat', 10, 0, 5, 0)
+    ledger.add_transaction('02/01/2026', 'Wheat', 10, 0, 7, 0)
+    ledger.add_transaction('03/01/2026', 'Wheat', 0, 15, 7, 10)
+    return ledger
+
+
+def test_fifo_takes_the_oldest_lots_first():
+    engine = CostLotEngine('FIFO')
+    engine.apply('Wheat', 10, 0, 5)
+    engine.apply('Wheat', 10, 0, 7)
+    assert engine.apply('Wheat', 0, 15, 7) == 10 * 5 + 5 * 7
+    assert engine.apply('Wheat', 0, 5, 7) == 5 * 7
+
+
+def test_weighted_average_uses_the_running_average_cost():
+    engine = CostLotEngine('Weighted Average')
+    engine.apply('Wheat', 10, 0, 5)
+    engine.apply('Wheat', 10, 0, 7)
+    assert engine.apply('Wheat', 0, 15, 7) == pytest.approx(15 * 6)
+    engine.apply('Wheat', 5, 0, 12)
+    # 5 left at 6 plus 5 at 12
+    assert engine.apply('Wheat', 0, 10, 12) == pytest.approx(5 * 6 + 5 * 12)
+
+
+@pytest.mark.parametrize('method', ['FIFO', 'Weighted Average'])
+def test_shortfall_is_costed_at_the_entered_price(method):
+    engine = CostLotEngine(method)
+    engine.apply('Urea', 2, 0, 100)
+    assert engine.apply('Urea', 0, 3, 120) == pytest.approx(2 * 100 + 1 * 120)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        CostLotEngine('LIFO')
+
+
+@pytest.mark.parametrize('method, cogs', [('FIFO', 85.0), ('Weighted Average', 90.0), ('As Entered', 105.0)])
+def test_ledger_profit_under_each_method(lots, method, cogs):
+    costed = lots.costed(method)
+    assert costed['COGS'].iat[-1] == cogs
+    assert costed['Profit'].iat[-1] == 150.0 - cogs
+
+
+@pytest.mark.parametrize('method', ['FIFO', 'Weighted Average'])
+def test_incremental_cogs_match_a_full_replay(ledger, method):
+    ledger.costed(method)
+    for batch in range(3):
+        add_rows(ledger, 120 + batch * 20, 20, seed=batch + 2)
+        ledger.costed(method)
+    assert ledger.costed(method)['COGS'].tolist() == apply_costing(ledger.df, method)['COGS'].tolist()
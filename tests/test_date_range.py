@@ -0,0 +1,54 @@
+"""Date-range selection through the sorted date index"""
+
+import numpy as np
+
+from inventory.ledger import CACHE_ENTRIES
+from inventory.transactions import parse_date, parse_dates
+
+
+def expected_ids(ledger, start, end, product=None):
+    """IDs in a date range by scanning every row"""
+    dates = parse_dates(ledger.df['Date'])
+    mask = (dates >= parse_date(start)) & (dates <= parse_date(end))
+    if product is not None:
+        mask &= ledger.df['Product Name'] == product
+    return ledger.df.loc[mask, 'Transaction ID'].tolist()
+
+
+def test_range_matches_a_full_scan(ledger):
+    assert ledger.select(date_range=('10/02/2025', '20/03/2025'))['Transaction ID'].tolist() == \
+        expected_ids(ledger, '10/02/2025', '20/03/2025')
+    assert ledger.select('Urea', ('10/02/2025', '20/03/2025'))['Transaction ID'].tolist() == \
+        expected_ids(ledger, '10/02/2025', '20/03/2025', 'Urea')
+
+
+def test_open_ended_ranges(ledger):
+    assert ledger.positions() is None
+    assert len(ledger.select(date_range=(None, '31/12/2024'))) == 0
+    assert len(ledger.select(date_range=('01/01/2025', None))) == len(ledger.df)
+
+
+def test_back_dated_entries_are_indexed_in_date_order(ledger):
+    ledger.date_index()
+    ledger.add_transaction('15/01/2025', 'Wheat', 5, 0, 20, 0)
+    ledger.add_transaction('01/06/2026', 'Wheat', 5, 0, 20, 0)
+    new_id = int(ledger.df['Transaction ID'].iat[-2])
+    selected = ledger.select(date_range=('15/01/2025', '15/01/2025'))['Transaction ID'].tolist()
+    assert selected == expected_ids(ledger, '15/01/2025', '15/01/2025') and new_id in selected
+
+    index = ledger.date_index()
+    assert np.all(np.diff(index.sorted_days) >= 0)
+    assert index.applied == len(ledger.df)
+
+
+def test_deletes_rebuild_the_index(ledger):
+    ledger.date_index()
+    ledger.delete(int(ledger.df['Transaction ID'].iat[5]))
+    assert ledger.select(date_range=('01/01/2025', '31/01/2025'))['Transaction ID'].tolist() == \
+        expected_ids(ledger, '01/01/2025', '31/01/2025')
+
+
+def test_the_derived_value_cache_is_bounded(ledger):
+    for day in range(1, CACHE_ENTRIES + 20):
+        ledger.product_summary(date_range=('01/01/2025', f'{day % 28 + 1:02d}/{day // 28 + 2:02d}/2025'))
+    assert len(ledger._cache) <= CACHE_ENTRIES
@@ -0,0 +1,28 @@
+"""In-place transaction editing with incremental recompute"""
+
+from inventory.costing import apply_costing
+from inventory.transactions import recalculate_stock
+from conftest import PRODUCTS
+
+
+def test_edit_recomputes_totals_and_stock(ledger):
+    txn_id = int(ledger.df['Transaction ID'].iat[0])
+    assert ledger.edit({txn_id: {'Quantity Received': 100.0, 'Cost Price': 2.5}})[0]
+    row = ledger.df.iloc[0]
+    assert float(row['Total Purchase']) == 250.0
+    expected = recalculate_stock(ledger.df.copy(), PRODUCTS)
+    assert ledger.df['Stock Left'].astype(float).tolist() == expected['Stock Left'].astype(float).tolist()
+
+
+def test_engines_replay_everything_after_a_rewrite(ledger):
+    ledger.costed('FIFO')
+    first = int(ledger.df['Transaction ID'].iat[0])
+    assert ledger.edit({first: {'Cost Price': 99.0}})[0]
+    assert ledger.costed('FIFO')['COGS'].tolist() == apply_costing(ledger.df, 'FIFO')['COGS'].tolist()
+
+
+def test_negative_values_are_refused(ledger):
+    before = ledger.df.copy()
+    success, message = ledger.edit({int(before['Transaction ID'].iat[0]): {'Quantity Sold': -1}})
+    assert not success
+    assert ledger.df.equals(before)
@@ -0,0 +1,21 @@
+"""Demand forecasting and reorder points"""
+
+import pandas as pd
+
+from inventory.forecast import DemandEngine
+from conftest import add_rows
+
+
+def test_incremental_demand_matches_a_full_replay(ledger):
+    ledger.demand_engine()
+    for batch in range(3):
+        add_rows(ledger, 120 + batch * 20, 20, seed=batch + 2)
+        ledger.demand_engine()
+    pd.testing.assert_series_equal(ledger.demand_engine().daily.sort_index(),
+                                   DemandEngine(ledger.non_trading_ids).replay(ledger.df).daily.sort_index())
+
+
+def test_reorder_report_covers_stocked_products(ledger):
+    report = ledger.reorder_report(as_of='30/04/2025')
+    assert set(report['Product Name']) >= {'Wheat', 'Urea', 'DAP'}
+    assert (report['Reorder Point'] >= report['Safety Stock']).all()
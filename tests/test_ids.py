@@ -0,0 +1,31 @@
+"""Stable transaction IDs"""
+
+from inventory.ledger import Ledger
+
+
+def test_deleted_ids_are_not_reused(empty_ledger):
+    ledger = empty_ledger
+    ledger.add_transaction('01/01/2026', 'Wheat', 10, 0, 5, 0)
+    ledger.add_transaction('02/01/2026', 'Wheat', 0, 2, 5, 8)
+    assert ledger.delete(2)[0]
+    ledger.add_transaction('03/01/2026', 'Wheat', 0, 1, 5, 8)
+    ledger.add_transactions([{'date': '04/01/2026', 'product': 'Wheat', 'qty_received': 0, 'qty_sold': 1,
+                              'cost_price': 5, 'selling_price': 8}])
+    assert ledger.df['Transaction ID'].tolist() == [1, 3, 4]
+
+
+def test_high_water_mark_survives_save_and_load(empty_ledger):
+    ledger = empty_ledger
+    ledger.add_transaction('01/01/2026', 'Wheat', 10, 0, 5, 0)
+    ledger.add_transaction('02/01/2026', 'Wheat', 0, 2, 5, 8)
+    assert ledger.delete(2)[0]
+    ledger.save()
+
+    loaded = Ledger.load(ledger.storage_file)
+    loaded.add_transaction('03/01/2026', 'Wheat', 0, 1, 5, 8)
+    assert loaded.df['Transaction ID'].tolist() == [1, 3]
+
+
+def test_index_finds_rows_by_id(ledger):
+    txn_id = int(ledger.df['Transaction ID'].iat[50])
+    assert ledger.index()['ids'][txn_id] == 50
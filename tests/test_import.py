@@ -0,0 +1,47 @@
+"""Validation of bulk-import and POS records"""
+
+import pytest
+
+from inventory.transactions import validate_import_record
+
+RECORD = {'date': '01/01/2026', 'product_name': 'Wheat', 'quantity_received': 10, 'quantity_sold': 0,
+          'cost_price': 20, 'selling_price': 25}
+
+
+def test_valid_record():
+    txn = validate_import_record(dict(RECORD, product_name='  Wheat '))
+    assert txn['product'] == 'Wheat'
+    assert txn['qty_received'] == 10.0
+
+
+@pytest.mark.parametrize('changes', [
+    {'product_name': 5},
+    {'product_name': '   '},
+    {'quantity_received': float('inf')},
+    {'quantity_sold': float('nan')},
+    {'cost_price': 1e300},
+    {'selling_price': -1},
+])
+def test_invalid_record(changes):
+    with pytest.raises(ValueError):
+        validate_import_record(dict(RECORD, **changes))
+
+
+def test_missing_fields():
+    with pytest.raises(ValueError, match='missing required fields'):
+        validate_import_record({'product_name': 'Wheat'})
+
+
+def test_ingest_reports_bad_records_and_keeps_the_rest(empty_ledger):
+    records = [RECORD, dict(RECORD, quantity_received='inf'), dict(RECORD, cost_price=1e12)]
+    imported, errors = empty_ledger.ingest_records(records)
+    assert imported == 1
+    assert [number for number, _ in errors] == [2, 3]
+    assert len(empty_ledger.df) == 1
+
+
+def test_ingest_checks_dates_like_the_api(empty_ledger):
+    imported, errors = empty_ledger.ingest_records([dict(RECORD, date='2026-01-01'), {'product_name': 'Wheat'}])
+    assert imported == 0
+    assert 'DD/MM/YYYY' in errors[0][1]
+    assert 'missing required fields' in errors[1][1]
@@ -0,0 +1,63 @@
+"""Prometheus text-format metrics"""
+
+import urllib.request
+
+from inventory.metrics import (
+    LEDGER_ROWS,
+    REGISTRY,
+    TRANSACTIONS_INGESTED,
+    Counter,
+    Gauge,
+    Histogram,
+    start_metrics_server,
+)
+
+
+def test_counter_and_gauge_render_one_line_per_label_set():
+    counter = Counter('demo_total', "Demo count", labels=('kind',))
+    counter.inc(kind='a')
+    counter.inc(2, kind='b "quoted"')
+    assert counter.render().splitlines() == [
+        '# HELP demo_total Demo count',
+        '# TYPE demo_total counter',
+        'demo_total{kind="a"} 1',
+        'demo_total{kind="b \\"quoted\\""} 2',
+    ]
+    gauge = Gauge('demo_level', "Demo level")
+    gauge.set(1.5)
+    gauge.set(0.5)
+    assert gauge.render().splitlines()[-1] == 'demo_level 0.5'
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('demo_seconds', "Demo latency", buckets=(1, 5))
+    for value in (0.5, 3, 10):
+        histogram.observe(value)
+    assert histogram.render().splitlines()[2:] == [
+        'demo_seconds_bucket{le="1"} 1',
+        'demo_seconds_bucket{le="5"} 2',
+        'demo_seconds_bucket{le="+Inf"} 3',
+        'demo_seconds_sum 13.5',
+        'demo_seconds_count 3',
+    ]
+
+
+def test_ledger_gauges_are_labelled_and_forgotten(empty_ledger):
+    labels = {'tenant': 'shop', 'location': 'Main'}
+    empty_ledger.label_metrics(**labels)
+    ingested = TRANSACTIONS_INGESTED.value()
+    empty_ledger.add_transaction('01/01/2026', 'Wheat', 10, 0, 20, 0)
+    assert LEDGER_ROWS.value(**labels) == 1
+    assert TRANSACTIONS_INGESTED.value() == ingested + 1
+    assert 'inventory_ledger_rows{tenant="shop",location="Main"} 1' in REGISTRY.render()
+
+    empty_ledger.forget_metrics()
+    assert 'tenant="shop"' not in REGISTRY.render()
+
+
+def test_metrics_endpoint():
+    server = start_metrics_server(0)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    with urllib.request.urlopen(url + '/metrics') as response:
+        assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert '# TYPE inventory_ledger_rows gauge' in response.read().decode('utf-8')
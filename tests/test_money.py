@@ -0,0 +1,94 @@
+"""Fixed-point money and quantity arithmetic"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from inventory.money import (
+    MAX_PRICE,
+    MAX_QUANTITY,
+    MONEY_SCALE,
+    QUANTITY_SCALE,
+    check_limit,
+    compute_totals,
+    line_total,
+    money_sum,
+    quantity_sum,
+    to_fixed,
+    to_paise,
+)
+from inventory.transactions import validate_import_record, validate_transaction
+
+
+def test_totals_are_exact_in_paise():
+    purchase, sales, profit = compute_totals(3, 3, 0.1, 0.2)
+    assert (purchase, sales, profit) == (30, 60, 30)
+
+
+def test_line_total_rounds_half_up_to_the_paisa():
+    # 0.5 units x 0.01 = 0.005 rupees -> 1 paisa
+    assert line_total(0.5, 0.01) == 1
+    assert line_total(0.499, 0.01) == 0
+
+
+def test_sums_do_not_accumulate_float_error():
+    values = pd.Series([0.1] * 10 + [0.2])
+    assert money_sum(values) == 1.2
+    assert quantity_sum(pd.Series([0.001] * 1000)) == 1.0
+
+
+def test_blanks_become_zero():
+    assert to_paise(pd.Series([1.25, None, 'x'])).tolist() == [125, 0, 0]
+
+
+@pytest.mark.parametrize('value', [float('inf'), float('-inf'), 1e300, [1.0, np.inf]])
+def test_to_fixed_rejects_values_that_do_not_fit(value):
+    with pytest.raises(ValueError):
+        to_fixed(value, MONEY_SCALE)
+
+
+def test_check_limit():
+    check_limit(np.array([0, 5 * QUANTITY_SCALE]), 5, QUANTITY_SCALE, 'qty')
+    with pytest.raises(ValueError, match='qty'):
+        check_limit(np.array([5 * QUANTITY_SCALE + 1]), 5, QUANTITY_SCALE, 'qty')
+    with pytest.raises(ValueError):
+        check_limit(np.array([-1]), 5, QUANTITY_SCALE, 'qty')
+
+
+def test_limits_are_inclusive():
+    validate_transaction({'product': 'Wheat', 'qty_received': MAX_QUANTITY, 'qty_sold': 0,
+                          'cost_price': MAX_PRICE, 'selling_price': 0})
+    with pytest.raises(ValueError):
+        validate_import_record({'date': '01/01/2026', 'product_name': 'Wheat',
+                                'quantity_received': MAX_QUANTITY + 1})
+    with pytest.raises(ValueError):
+        validate_import_record({'date': '01/01/2026', 'product_name': 'Wheat', 'cost_price': MAX_PRICE + 0.01})
+
+
+def test_entry_rejects_out_of_range_amounts(empty_ledger):
+    with pytest.raises(ValueError):
+        empty_ledger.add_transaction('01/01/2026', 'Wheat', float('inf'), 0, 20, 25)
+    with pytest.raises(ValueError):
+        empty_ledger.add_transactions([{'date': '01/01/2026', 'product': 'Wheat', 'qty_received': 1,
+                                        'qty_sold': 0, 'cost_price': 1e300, 'selling_price': 0}])
+    assert len(empty_ledger.df) == 0
+
+
+@pytest.mark.parametrize('changes', [
+    {'cost_price': float('nan'), 'percent': True},
+    {'selling_price': float('inf'), 'percent': True},
+    {'cost_price': -150.0, 'percent': True},
+    {'selling_price': MAX_PRICE + 1},
+    {'cost_price': -1.0},
+])
+def test_bulk_price_changes_stay_in_range(ledger, changes):
+    before = ledger.df.copy()
+    success, _ = ledger.bulk_adjust_prices(ledger.filter_mask('Wheat'), **changes)
+    assert not success
+    pd.testing.assert_frame_equal(ledger.df, before)
+
+
+@pytest.mark.parametrize('amount', [float('nan'), float('inf'), -5, 0, 1e300, 'x'])
+def test_payments_must_be_positive_finite_amounts(empty_ledger, amount):
+    assert not empty_ledger.add_payment('01/01/2026', 'Ravi', amount)[0]
+    assert empty_ledger.payments == []
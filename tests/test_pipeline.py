@@ -0,0 +1,64 @@
+"""Asyncio ingestion pipeline: drop-folders and shutdown"""
+
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from inventory.pipeline import IngestionPipeline
+
+RECORD = {'date': '01/01/2026', 'product_name': 'Wheat', 'quantity_received': 10, 'quantity_sold': 0,
+          'cost_price': 20, 'selling_price': 0}
+
+
+def drop(folder, name, records):
+    with open(os.path.join(folder, name), 'w') as f:
+        f.write('\n'.join(json.dumps(record) for record in records))
+
+
+def run(pipeline, sources, timeout=10):
+    async def main():
+        return await asyncio.wait_for(pipeline.run([source() for source in sources]), timeout)
+    return asyncio.run(main())
+
+
+def test_files_are_moved_once_their_records_are_done(empty_ledger, tmp_path):
+    folder = str(tmp_path / 'drop')
+    os.makedirs(folder)
+    drop(folder, 'good.jsonl', [RECORD, dict(RECORD, quantity_received=-1)])
+    drop(folder, 'bad.jsonl', [dict(RECORD, date='2026-13-01'), dict(RECORD, product_name='')])
+    with open(os.path.join(folder, 'broken.json'), 'w') as f:
+        f.write('{not json')
+
+    pipeline = IngestionPipeline(empty_ledger, max_delay=0.01, report=lambda snapshot: None)
+    run(pipeline, [lambda: pipeline.folder_source(folder, once=True)])
+
+    assert sorted(os.listdir(os.path.join(folder, 'processed'))) == ['good.jsonl']
+    assert sorted(os.listdir(os.path.join(folder, 'failed'))) == ['bad.jsonl', 'broken.json']
+    assert len(empty_ledger.df) == 1
+
+
+def test_stop_while_saves_fail_does_not_hang(empty_ledger, tmp_path):
+    folder = str(tmp_path / 'drop')
+    os.makedirs(folder)
+    drop(folder, 'sales.jsonl', [RECORD] * 50)
+
+    def fail():
+        raise OSError("disk full")
+    empty_ledger.save = fail
+
+    pipeline = IngestionPipeline(empty_ledger, max_delay=0.01, queue_size=2, report=lambda snapshot: None)
+
+    async def stop_later():
+        await asyncio.sleep(0.3)
+        pipeline.stop()
+
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match='could not be saved'):
+        run(pipeline, [lambda: pipeline.folder_source(folder, poll_interval=0.05), stop_later])
+    assert time.monotonic() - started < 5
+    # Nothing was saved, so the file stays for the next run
+    assert os.listdir(os.path.join(folder, 'processed')) == []
+    assert os.path.exists(os.path.join(folder, 'sales.jsonl'))
@@ -0,0 +1,81 @@
+"""Customer credit: balances, aging and statements"""
+
+from inventory.ledger import Ledger
+
+
+def credit(empty_ledger):
+    """Ravi buys 1,000 on 01/01 and 500 on 15/02 on credit, and Mohan 200 on 01/03; one cash sale in between"""
+    ledger = empty_ledger
+    ledger.add_transaction('01/01/2026', 'Urea', 100, 0, 200, 0)
+    ledger.add_transaction('01/01/2026', 'Urea', 0, 4, 200, 250, customer='Ravi')
+    ledger.add_transaction('15/02/2026', 'Urea', 0, 2, 200, 250, customer=' Ravi ')
+    ledger.add_transaction('20/02/2026', 'Urea', 0, 1, 200, 300)
+    ledger.add_transaction('01/03/2026', 'Urea', 0, 1, 200, 200, customer='Mohan')
+    return ledger
+
+
+def balance(ledger, customer):
+    balances = ledger.customer_balances().set_index('Customer')
+    return balances.loc[customer, 'Balance']
+
+
+def test_credit_sales_build_balances(empty_ledger):
+    ledger = credit(empty_ledger)
+    assert ledger.customers() == ['Mohan', 'Ravi']
+    assert balance(ledger, 'Ravi') == 1500.0
+    assert balance(ledger, 'Mohan') == 200.0
+    assert ledger.customer_balances()['Customer'].tolist() == ['Ravi', 'Mohan']
+
+
+def test_payments_settle_the_oldest_sales_first(empty_ledger):
+    ledger = credit(empty_ledger)
+    assert ledger.add_payment('01/03/2026', 'Ravi', 1200)[0]
+    assert balance(ledger, 'Ravi') == 300.0
+    aging = ledger.aging_report(today='10/03/2026').set_index('Customer')
+    # The 01/01 sale is settled; 300 of the 15/02 sale is 23 days old
+    assert aging.loc['Ravi', '0-30 days'] == 300.0
+    assert aging.loc['Ravi', '61-90 days'] == 0.0
+    assert aging.loc['Ravi', 'Total Due'] == 300.0
+
+
+def test_overpayment_is_held_as_an_advance(empty_ledger):
+    ledger = credit(empty_ledger)
+    assert ledger.add_payment('02/03/2026', 'Mohan', 500)[0]
+    assert balance(ledger, 'Mohan') == -300.0
+    ledger.add_transaction('03/03/2026', 'Urea', 0, 1, 200, 250, customer='Mohan')
+    assert balance(ledger, 'Mohan') == -50.0
+    assert 'Mohan' not in ledger.aging_report(today='10/03/2026')['Customer'].tolist()
+
+
+def test_aging_buckets(empty_ledger):
+    ledger = credit(empty_ledger)
+    aging = ledger.aging_report(today='15/04/2026').set_index('Customer')
+    assert aging.loc['Ravi', ['0-30 days', '31-60 days', '61-90 days', '90+ days']].tolist() == \
+        [0.0, 500.0, 0.0, 1000.0]
+
+
+def test_statement_runs_a_balance_by_date(empty_ledger):
+    ledger = credit(empty_ledger)
+    ledger.add_payment('20/01/2026', 'Ravi', 400)
+    statement = ledger.customer_statement('Ravi')
+    assert statement['Type'].tolist() == ['Sale', 'Payment', 'Sale']
+    assert statement['Balance'].tolist() == [1000.0, 600.0, 1100.0]
+
+
+def test_deleting_a_payment_restores_the_balance(empty_ledger):
+    ledger = credit(empty_ledger)
+    ledger.add_payment('01/03/2026', 'Ravi', 1200)
+    assert balance(ledger, 'Ravi') == 300.0
+    payment_id = ledger.payments[0]['Payment ID']
+    assert ledger.delete_payment(payment_id)[0]
+    assert balance(ledger, 'Ravi') == 1500.0
+    assert not ledger.delete_payment(payment_id)[0]
+
+
+def test_payments_survive_a_reload(empty_ledger):
+    ledger = credit(empty_ledger)
+    ledger.add_payment('01/03/2026', 'Ravi', 1200.5)
+    ledger.save()
+    loaded = Ledger.load(ledger.storage_file)
+    assert loaded.payments == ledger.payments
+    assert balance(loaded, 'Ravi') == 299.5
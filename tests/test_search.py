@@ -0,0 +1,57 @@
+"""Remarks full-text search"""
+
+from inventory.search import RemarksIndex, highlight, tokenize
+
+
+def remarked(empty_ledger):
+    ledger = empty_ledger
+    ledger.add_transaction('01/01/2026', 'Urea', 50, 0, 260, 0, remarks='Initial Urea stock from Supplier A')
+    ledger.add_transaction('02/01/2026', 'Wheat', 20, 0, 22, 0, remarks='Wheat from supplier B')
+    ledger.add_transaction('03/01/2026', 'Urea', 0, 5, 260, 280, remarks='Sold to Ravi')
+    ledger.add_transaction('04/01/2026', 'Urea', 0, 2, 260, 280)
+    return ledger
+
+
+def ids(df):
+    return df['Transaction ID'].tolist()
+
+
+def test_tokens_are_lower_case_words():
+    assert tokenize('Urea, 45kg (Supplier-A)') == ['urea', '45kg', 'supplier', 'a']
+
+
+def test_every_query_word_must_match_as_a_prefix(empty_ledger):
+    ledger = remarked(empty_ledger)
+    assert ids(ledger.search_remarks('sup')) == [1, 2]
+    assert ids(ledger.search_remarks('urea SUP')) == [1]
+    assert ids(ledger.search_remarks('urea ravi')) == []
+    assert ids(ledger.search_remarks('xyz')) == []
+
+
+def test_search_within_a_product_and_date_range(empty_ledger):
+    ledger = remarked(empty_ledger)
+    assert ids(ledger.search_remarks('from', product='Wheat')) == [2]
+    assert ids(ledger.search_remarks('from', date_range=('02/01/2026', None))) == [2]
+
+
+def test_the_index_follows_appends_and_edits(empty_ledger):
+    ledger = remarked(empty_ledger)
+    assert ids(ledger.search_remarks('ravi')) == [3]
+    ledger.add_transaction('05/01/2026', 'Urea', 0, 1, 260, 280, remarks='Ravi again')
+    assert ids(ledger.search_remarks('ravi')) == [3, 5]
+    assert ledger.edit({3: {'Remarks': 'Sold to Mohan'}})[0]
+    assert ids(ledger.search_remarks('ravi')) == [5]
+
+
+def test_appended_chunks_match_a_single_replay(empty_ledger):
+    df = remarked(empty_ledger).df
+    index = RemarksIndex().replay(df.iloc[:2])
+    index.replay(df, start=2)
+    full = RemarksIndex().replay(df)
+    assert index.vocabulary() == full.vocabulary()
+    for token in full.vocabulary():
+        assert index.search(token).tolist() == full.search(token).tolist()
+
+
+def test_highlight_escapes_and_marks_matches():
+    assert highlight('Urea <bulk> from Supplier', 'sup') == 'Urea &lt;bulk&gt; from <mark>Supplier</mark>'
@@ -0,0 +1,43 @@
+"""Tenant pool eviction and live holders"""
+
+import gc
+
+from inventory.tenants import TenantHolder, TenantPool
+
+
+class FakeBranches:
+    def __init__(self, tenant, size=100):
+        self.tenant = tenant
+        self.size = size
+
+    def memory_bytes(self):
+        return self.size
+
+    def forget_metrics(self):
+        pass
+
+
+def test_least_recently_used_tenants_are_evicted_to_the_budget():
+    pool = TenantPool(budget_bytes=250, loader=FakeBranches)
+    first = pool.get('a')
+    pool.get('b')
+    pool.get('a')
+    pool.get('c')
+    assert pool.tenants() == ['a', 'c']
+    assert pool.get('a') is first
+
+
+def test_tenants_with_a_live_holder_are_not_evicted():
+    pool = TenantPool(budget_bytes=150, loader=FakeBranches)
+    holder = TenantHolder()
+    held = pool.get('a', holder)
+    pool.get('b')
+    pool.get('c')
+    # Over budget, but 'a' is still in use by a session
+    assert pool.tenants() == ['a', 'c']
+    assert pool.get('a') is held
+
+    del holder
+    gc.collect()
+    pool.get('d')
+    assert pool.tenants() == ['d']
@@ -0,0 +1,65 @@
+"""Price and margin trends"""
+
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def priced(empty_ledger):
+    """Wheat sold at 25 then 30, and bought at 20 then 22"""
+    ledger = empty_ledger
+    ledger.add_transaction('01/01/2026', 'Wheat', 100, 0, 20, 0)
+    ledger.add_transaction('02/01/2026', 'Wheat', 0, 10, 20, 25)
+    ledger.add_transaction('05/01/2026', 'Wheat', 0, 10, 20, 25)
+    ledger.add_transaction('10/01/2026', 'Wheat', 0, 10, 20, 30)
+    ledger.add_transaction('15/01/2026', 'Wheat', 50, 0, 22, 0)
+    ledger.add_transaction('20/02/2026', 'Wheat', 0, 5, 22, 30)
+    return ledger
+
+
+def on(report, day):
+    return report.set_index('Date').loc[pd.Timestamp(day)]
+
+
+def test_daily_and_rolling_prices(priced):
+    trend, _ = priced.price_trends('Wheat', window=7)
+    assert on(trend, '2026-01-01')['Cost Price'] == 20.0
+    assert pd.isna(on(trend, '2026-01-01')['Selling Price'])
+    assert on(trend, '2026-01-10')['Selling Price'] == 30.0
+    # 05/01 and 10/01 fall in the 7-day window: 20 units for 550
+    assert on(trend, '2026-01-10')['Avg Selling Price'] == 27.5
+    assert on(trend, '2026-01-10')['Margin %'] == round(150 / 550 * 100, 2)
+    # Only the 10/01 sale is left in the window on 15/01
+    assert on(trend, '2026-01-15')['Avg Selling Price'] == 30.0
+    # With no sale in the 3 days to 15/01 the last average holds
+    assert on(priced.price_trends('Wheat', window=3)[0], '2026-01-15')['Avg Selling Price'] == 30.0
+
+
+def test_price_change_points(priced):
+    _, changes = priced.price_trends('Wheat')
+    selling, cost = [row for _, row in changes.iterrows()]
+    assert (selling['Price'], selling['From'], selling['To'], selling['Change %']) == ('Selling Price', 25, 30, 20)
+    assert (selling['Units Sold Before'], selling['Units Sold After']) == (20, 15)
+    assert selling['Margin % Before'] == 20.0
+    assert selling['Margin % After'] == round(140 / 450 * 100, 2)
+    assert selling['Profit Effect'] == 75.0
+    assert (cost['Price'], cost['Date'], cost['From'], cost['To']) == \
+        ('Cost Price', pd.Timestamp('2026-01-15'), 20, 22)
+    assert (cost['Units Sold Before'], cost['Units Sold After'], cost['Profit Effect']) == (30, 5, -10.0)
+
+
+def test_products_are_looked_up_by_name_or_id(priced):
+    by_name, _ = priced.price_trends('Wheat')
+    by_id, _ = priced.price_trends(priced.catalog.id_for('Wheat'))
+    pd.testing.assert_frame_equal(by_name, by_id)
+
+
+def test_trends_follow_new_rows(priced):
+    trend, _ = priced.price_trends('Wheat')
+    priced.add_transaction('21/02/2026', 'Wheat', 0, 5, 22, 32)
+    assert len(priced.price_trends('Wheat')[0]) == len(trend) + 1
+
+
+def test_a_product_without_rows(priced):
+    trend, changes = priced.price_trends('Urea')
+    assert trend.empty and changes.empty
@@ -0,0 +1,97 @@
+"""Group-commit writer failures and the single-writer lock"""
+
+import json
+import subprocess
+import sys
+import time
+
+import pytest
+
+from inventory.ledger import Ledger
+from inventory.storage import StorageBusy
+from inventory.transactions import validate_import_record
+from inventory.writer import GroupCommitWriter
+
+RECORD = {'date': '01/01/2026', 'product_name': 'Wheat', 'quantity_received': 10, 'quantity_sold': 0,
+          'cost_price': 20, 'selling_price': 25}
+
+
+def failing_save(times):
+    """A Ledger.save stand-in that fails `times` times (for ever if None), then saves"""
+    calls = []
+
+    def save(original):
+        calls.append(1)
+        if times is None or len(calls) <= times:
+            raise OSError("disk full")
+        original()
+    return save
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def start_writer(ledger, times, **kwargs):
+    original, save = ledger.save, failing_save(times)
+    ledger.save = lambda: save(original)
+    return GroupCommitWriter(ledger, max_delay=0.01, retry_delay=0.01, max_retries=3, **kwargs).start()
+
+
+def test_a_failed_commit_is_retried(empty_ledger):
+    writer = start_writer(empty_ledger, times=2)
+    writer.submit([validate_import_record(RECORD)])
+    wait_for(lambda: writer.committed == 1)
+    writer.stop()
+    assert writer.failures == 2 and writer.dead_lettered == 0
+    assert len(Ledger.load(empty_ledger.storage_file).df) == 1
+
+
+def test_a_batch_that_keeps_failing_goes_to_the_dead_letter_file(empty_ledger, tmp_path):
+    dead = []
+    writer = start_writer(empty_ledger, times=None, dead_letter_file=str(tmp_path / 'dead.jsonl'),
+                          on_dead_letter=dead.extend)
+    records = [RECORD, dict(RECORD, quantity_received=0, quantity_sold=4)]
+    writer.submit([validate_import_record(record) for record in records], tag='pos')
+    wait_for(lambda: writer.dead_lettered == 2)
+    writer.stop()
+
+    assert writer.failures == 3 and writer.healthy
+    assert dead == ['pos', 'pos']
+    # Taken back out of the ledger, and written as records that can be imported again
+    assert len(empty_ledger.df) == 0
+    with open(tmp_path / 'dead.jsonl') as f:
+        lines = [json.loads(line) for line in f]
+    assert [validate_import_record(line) for line in lines] == [validate_import_record(r) for r in records]
+
+
+def test_a_save_is_refused_while_another_process_is_the_writer(empty_ledger):
+    storage_file = empty_ledger.storage_file
+    holder = subprocess.Popen(
+        [sys.executable, '-c', 'import sys; from inventory.storage import WriterLock; '
+         f'WriterLock({storage_file!r}, "the POS API").acquire(); print("ready", flush=True); sys.stdin.read()'],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == 'ready'
+        with pytest.raises(StorageBusy, match='the POS API'):
+            empty_ledger.save()
+    finally:
+        holder.communicate('')
+    empty_ledger.save()
+
+
+def test_a_save_is_refused_when_the_file_changed_since_load(empty_ledger):
+    empty_ledger.add_transaction('01/01/2026', 'Wheat', 10, 0, 5, 0)
+    empty_ledger.save()
+    dashboard = Ledger.load(empty_ledger.storage_file)
+
+    empty_ledger.add_transaction('02/01/2026', 'Wheat', 0, 2, 5, 8)
+    empty_ledger.save()
+
+    dashboard.add_transaction('03/01/2026', 'Wheat', 0, 1, 5, 8)
+    with pytest.raises(StorageBusy, match='changed by another process'):
+        dashboard.save()
+    assert len(Ledger.load(empty_ledger.storage_file).df) == 2